@@ -1,30 +1,144 @@
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials, firestore
-from gtts import gTTS
+from streamlit.errors import StreamlitAPIException
 import io
 import pandas as pd
 import datetime
-import matplotlib.pyplot as plt
-import yfinance as yf
 import time
 import calendar
+import functools
+import threading
+import os
+from workout_analytics import (
+    flatten_workout_sets, new_rollup_state, rollup_from_frame, merge_rollups,
+    e1rm_progress, personal_records,
+)
+from habit_analytics import (
+    decode_month, encode_month, month_range, build_daily_frame, completion_rates,
+    monthly_completion, streaks, habit_sleep_correlation, yearly_heatmap,
+)
+import export
+import jobs
+import live_timer
+import optimistic
+import portfolio
+import resilience
+import schemas
+import snapshot
+import statement_import
+import tenancy
+import timeseries
+import tracing
+
+# Ağır bağımlılıklar (firebase_admin, gtts, matplotlib, yfinance) yalnızca
+# kullanan fonksiyonların içinde yüklenir; bütçe için tools/import_budget.py.
 
 # --- 1. AYARLAR VE BAĞLANTI ---
 st.set_page_config(page_title="My Life OS", page_icon="🧠", layout="wide")
 
-if not firebase_admin._apps:
-    try:
+@st.cache_resource(show_spinner=False)
+def get_db():
+    """Firebase bağlantısını süreç başına bir kez kurar"""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    if not firebase_admin._apps:
         key_dict = dict(st.secrets["firebase"])
         if "private_key" in key_dict:
             key_dict["private_key"] = key_dict["private_key"].replace("\\n", "\n")
         cred = credentials.Certificate(key_dict)
         firebase_admin.initialize_app(cred)
-    except Exception as e:
-        st.error(f"Bağlantı Hatası: {e}")
+    return firestore.client()
+
+def server_timestamp():
+    """Firestore sunucu zaman damgası"""
+    from firebase_admin import firestore
+    return firestore.SERVER_TIMESTAMP
+
+# --- İZLEME (her rerun'ın Firestore/fiyat/TTS çağrıları) ---
+# Panel gizlidir: adres çubuğuna ?debug=1 eklenince ya da LIFEOS_DEBUG=1 ile görünür.
+DEBUG_PANEL = st.query_params.get("debug") == "1" or os.environ.get("LIFEOS_DEBUG") == "1"
+TRACE_HISTORY = 50      # oturum başına saklanan rerun özeti
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+def finish_rerun_trace(trace):
+    """İzi kapatır; oturum geçmişine, kota sayaçlarına ve JSONL dosyasına işler"""
+    summary = tracing.end_trace(trace)
+    history = st.session_state.setdefault("_trace_history", [])
+    history.append({"summary": summary, "trace": trace})
+    del history[:-TRACE_HISTORY]
+    quota = st.session_state.setdefault("_trace_quota", {"reads": 0, "writes": 0, "deletes": 0, "by_page": {}})
+    for k in ("reads", "writes", "deletes"):
+        quota[k] += summary["quota"][k]
+    page = summary["page"] or "-"
+    quota["by_page"][page] = quota["by_page"].get(page, 0) + summary["quota"]["reads"]
+    tracing.export_jsonl(trace)
+    return summary
+
+def start_rerun_trace():
+    """Yeni rerun izini başlatır; yarıda kesilen (st.rerun/st.stop) önceki izi de kapatır"""
+    previous = st.session_state.pop("_trace_current", None)
+    if previous is not None and previous["end_ns"] is None:
+        finish_rerun_trace(previous)
+    st.session_state["_trace_current"] = tracing.begin_trace(_session_id(), detail=DEBUG_PANEL)
+
+def _fragment_rerun():
+    """Yalnızca bir st.fragment mı yeniden çalışıyor (tam çalıştırma değil)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+def traced_fragment(func=None, *, run_every=None):
+    """st.fragment; fragment tek başına yeniden çalıştığında çağrıları kendi izine kaydedilir.
+
+    Tam çalıştırmada fragment gövdesi rerun izinin içinde çalışır.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def body(*args, **kwargs):
+            if not _fragment_rerun():
+                return fn(*args, **kwargs)
+            trace = tracing.begin_trace(_session_id(), page=f"{fn.__name__} (fragment)", detail=DEBUG_PANEL)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finish_rerun_trace(trace)
+        return st.fragment(body, run_every=run_every)
+    return decorate(func) if func is not None else decorate
+
+start_rerun_trace()
+
+# --- KULLANICI ---
+# secrets içinde [auth] bölümü varsa Streamlit girişi (st.login) kullanılır ve
+# veriler giriş yapan kullanıcının altında (users/{uid}/...) tutulur; yoksa
+# kurulum tek kullanıcılıdır (LIFEOS_USER_ID ya da [app] user_id).
+AUTH_ENABLED = "auth" in st.secrets
+CACHED_USERS = 16       # kullanıcıya bağlı önbelleklerin boyut çarpanı
+
+def current_user_id():
+    """Oturumun kullanıcı kimliği; giriş gerekiyorsa giriş ekranında durur"""
+    if not AUTH_ENABLED:
+        return tenancy.default_user_id(st.secrets.get("app"))
+    if not st.user.get("is_logged_in"):
+        st.title("🧠 My Life OS")
+        st.button("Giriş Yap", on_click=st.login, type="primary")
         st.stop()
+    return tenancy.validate_uid(st.user.get("sub") or st.user.get("email"))
 
-db = firestore.client()
+UID = current_user_id()
+if st.session_state.get("_uid") != UID:
+    # Oturumda önceki kullanıcının durumu kalmasın
+    for key in [k for k in st.session_state if not str(k).startswith("_trace")]:
+        del st.session_state[key]
+    st.session_state["_uid"] = UID
+
+try:
+    db = tracing.traced_client(tenancy.scoped_client(get_db(), UID))
+except Exception as e:
+    st.error(f"Bağlantı Hatası: {e}")
+    st.stop()
 
 # --- 2. SEMBOL KÜTÜPHANESİ ---
 SYMBOL_MAP = {
@@ -67,83 +181,360 @@ BASE_EXERCISES = {
 
 # --- 4. YARDIMCI FONKSİYONLAR ---
 
-def save_to_db(collection_name, data):
-    """Veriyi kaydeder"""
-    data["created_at"] = firestore.SERVER_TIMESTAMP
+@st.cache_resource
+def _collection_versions():
+    """Süreç genelinde (kullanıcı, koleksiyon) sürüm sayaçları (önbellek geçersizleme için)"""
+    return {"lock": threading.Lock(), "versions": {}}
+
+def collection_version(collection_name):
+    """Oturum kullanıcısının koleksiyonunun güncel sürümü; her yazmada artar"""
+    return _collection_versions()["versions"].get((UID, collection_name), 0)
+
+def _bump_version(state, uid, collection_name):
+    key = (uid, collection_name)
+    with state["lock"]:
+        state["versions"][key] = state["versions"].get(key, 0) + 1
+        return state["versions"][key]
+
+def bump_collection_version(collection_name):
+    """Koleksiyona yazıldığında ona bağlı önbellekleri geçersiz kılar; yeni sürümü döner"""
+    return _bump_version(_collection_versions(), UID, collection_name)
+
+# --- PAYLAŞILAN TABLOLAR VE İYİMSER YAZMALAR ---
+# Koleksiyon tabloları süreç genelinde kullanıcı başına tek kopya olarak tutulur
+# ve salt okunurdur. Oturumlar yalnızca bekleyen yazmalarının küçük
+# değişikliklerini tutar; bunlar okunan tabloya uygulanır (optimistic.py).
+@st.cache_resource(max_entries=CACHED_USERS, show_spinner=False)
+def _shared_frames(uid):
+    """Kullanıcının koleksiyon tabloları: {koleksiyon: {"version", "frame"}}"""
+    return {"lock": threading.Lock(), "locks": {}, "frames": {}}
+
+def _collection_lock(store, collection_name):
+    """Bir koleksiyonun okunmasını/güncellenmesini sıraya koyan kilit"""
+    with store["lock"]:
+        return store["locks"].setdefault(collection_name, threading.Lock())
+
+def _write_queue():
+    return st.session_state.setdefault("_writes", optimistic.WriteQueue())
+
+def flash(message, balloons=False):
+    """st.rerun sonrasında da görünecek bildirim (bir sonraki çalıştırmada gösterilir)"""
+    st.session_state.setdefault("_flash", []).append((message, balloons))
+
+def show_flash():
+    for message, balloons in st.session_state.pop("_flash", []):
+        st.toast(message)
+        if balloons:
+            st.balloons()
+
+def optimistic_write(collection_name, label, change, remote, retry=True):
+    """Yazmayı oturumun gördüğü tabloya hemen yansıtır, Firestore'a arka planda gönderir.
+
+    `change(tablo)` yazma uygulanmış tabloyu döner, tabloyu yerinde
+    değiştirmez ve iki kez uygulansa da aynı sonucu verir (yazma onaylanınca
+    paylaşılan tabloya işlenir, kuyruktan düşene kadar yeniden uygulanır).
+    `remote()` Firestore yazmasıdır; tekrarlanması güvenli değilse (ör.
+    `Increment`) `retry=False` verilir. Koleksiyon henüz okunmadıysa yazma
+    beklenerek yapılır ve hatası çağırana yükseltilir.
+    """
+    attempts = None if retry else 1
+    store = _shared_frames(UID)
+    if collection_name not in store["frames"]:
+        resilience.call("firestore", remote, attempts=attempts)
+        bump_collection_version(collection_name)
+        return
+    versions, uid = _collection_versions(), UID
+    trace = tracing.background_trace(f"{label} (arka plan)")
+
+    def confirm():
+        resilience.call("firestore", remote, attempts=attempts)
+        with _collection_lock(store, collection_name):
+            version = _bump_version(versions, uid, collection_name)
+            entry = store["frames"].get(collection_name)
+            # Araya başka bir yazma girmediyse paylaşılan tablo yeniden okunmadan ilerletilir
+            if entry is not None and entry["version"] == version - 1:
+                store["frames"][collection_name] = dict(entry, version=version, frame=change(entry["frame"]))
+
+    _write_queue().submit(collection_name, confirm, change, label, trace)
+
+def reconcile_writes():
+    """Biten arka plan yazmalarını kuyruktan düşer; başarısız olanlar için uyarı gösterir"""
+    for write, error in _write_queue().poll():
+        if write.trace is not None:
+            finish_rerun_trace(write.trace)
+        if error is not None:
+            st.toast(f"❌ {write.label}: Firestore'a yazılamadı, değişiklik geri alındı ({error})")
+
+@traced_fragment(run_every=1)
+def pending_writes_indicator():
+    """Bekleyen yazmaları gösterir; biri başarısız olursa geri almak için sayfayı yeniler"""
+    pending = _write_queue().pending
+    if any(w.future.done() and w.future.exception() is not None for w in pending):
+        st.rerun()
+    waiting = sum(not w.future.done() for w in pending)
+    if waiting:
+        st.caption(f"⏳ {waiting} kayıt gönderiliyor…")
+
+def _new_doc(data):
+    """Yeni dökümanın zaman damgası ve tarih metinleri"""
+    data["created_at"] = server_timestamp()
     if "date" in data and isinstance(data["date"], datetime.date):
         data["date_str"] = data["date"].strftime("%Y-%m-%d")
     if "due_date" in data and isinstance(data["due_date"], datetime.date):
         data["due_date_str"] = data["due_date"].strftime("%Y-%m-%d")
-    db.collection(collection_name).add(data)
+    return data
+
+def save_changes(collection_name, label, updates=None, inserts=()):
+    """Güncellemeleri ({id: alanlar}) ve yeni kayıtları tek toplu yazmayla kaydeder; yeni kimlikleri döner"""
+    updates = {doc_id: dict(fields, updated_at=server_timestamp()) for doc_id, fields in (updates or {}).items()}
+    inserts = [(db.collection(collection_name).document(), _new_doc(data)) for data in inserts]
+
+    def change(frame):
+        if updates:
+            local = {doc_id: optimistic.local_values(fields) for doc_id, fields in updates.items()}
+            frame = optimistic.update_rows(frame, local, collection_name)
+        if inserts:
+            frame = optimistic.insert_rows(frame, [(ref.id, optimistic.local_values(data)) for ref, data in inserts],
+                                           collection_name)
+        return frame
+
+    def remote():
+        ops = [(db.collection(collection_name).document(doc_id), fields, True) for doc_id, fields in updates.items()]
+        ops += [(ref, data, False) for ref, data in inserts]
+        for start in range(0, len(ops), snapshot.BATCH_SIZE):
+            batch = db.batch()
+            for ref, data, is_update in ops[start:start + snapshot.BATCH_SIZE]:
+                if is_update:
+                    batch.update(ref, data)
+                else:
+                    batch.set(ref, data)
+            batch.commit()
+
+    if updates or inserts:
+        optimistic_write(collection_name, label, change, remote)
+    return [ref.id for ref, _ in inserts]
+
+def save_to_db(collection_name, data):
+    """Veriyi kaydeder; oturum koleksiyonun tablosunu tutuyorsa kayıt tabloya hemen eklenir"""
+    return save_changes(collection_name, "Kayıt", inserts=[data])[0]
+
+def _delete_docs(collection_name, doc_ids):
+    doc_ids = list(doc_ids)
+
+    def remote():
+        for start in range(0, len(doc_ids), snapshot.BATCH_SIZE):
+            batch = db.batch()
+            for doc_id in doc_ids[start:start + snapshot.BATCH_SIZE]:
+                batch.delete(db.collection(collection_name).document(doc_id))
+            batch.commit()
+        snapshot.record_deletions(db, collection_name, doc_ids)
+
+    optimistic_write(collection_name, f"Silme ({len(doc_ids)} kayıt)",
+                     lambda frame: optimistic.delete_rows(frame, doc_ids), remote)
 
 def delete_multiple_docs(collection_name, doc_ids):
     """Toplu silme işlemi"""
-    for doc_id in doc_ids:
-        db.collection(collection_name).document(doc_id).delete()
-    st.toast(f"🗑️ {len(doc_ids)} kayıt silindi!")
-    time.sleep(1)
+    _delete_docs(collection_name, doc_ids)
+    flash(f"🗑️ {len(doc_ids)} kayıt silindi!")
     st.rerun()
 
+# Açılışta okunacak anlık görüntülerin kök klasörü; her kullanıcının alt klasörü
+# vardır (tools/snapshot.py ile üretilir)
+SNAPSHOT_DIR = os.environ.get("LIFEOS_SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots"))
+SNAPSHOT_CLOCK_SKEW = datetime.timedelta(minutes=5)   # sunucu/istemci saat farkı payı
+# Paylaşılan tablo bu süreden eskiyse başka süreçlerin yazmaları delta sorgusuyla alınır
+SHARED_FRAME_TTL = datetime.timedelta(minutes=1)
+# Arka plan işçisinin (tools/worker.py) çıktı klasörü; sayfalar yalnızca okur
+WORKER_DIR = os.environ.get("LIFEOS_WORKER_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "worker_data"))
+# İşçi fiyatları günde iki kez çeker; bundan eski fiyatlar yerine canlı sorgu yapılır
+PRICE_MAX_AGE = datetime.timedelta(hours=24)
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def _load_snapshot_frame(path, collection_name):
+    """Bir koleksiyonun Parquet anlık görüntüsü; süreç başına bir kez okunur, değiştirilmez"""
+    return snapshot.load_snapshot_frame(path, collection_name)
+
+def get_snapshot_data(collection_name):
+    """En son anlık görüntü + Firestore deltaları; anlık görüntü yoksa None"""
+    folder = snapshot.latest_snapshot(os.path.join(SNAPSHOT_DIR, UID))
+    if folder is None:
+        return None
+    manifest = snapshot.read_manifest(folder)
+    info = manifest["collections"].get(collection_name)
+    if info is None:
+        return None
+    base = _load_snapshot_frame(os.path.join(folder, info["file"]), collection_name)
+    since = datetime.datetime.fromisoformat(manifest["exported_at"]) - SNAPSHOT_CLOCK_SKEW
+    upserts, deleted = snapshot.fetch_deltas(db, collection_name, since)
+    df = snapshot.apply_deltas(base, upserts, deleted, collection_name)
+    if "created_at" in df.columns:
+        df = df.sort_values("created_at", ascending=False, na_position="last", kind="stable").reset_index(drop=True)
+    return df
+
+def _read_collection(collection_name):
+    df = get_snapshot_data(collection_name)
+    if df is not None:
+        return df
+    docs = db.collection(collection_name).order_by("created_at", direction="DESCENDING").stream()
+    return schemas.build_frame(((doc.id, doc.to_dict()) for doc in docs), collection_name)
+
+def _last_modified(data):
+    """Dökümanın son değişme zamanı (created_at/updated_at); yoksa None"""
+    stamps = []
+    for value in (data.get("created_at"), data.get("updated_at")):
+        try:
+            stamp = pd.Timestamp(value)
+        except (TypeError, ValueError):
+            continue
+        if not pd.isna(stamp):
+            stamps.append(stamp if stamp.tzinfo else stamp.tz_localize("UTC"))
+    return max(stamps) if stamps else None
+
+def _refresh_collection(collection_name, frame, since):
+    """Başka süreçlerin (işçi, diğer sunucular) `since` sonrası yazmalarını tabloya uygular; değişiklik yoksa None"""
+    upserts, deleted = snapshot.fetch_deltas(db, collection_name, since - SNAPSHOT_CLOCK_SKEW)
+    columns = [c for c in ("id", "created_at", "updated_at") if c in frame.columns]
+    known = {row["id"]: _last_modified(row) for row in frame[columns].to_dict("records")} if "id" in columns else {}
+    # Saat farkı payı yüzünden tabloda zaten olan yazmalar da döner; yalnızca farklı olanlar uygulanır
+    upserts = {doc_id: data for doc_id, data in upserts.items()
+               if doc_id not in known or _last_modified(data) != known[doc_id]}
+    deleted = set(deleted) & known.keys()
+    if not upserts and not deleted:
+        return None
+    df = snapshot.apply_deltas(frame.drop(columns="Sil", errors="ignore"), upserts, deleted, collection_name)
+    if "created_at" in df.columns:
+        df = df.sort_values("created_at", ascending=False, na_position="last", kind="stable").reset_index(drop=True)
+    df['Sil'] = False
+    return df
+
 def get_data(collection_name):
-    """Veriyi çeker ve DataFrame oluşturur"""
-    try:
-        docs = db.collection(collection_name).order_by("created_at", direction=firestore.Query.DESCENDING).stream()
-        items = []
-        for doc in docs:
-            item = doc.to_dict()
-            item['id'] = doc.id
-            item['Sil'] = False 
-            items.append(item)
-        return pd.DataFrame(items)
-    except:
-        return pd.DataFrame()
+    """Koleksiyonun tablosu; Firestore'a ulaşılamazsa son başarılı okumayı döner.
+
+    Tablo süreç genelinde paylaşılır ve koleksiyon sürümü değişince yeniden
+    okunur; `SHARED_FRAME_TTL` dolunca yalnızca sonradan eklenen, güncellenen
+    ve silinen dökümanlar sorgulanır. Son başarılı okuma tablonun kendisidir,
+    ayrıca saklanmaz. Oturumun bekleyen yazmaları dönen kopyaya uygulanır;
+    dönen tablo üzerinde yapılan değişiklikler paylaşılan tabloyu etkilemez.
+    """
+    store = _shared_frames(UID)
+    with _collection_lock(store, collection_name):
+        version = collection_version(collection_name)
+        entry = store["frames"].get(collection_name)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if entry is None or entry["version"] != version:
+            try:
+                df = resilience.call("firestore", _read_collection, collection_name)
+            except Exception as e:
+                if entry is None:
+                    st.error(f"'{collection_name}' okunamadı: {e}")
+                    return pd.DataFrame()
+                df = entry["frame"]
+                st.warning(f"'{collection_name}' okunamadı, {entry['checked_at'].astimezone():%H:%M} tarihli "
+                           f"veri gösteriliyor ({e}).")
+            else:
+                df['Sil'] = False
+                entry = store["frames"][collection_name] = {"version": version, "frame": df, "checked_at": now}
+        elif now - entry["checked_at"] > SHARED_FRAME_TTL:
+            df = entry["frame"]
+            try:
+                fresh = resilience.call("firestore", _refresh_collection, collection_name, df, entry["checked_at"])
+            except Exception:
+                fresh = None        # delta sorgusu başarısızsa tablo bir sonraki süre dolumuna kadar kullanılır
+            entry["checked_at"] = now
+            if fresh is not None:
+                df = fresh
+                # Bağlı önbellekler (grafikler, analizler) de yenilensin
+                version = _bump_version(_collection_versions(), UID, collection_name)
+                store["frames"][collection_name] = {"version": version, "frame": df, "checked_at": now}
+        else:
+            df = entry["frame"]
+    return _write_queue().apply(collection_name, df).copy(deep=False)
         
 def delete_from_db(collection_name, doc_id):
     """Verilen ID'ye sahip dökümanı siler (Tekli)"""
     try:
-        db.collection(collection_name).document(doc_id).delete()
-        st.toast("🗑️ Kayıt Silindi!")
-        time.sleep(0.5)
-        st.rerun()
+        _delete_docs(collection_name, [doc_id])
     except Exception as e:
         st.error(f"Silme hatası: {e}")
+        return
+    flash("🗑️ Kayıt Silindi!")
+    st.rerun()
 
 def update_liability_balance(liability_id, amount_paid):
-    """Ödeme yapıldığında ilgili borç bakiyesini düşer"""
+    """Ödeme yapıldığında ilgili borç bakiyesini düşer (sunucu tarafında artırımla)"""
+    current = get_data("liabilities").query("id == @liability_id")["remaining_amount"].fillna(0.0)
+    # Yerel tabloya bir kez hesaplanan hedef bakiye yazılır; tekrar uygulanması zararsızdır
+    target = float(current.iloc[0]) - amount_paid if not current.empty else None
+    local = {liability_id: {"remaining_amount": target, "updated_at": datetime.datetime.now(datetime.timezone.utc)}}
+
+    def remote():
+        db.collection("liabilities").document(liability_id).update(
+            {"remaining_amount": increment(-amount_paid), "updated_at": server_timestamp()})
+
     try:
-        doc_ref = db.collection("liabilities").document(liability_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            current_bal = float(doc.to_dict().get('remaining_amount', 0.0))
-            new_bal = current_bal - amount_paid
-            doc_ref.update({"remaining_amount": new_bal})
-            st.toast(f"📉 Borç bakiyesi güncellendi! Yeni kalan: {new_bal:,.2f} TL")
+        # Increment tekrarlanırsa bakiye iki kez düşer: yazma yeniden denenmez
+        optimistic_write("liabilities", "Borç bakiyesi",
+                         lambda frame: optimistic.update_rows(frame, local, "liabilities"), remote, retry=False)
     except Exception as e:
         st.error(f"Bakiye güncelleme hatası: {e}")
+        return
+    if target is not None:
+        flash(f"📉 Borç bakiyesi güncellendi! Yeni kalan: {target:,.2f} TL")
+
+@st.cache_data(max_entries=4 * CACHED_USERS, show_spinner=False)
+def _load_custom_exercises(uid, version):
+    """Özel hareketleri okur; yalnızca katalog sürümü değişince Firestore'a gider"""
+    items = []
+    for doc in db.collection("custom_exercises").stream():
+        data = doc.to_dict()
+        reg = data.get('region')
+        name = data.get('name')
+        if reg and name:
+            items.append({"id": doc.id, "region": reg, "name": name})
+    return items
+
+def get_custom_exercises():
+    """Süreç genelinde paylaşılan özel hareket kataloğu"""
+    return _load_custom_exercises(UID, collection_version("custom_exercises"))
 
 def get_full_exercise_map():
     """Standart ve özel hareketleri birleştirir"""
     full_map = {k: v.copy() for k, v in BASE_EXERCISES.items()}
     try:
-        custom_docs = db.collection("custom_exercises").stream()
-        for doc in custom_docs:
-            data = doc.to_dict()
-            reg = data.get('region')
-            name = data.get('name')
-            if reg and name:
-                if reg not in full_map:
-                    full_map[reg] = []
-                full_map[reg].append(name)
-    except: pass
+        custom = get_custom_exercises()
+    except Exception as e:
+        st.toast(f"⚠️ Özel hareketler okunamadı: {e}")
+        custom = []
+    for item in custom:
+        full_map.setdefault(item['region'], []).append(item['name'])
     return full_map
 
+def rerun_fragment():
+    """İçinde bulunulan st.fragment'ı yeniler; tam çalıştırmadaysa uygulamayı yeniler"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
 def speak(text, lang='en'):
+    """Metni seslendirir; işçinin önceden ürettiği ses yoksa istek üzerine canlı üretir"""
+    path = jobs.tts_path(WORKER_DIR, lang, text)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            st.audio(f.read(), format='audio/mp3')
+        return
+    # Rerun'larda gTTS çağrılmaz; ses yalnızca düğmeye basılınca üretilir ve diske yazılır
+    if not st.button("🔊 Seslendir", key=f"speak_{os.path.basename(path)}"):
+        return
     try:
-        tts = gTTS(text=text, lang=lang)
-        fp = io.BytesIO()
-        tts.write_to_fp(fp)
-        st.audio(fp, format='audio/mp3')
-    except: pass
+        with tracing.span("gtts.synthesize", lang=lang, chars=len(text)) as attrs:
+            audio = resilience.call("gtts", jobs.synthesize, text, lang)
+            attrs["bytes"] = len(audio)
+    except Exception as e:
+        st.caption(f"🔇 Seslendirme şu an kullanılamıyor ({e})")
+        return
+    jobs.store_tts(path, audio)
+    st.audio(audio, format='audio/mp3')
 
 def calculate_totals(df):
     """Toplam hesaplama fonksiyonu"""
@@ -168,63 +559,480 @@ def calculate_totals(df):
         st.error(f"Hesaplama Hatası: {e}")
         return 0, 0, 0
 
-@st.cache_data(ttl=600)
+@st.cache_data(max_entries=2, show_spinner=False)
+def _load_prefetched_prices(mtime):
+    """İşçinin çektiği fiyatlar; dosya değişince yeniden okunur"""
+    return jobs.read_prices(WORKER_DIR)
+
 def get_asset_current_price(symbol):
+    """(fiyat, fiyatın alındığı an): işçinin fiyatı `PRICE_MAX_AGE`'den yeniyse o, değilse canlı sorgu.
+
+    Canlı sorgu başarısız olursa sembolün bilinen en yeni fiyatı (işçinin
+    eski fiyatı ya da son canlı sorgu), o da yoksa (0, None) döner (tablolar
+    bu durumda maliyeti gösterir). Hatalar önbelleğe alınmaz.
+    """
+    prices = _load_prefetched_prices(jobs.file_mtime(os.path.join(WORKER_DIR, jobs.PRICES_FILE)))
+    known = []
+    if symbol in prices:
+        known.append((prices[symbol]["price"], datetime.datetime.fromisoformat(prices[symbol]["fetched_at"])))
+        if datetime.datetime.now(datetime.timezone.utc) - known[0][1] <= PRICE_MAX_AGE:
+            return known[0]
     try:
-        ticker = yf.Ticker(symbol)
-        history = ticker.history(period="1d")
-        if not history.empty: return history['Close'].iloc[-1]
-        return 0.0
-    except: return 0.0
-
-def update_daily_activity_from_table(date_str, field, value):
-    """Günlük aktivite tablosunu günceller"""
+        return resilience.remember("yfinance", symbol, fetch_live_price(symbol))
+    except Exception:
+        last = resilience.last_good("yfinance", symbol)[0]
+        known += [last] if last else []
+        return max(known, key=lambda item: item[1]) if known else (0.0, None)
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_live_price(symbol):
+    """(sembolün son kapanışı, sorgu anı); hata verirse önbelleğe girmez (fiyat yoksa 0)"""
+    with tracing.span("yfinance.history", symbol=symbol):
+        price = resilience.call("yfinance", jobs.fetch_price, symbol)
+    return price or 0.0, datetime.datetime.now(datetime.timezone.utc)
+
+@st.cache_resource(max_entries=CACHED_USERS, show_spinner=False)
+def _portfolio_state(uid):
+    """Kullanıcının oturumları arasında paylaşılan pozisyon defteri"""
+    return {"lock": threading.Lock(), "book": None}
+
+def get_portfolio_book(lots, method):
+    """Pozisyon defteri; yalnızca lotları değişen semboller yeniden hesaplanır.
+
+    Lot durumları (Aktif/Kapalı) pozisyonla uyuşmuyorsa düzeltilir; arka plan
+    işçisi fiyatları yalnızca aktif lotların sembolleri için çeker. (defter,
+    lotlar) döner: düzeltme bekleyen yazma olarak kaydedilir ve lotlar
+    yeniden okunur, paylaşılan tablo yerinde değiştirilmez.
+    """
+    state = _portfolio_state(UID)
+    with state["lock"]:
+        state["book"], changed = portfolio.update_book(state["book"], lots, method)
+        book = state["book"]
+    if changed:
+        updates = portfolio.status_updates(lots, book)
+        if updates:
+            save_changes("investments", "Lot durumları", {doc_id: {"status": status} for doc_id, status in updates.items()})
+            lots = get_data("investments")
+    return book, lots
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def render_category_pie(cat_items):
+    """Kategori dağılımı pastasını PNG olarak üretir (özet girdiye göre önbelleklenir)"""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(4, 4))
     try:
-        docs = db.collection("daily_activities").where("date_str", "==", date_str).stream()
-        doc_list = list(docs)
-        data = {field: value, "date_str": date_str}
-        if doc_list:
-            db.collection("daily_activities").document(doc_list[0].id).update({field: value})
-        else:
-            data["created_at"] = firestore.SERVER_TIMESTAMP
-            db.collection("daily_activities").add(data)
-    except: pass
+        ax.pie([v for _, v in cat_items], labels=[k for k, _ in cat_items], autopct='%1.1f%%', startangle=90)
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+def _upsert_by_date(collection_name, date_str, fields):
+    """Günün dökümanını günceller, yoksa oluşturur (yeniden denenebilir: kimlik önceden alınır)"""
+    col = db.collection(collection_name)
+    doc_list = list(col.where("date_str", "==", date_str).limit(1).stream())
+    if doc_list:
+        col.document(doc_list[0].id).update(dict(fields, updated_at=server_timestamp()))
+    else:
+        col.document().set(dict(fields, date_str=date_str, created_at=server_timestamp()))
+
+def update_daily_activity_from_table(date_str, fields):
+    """Günlük aktivite tablosunu günceller; geçici hatalarda yeniden dener, kalıcı hatayı yükseltir"""
+    resilience.call("firestore", _upsert_by_date, "daily_activities", date_str, fields)
 
 def update_measurement_from_table(date_str, weight_val):
-    """Tablodan gelen kilo bilgisini günceller"""
-    try:
-        docs = db.collection("measurements").where("date_str", "==", date_str).stream()
-        doc_list = list(docs)
-        if doc_list:
-            db.collection("measurements").document(doc_list[0].id).update({"weight": weight_val})
-        else:
-            db.collection("measurements").add({
-                "weight": weight_val, 
-                "date_str": date_str, 
-                "created_at": firestore.SERVER_TIMESTAMP
-            })
-    except: pass
+    """Tablodan gelen kilo bilgisini günceller; geçici hatalarda yeniden dener, kalıcı hatayı yükseltir"""
+    resilience.call("firestore", _upsert_by_date, "measurements", date_str, {"weight": weight_val})
+
+def delete_field():
+    """Firestore alan silme işareti"""
+    from firebase_admin import firestore
+    return firestore.DELETE_FIELD
+
+def increment(value):
+    """Firestore sunucu tarafı artırım işareti"""
+    from firebase_admin import firestore
+    return firestore.Increment(value)
+
+@st.cache_data(max_entries=16 * CACHED_USERS, show_spinner=False)
+def _load_habit_months(uid, version, months):
+    """Verilen (yıl, ay) dökümanlarını tek get_all çağrısıyla okur"""
+    refs = [db.collection("habit_logs").document(f"{y}_{m}") for y, m in months]
+    docs = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+    return {(y, m): docs.get(f"{y}_{m}", {}) for y, m in months}
+
+def _habit_month_versions(months):
+    """Ay bazında sürüm demeti; bir ayın kaydı diğer ayların önbelleğini bozmaz"""
+    return tuple(collection_version(f"habit_logs/{y}_{m}") for y, m in months)
+
+def get_habit_months(months):
+    """Birden çok ayın alışkanlık dökümanları {(yıl, ay): veri}"""
+    months = tuple(months)
+    return _load_habit_months(UID, _habit_month_versions(months), months)
+
+@st.cache_data(max_entries=4 * CACHED_USERS, show_spinner=False)
+def _list_habit_months(uid, version):
+    """habit_logs'taki (yıl, ay) dökümanları; yalnızca koleksiyon sürümü değişince listelenir"""
+    months = []
+    for ref in db.collection("habit_logs").list_documents():
+        year, _, month = ref.id.partition("_")
+        if year.isdigit() and month.isdigit():
+            months.append((int(year), int(month)))
+    return sorted(months)
+
+@st.cache_data(max_entries=8 * CACHED_USERS, show_spinner=False)
+def _sleep_history(uid, versions, months, sleep_labels, sleep_hours):
+    """Ayların günlük uyku saatleri; ay sürümleri değişmedikçe yeniden kurulmaz"""
+    daily = build_daily_frame(get_habit_months(months), [], list(sleep_labels), dict(sleep_hours),
+                              until=datetime.date.today())
+    return daily["sleep_hours"]
+
+def sleep_history(sleep_labels, sleep_hours, months):
+    """Son `months` ayın (None: tüm kayıtların) günlük uyku saatleri"""
+    today = datetime.date.today()
+    if months is None:
+        known = _list_habit_months(UID, collection_version("habit_logs"))
+        if not known:
+            return pd.Series(dtype=float)
+        months = (today.year - known[0][0]) * 12 + today.month - known[0][1]
+    # Aralık ay başına denk gelmeyebilir: bir ay fazlası okunur, kırpma grafikte yapılır
+    month_list = tuple(month_range(today, months + 1))
+    return _sleep_history(UID, _habit_month_versions(month_list), month_list,
+                          tuple(sleep_labels), tuple(sleep_hours.items()))
+
+@st.cache_data(max_entries=8 * CACHED_USERS, show_spinner=False)
+def weight_chart(uid, version, range_label, _measurements):
+    """Kilo grafiği: aralığa kırpılmış, günlük ortalamalı ve seyreltilmiş seri (ölçüm sürümü başına önbellekli)"""
+    if "weight" not in _measurements.columns:
+        return pd.DataFrame(columns=["Kilo"])
+    weights = pd.Series(pd.to_numeric(_measurements["weight"], errors="coerce").to_numpy(),
+                        index=pd.DatetimeIndex(_measurements["date"]))
+    weights = weights[weights.index.notna()]
+    return timeseries.chart_series(weights, timeseries.RANGES[range_label]).to_frame("Kilo")
 
 def get_monthly_habit_data(year, month):
     """Belirli bir ayın alışkanlık verilerini çeker"""
-    doc_id = f"{year}_{month}"
-    doc = db.collection("habit_logs").document(doc_id).get()
-    if doc.exists:
-        return doc.to_dict()
-    return {}
+    return get_habit_months([(year, month)])[(year, month)]
 
-def update_monthly_habit_data(year, month, habit_data, sleep_data):
-    """Ayın alışkanlık verilerini kaydeder"""
+# --- ALIŞKANLIK DEĞİŞİKLİKLERİNİN ARTIMLI KAYDI ---
+HABIT_DEBOUNCE_SEC = 3      # son kayıttan bu kadar süre geçmeden yeni yazma yapılmaz
+
+def habit_month_masks(data, habits, sleep_labels, n_days):
+    """Ay dökümanının maskeleri {"habit_bits": {...}, "sleep_bits": {...}}"""
+    return {
+        "habit_bits": encode_month(decode_month(data, habits, n_days, "habit_bits", "habits"), habits),
+        "sleep_bits": encode_month(decode_month(data, sleep_labels, n_days, "sleep_bits", "sleep"), sleep_labels),
+    }
+
+def diff_habit_masks(saved, edited):
+    """Kayıtlı ve düzenlenmiş maskeler arasında değişen alanlar {(grup, isim): maske}"""
+    changes = {}
+    for group, masks in edited.items():
+        for name, mask in masks.items():
+            if saved.get(group, {}).get(name) != mask:
+                changes[(group, name)] = mask
+    return changes
+
+def save_habit_changes(year, month, changes, drop_legacy=False):
+    """Yalnızca değişen alışkanlık/uyku maskelerini birleştirerek (merge) yazar"""
     doc_id = f"{year}_{month}"
-    db.collection("habit_logs").document(doc_id).set({
-        "habits": habit_data,
-        "sleep": sleep_data,
-        "updated_at": firestore.SERVER_TIMESTAMP
-    }, merge=True)
+    data = {"year": year, "month": month, "updated_at": server_timestamp()}
+    for (group, name), mask in changes.items():
+        data.setdefault(group, {})[name] = mask
+    if drop_legacy:
+        data.update({"habits": delete_field(), "sleep": delete_field()})
+    db.collection("habit_logs").document(doc_id).set(data, merge=True)
+    bump_collection_version("habit_logs")
+    bump_collection_version(f"habit_logs/{doc_id}")
+
+def flush_habit_changes(force=False):
+    """Bekleyen alışkanlık değişikliklerini tek yazmada kaydeder (debounce süresine uyarak)"""
+    hs = st.session_state.get("habit_sync")
+    if not hs or not hs["pending"]:
+        return False
+    if not force and time.monotonic() - hs["last_flush"] < HABIT_DEBOUNCE_SEC:
+        return False
+    year, month = hs["month"]
+    save_habit_changes(year, month, hs["pending"], drop_legacy=hs["legacy"])
+    for (group, name), mask in hs["pending"].items():
+        hs["saved"].setdefault(group, {})[name] = mask
+    hs["pending"] = {}
+    hs["legacy"] = False
+    hs["last_flush"] = time.monotonic()
+    return True
+
+# --- CANLI İDMAN TASLAK GÜNLÜĞÜ (WRITE-AHEAD) ---
+# Aktif idman, workout_logs içinde status="active" bir taslak olarak açılır.
+# Her set/hareket/bölüm olayı workout_logs/{id}/draft_log altına küçük bir
+# döküman olarak eklenir; olaylar biriktirilip toplu (batch) yazılır.
+WAL_BATCH_SIZE = 5          # bu kadar olay birikince hemen yazılır
+WAL_DEBOUNCE_SEC = 15       # bekleyen olaylar en geç bu kadar sürede yazılır
+WAL_TTL_DAYS = 14           # draft_log olaylarının expire_at süresi (Firestore TTL)
+
+def empty_live_workout():
+    """Boş canlı idman durumu"""
+    return {
+        "active": False, "start_time": None, "sections": [],
+        "current_section_start": None, "exercises_temp": [],
+        "draft_id": None, "wal_seq": 0, "wal_pending": [], "wal_last_flush": 0.0
+    }
+
+def array_union(values):
+    """Firestore ArrayUnion dönüşümü"""
+    from firebase_admin import firestore
+    return firestore.ArrayUnion(values)
+
+def to_naive(value):
+    """Firestore'dan gelen (UTC etiketli) zamanı kaydedildiği haliyle döndürür"""
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+def wal_open(lw):
+    """Yeni idman için taslak workout_logs dökümanını açar"""
+    _, ref = db.collection("workout_logs").add({
+        "status": "active",
+        "date": lw["start_time"],
+        "date_str": lw["start_time"].strftime("%Y-%m-%d"),
+        "start_time": lw["start_time"],
+        "main_focus": lw["main_focus"],
+        "sections": [],
+        "wal_seq": 0,
+        "created_at": server_timestamp()
+    })
+    lw["draft_id"] = ref.id
+    lw["wal_last_flush"] = time.monotonic()
+
+def wal_flush(lw, header_update=None, set_rows=None):
+    """Bekleyen olayları, set satırlarını ve başlık güncellemesini tek batch ile yazar"""
+    if not lw.get("draft_id") or (not lw["wal_pending"] and not header_update):
+        return
+    log_ref = db.collection("workout_logs").document(lw["draft_id"])
+    expire_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=WAL_TTL_DAYS)
+    batch = db.batch()
+    for event in lw["wal_pending"]:
+        batch.set(log_ref.collection("draft_log").document(f"{event['seq']:06d}"), dict(event, expire_at=expire_at))
+    for doc_id, row in set_row_docs(set_rows or []):
+        batch.set(db.collection("workout_sets").document(doc_id), row)
+    update = {"wal_seq": lw["wal_seq"], "updated_at": server_timestamp()}
+    update.update(header_update or {})
+    batch.update(log_ref, update)
+    batch.commit()
+    lw["wal_pending"] = []
+    lw["wal_last_flush"] = time.monotonic()
+
+def wal_append(lw, kind, payload, force=False):
+    """Olayı günlüğe ekler; eşik ya da bekleme süresi dolduysa yazar"""
+    if not lw.get("draft_id"):
+        return
+    lw["wal_seq"] += 1
+    lw["wal_pending"].append({"seq": lw["wal_seq"], "kind": kind, "payload": payload, "ts": datetime.datetime.now()})
+    if force or len(lw["wal_pending"]) >= WAL_BATCH_SIZE or time.monotonic() - lw["wal_last_flush"] >= WAL_DEBOUNCE_SEC:
+        wal_flush(lw)
+
+def get_active_workout_drafts():
+    """Tamamlanmamış (status=active) idman taslaklarını listeler"""
+    docs = db.collection("workout_logs").where("status", "==", "active").stream()
+    return [dict(doc.to_dict(), id=doc.id) for doc in docs]
+
+def wal_restore(draft_id):
+    """Taslağın olay günlüğünü baştan oynatarak canlı idman durumunu kurar"""
+    log_ref = db.collection("workout_logs").document(draft_id)
+    head = log_ref.get().to_dict() or {}
+    lw = empty_live_workout()
+    lw.update({
+        "active": True, "start_time": to_naive(head.get("start_time")) or datetime.datetime.now(),
+        "main_focus": head.get("main_focus", "Genel İdman"), "draft_id": draft_id,
+        "wal_seq": head.get("wal_seq", 0), "wal_last_flush": time.monotonic()
+    })
+    current_sets = []
+    for doc in log_ref.collection("draft_log").order_by("seq").stream():
+        event = doc.to_dict()
+        kind, payload = event.get("kind"), event.get("payload", {})
+        lw["wal_seq"] = max(lw["wal_seq"], event.get("seq", 0))
+        if kind == "section_start":
+            lw["current_section_name"] = payload["name"]
+            lw["current_section_start"] = to_naive(payload["start"])
+            lw["exercises_temp"] = []
+            current_sets = []
+        elif kind == "set":
+            current_sets.append(payload)
+            # Dinlenme sayacı devam ettirilen idmanda da son setten sayar
+            lw["last_set_at"] = to_naive(event.get("ts")) or lw.get("last_set_at")
+        elif kind == "exercise":
+            lw["exercises_temp"].append({"name": payload["name"], "sets": current_sets})
+            current_sets = []
+        elif kind == "section_end":
+            lw["sections"].append({"name": payload["name"], "duration": payload["duration"], "exercises": lw["exercises_temp"]})
+            lw["current_section_start"] = None
+            lw["exercises_temp"] = []
+            current_sets = []
+    return lw, current_sets
+
+def wal_discard(draft_id):
+    """Yarım kalan taslağı ve olay günlüğünü siler (mezar taşıyla; rollup deltası görsün)"""
+    log_ref = db.collection("workout_logs").document(draft_id)
+    refs = [doc.reference for doc in log_ref.collection("draft_log").stream()]
+    refs += [doc.reference for doc in db.collection("workout_sets").where("workout_id", "==", draft_id).stream()]
+    refs.append(log_ref)
+    for i in range(0, len(refs), 500):
+        batch = db.batch()
+        for ref in refs[i:i + 500]:
+            batch.delete(ref)
+        batch.commit()
+    snapshot.record_deletions(db, "workout_logs", [draft_id])
+    bump_collection_version("workout_logs")
+
+# --- SET TABLOSU VE GÜÇ ANALİZİ ---
+# Her set workout_sets koleksiyonunda tek döküman olarak tutulur. Analiz
+# durumu süreç başına bir kez kurulur, sonra yeni/silinen idmanlarla
+# artımlı olarak güncellenir (workout_analytics.merge_rollups). İşçinin
+# gece hazırladığı set tablosu varsa yalnızca sonrasında değişen idmanlar okunur.
+
+def set_row_docs(rows):
+    """Set satırlarını (döküman_id, veri) çiftlerine çevirir; id'ler tekrar yazmada aynı kalır"""
+    counters = {}
+    for row in rows:
+        key = (row["workout_id"], row["section_idx"])
+        counters[key] = counters.get(key, -1) + 1
+        doc_id = f"{row['workout_id']}_{row['section_idx']:02d}_{counters[key]:03d}"
+        date = datetime.datetime.strptime(row["date_str"], "%Y-%m-%d") if row.get("date_str") else None
+        yield doc_id, dict(row, date=date, created_at=server_timestamp())
+
+def write_workout_sets(rows):
+    """Set satırlarını 500'lük batch'ler halinde yazar"""
+    docs = list(set_row_docs(rows))
+    for i in range(0, len(docs), 500):
+        batch = db.batch()
+        for doc_id, row in docs[i:i + 500]:
+            batch.set(db.collection("workout_sets").document(doc_id), row)
+        batch.commit()
+
+@st.cache_resource(max_entries=CACHED_USERS)
+def _strength_state(uid):
+    """Kullanıcının oturumları arasında paylaşılan güç analizi durumu"""
+    return {"lock": threading.Lock(), "rollup": None}
+
+def load_strength_rollup():
+    """İşçinin set tablosu + sonrasında değişen idmanlar; tablo yoksa tüm setleri okur"""
+    frame, built_at = jobs.load_strength_sets(WORKER_DIR, UID)
+    if frame is None:
+        return new_rollup_state([doc.to_dict() for doc in db.collection("workout_sets").stream()])
+    since = built_at - SNAPSHOT_CLOCK_SKEW
+    changed = {doc.to_dict().get("workout_id")
+               for doc in db.collection("workout_sets").where("created_at", ">", since).select(["workout_id"]).stream()}
+    changed.discard(None)
+    changed = sorted(changed)
+    new_rows = [doc.to_dict()
+                for i in range(0, len(changed), 30)
+                for doc in db.collection("workout_sets").where("workout_id", "in", changed[i:i + 30]).stream()]
+    removed = snapshot.fetch_tombstones(db, "workout_logs", since) | set(changed)
+    return merge_rollups(rollup_from_frame(frame), new_rows, removed)
+
+def get_strength_rollup():
+    """Analiz durumunu (ilk çağrıda kurarak) döndürür"""
+    state = _strength_state(UID)
+    with state["lock"]:
+        if state["rollup"] is None:
+            state["rollup"] = load_strength_rollup()
+        return state["rollup"]
+
+def strength_rollup_apply(new_rows=None, removed_workout_ids=None):
+    """Yüklenmiş analiz durumunu yalnızca değişen idmanlarla günceller"""
+    state = _strength_state(UID)
+    with state["lock"]:
+        if state["rollup"] is not None:
+            state["rollup"] = merge_rollups(dict(state["rollup"]), new_rows, removed_workout_ids)
+
+# --- İDMAN GEÇMİŞİ (SAYFALI, HAFİF PROJEKSİYON) ---
+HISTORY_PAGE_SIZE = 10
+WORKOUT_SUMMARY_FIELDS = ["date_str", "main_focus", "total_duration", "status", "created_at"]
+
+@st.cache_data(max_entries=64 * CACHED_USERS, show_spinner=False)
+def _load_workout_page(uid, version, cursor, page_size):
+    """Bir geçmiş sayfasını yalnızca özet alanlarıyla okur; (satırlar, sonraki_imleç) döner"""
+    query = db.collection("workout_logs").select(WORKOUT_SUMMARY_FIELDS).order_by("created_at", direction="DESCENDING")
+    if cursor is not None:
+        query = query.start_after({"created_at": cursor})
+    docs = list(query.limit(page_size + 1).stream())
+    rows = [dict(doc.to_dict(), id=doc.id) for doc in docs[:page_size]]
+    next_cursor = rows[-1].get("created_at") if len(docs) > page_size and rows else None
+    return rows, next_cursor
+
+def get_workout_page(cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """Özet geçmiş sayfası (tamamlanmamış taslaklar hariç)"""
+    rows, next_cursor = _load_workout_page(UID, collection_version("workout_logs"), cursor, page_size)
+    return [r for r in rows if r.get("status") != "active"], next_cursor
+
+@st.cache_data(max_entries=256 * CACHED_USERS, show_spinner=False)
+def _load_workout_detail(uid, version, log_id):
+    """Tek bir idmanın bölüm/set detayını okur"""
+    doc = db.collection("workout_logs").document(log_id).get()
+    return (doc.to_dict() or {}).get("sections", []) if doc.exists else []
+
+def get_workout_detail(log_id):
+    """İdman detayı; yalnızca açılan kayıt için okunur"""
+    return _load_workout_detail(UID, collection_version("workout_logs"), log_id)
+
+@st.cache_data(max_entries=8 * CACHED_USERS, show_spinner=False)
+def _load_month_workouts(uid, version, year, month):
+    """Aylık tablo için o ayın idmanlarını (tarih + odak) okur"""
+    last_day = calendar.monthrange(year, month)[1]
+    docs = (db.collection("workout_logs")
+            .where("date_str", ">=", f"{year}-{month:02d}-01")
+            .where("date_str", "<=", f"{year}-{month:02d}-{last_day:02d}")
+            .select(["date_str", "main_focus", "status"]).stream())
+    return [dict(doc.to_dict(), id=doc.id) for doc in docs]
+
+def get_month_workouts(year, month):
+    """Ayın tamamlanmış idmanları (DataFrame)"""
+    rows = [r for r in _load_month_workouts(UID, collection_version("workout_logs"), year, month) if r.get("status") != "active"]
+    return pd.DataFrame(rows, columns=["id", "date_str", "main_focus"])
+
+@st.cache_data(max_entries=4 * CACHED_USERS, show_spinner=False)
+def _load_unindexed_workout_ids(uid, version):
+    """Set tablosuna henüz açılmamış idman kayıtlarının id'leri"""
+    docs = db.collection("workout_logs").select(["sets_indexed", "status"]).stream()
+    return [doc.id for doc in docs if not doc.to_dict().get("sets_indexed") and doc.to_dict().get("status") != "active"]
+
+def get_unindexed_workout_ids():
+    return _load_unindexed_workout_ids(UID, collection_version("workout_logs"))
+
+def index_legacy_workouts(df_logs):
+    """Set tablosuna hiç açılmamış eski idman kayıtlarını indeksler"""
+    count = 0
+    for _, row in df_logs.iterrows():
+        rows = flatten_workout_sets(row['id'], row.get('date_str'), row.get('sections'))
+        write_workout_sets(rows)
+        db.collection("workout_logs").document(row['id']).update({"sets_indexed": True})
+        strength_rollup_apply(new_rows=rows, removed_workout_ids=[row['id']])
+        count += 1
+    return count
+
+def delete_workout_log(log_id):
+    """İdman kaydını set satırlarıyla birlikte siler"""
+    refs = [doc.reference for doc in db.collection("workout_sets").where("workout_id", "==", log_id).stream()]
+    for i in range(0, len(refs), 500):
+        batch = db.batch()
+        for ref in refs[i:i + 500]:
+            batch.delete(ref)
+        batch.commit()
+    strength_rollup_apply(removed_workout_ids=[log_id])
+    delete_from_db("workout_logs", log_id)
 
 # --- 5. ARAYÜZ VE MODÜLLER ---
+reconcile_writes()
+show_flash()
 st.sidebar.title("🚀 Life OS")
+if _write_queue().pending:
+    with st.sidebar:
+        pending_writes_indicator()
+if AUTH_ENABLED:
+    st.sidebar.caption(f"👤 {st.user.get('name') or st.user.get('email') or UID}")
+    st.sidebar.button("Çıkış Yap", on_click=st.logout)
 main_module = st.sidebar.selectbox("Modül Seç", ["Dil Asistanı", "Fiziksel Takip", "Alışkanlık Takibi", "Finans Merkezi"])
+tracing.set_page(main_module)
 
 # ==========================================
 # MODÜL 1: DİL ASİSTANI
@@ -254,7 +1062,7 @@ if main_module == "Dil Asistanı":
             try:
                 df = pd.read_excel(up_file)
                 df.columns = df.columns.str.strip()
-                count = 0
+                words = []
                 progress_bar = st.progress(0)
                 for idx, row in df.iterrows():
                     word_data = {}
@@ -277,11 +1085,10 @@ if main_module == "Dil Asistanı":
 
                     if word_data["tr"] and (word_data["en"] or word_data["de"]):
                         word_data["learned_count"] = 0
-                        save_to_db("vocabulary", word_data)
-                        count += 1
+                        words.append(word_data)
                     progress_bar.progress((idx + 1) / len(df))
-                st.success(f"{count} kelime eklendi!")
-                time.sleep(1)
+                save_changes("vocabulary", f"{len(words)} kelime", inserts=words)
+                flash(f"✅ {len(words)} kelime eklendi!")
                 st.rerun()
             except Exception as e: st.error(f"Hata: {e}")
 
@@ -313,7 +1120,8 @@ if main_module == "Dil Asistanı":
             if len(df) < 5: 
                 st.warning("Yeterli kelime yok.")
                 return
-            st.session_state['data'] = df.sample(min(15, len(df))).to_dict('records')
+            # Oturumda yalnızca kart kimlikleri tutulur; kartlar paylaşılan tablodan okunur
+            st.session_state['data'] = df['id'].sample(min(15, len(df))).tolist()
             st.session_state.update({'quiz_started': True, 'score': 0, 'idx': 0, 'show': False})
 
         if not st.session_state['quiz_started']:
@@ -322,9 +1130,16 @@ if main_module == "Dil Asistanı":
             q_data = st.session_state['data']
             idx = st.session_state['idx']
             if idx < len(q_data):
-                q = q_data[idx]
+                cards = get_data("vocabulary")
+                card = cards[cards['id'] == q_data[idx]]
+                if card.empty:
+                    # Test sırasında silinen kart atlanır
+                    st.session_state['idx'] += 1
+                    st.rerun()
+                q = card.iloc[0].to_dict()
                 st.progress((idx)/len(q_data))
                 st.markdown(f"### ❓ {q.get('en') or q.get('de')}")
+                speak(str(q.get('en') or q.get('de')), 'en' if q.get('en') else 'de')
                 if st.session_state.get('show'):
                     st.success(f"**{q['tr']}**")
                     st.info(q.get('sentence_source'))
@@ -354,146 +1169,177 @@ elif main_module == "Fiziksel Takip":
     
     FULL_EXERCISE_LIST = get_full_exercise_map()
     
-    tabs = st.tabs(["📅 Fiziksel Aktivite Takip Tablosu", "⚡ Canlı İdman Modu", "⚙️ Hareket Tanımla"])
+    def render_workout_detail(sections):
+        """Bir idmanın bölüm sekmeleri ve set tabloları"""
+        if not sections:
+            st.write("Bu idmanda kayıtlı bölüm yok.")
+            return
+        sec_tabs = st.tabs([f"{s['name']} ({s.get('duration',0)} dk)" for s in sections])
+        for i, section in enumerate(sections):
+            with sec_tabs[i]:
+                exercises = section.get('exercises', [])
+                for ex in exercises:
+                    st.markdown(f"#### 🏋️‍♂️ {ex['name']}")
+                    sets_data = []
+                    for s_idx, s in enumerate(ex.get('sets', [])):
+                        if "cardio_duration" in s:
+                            sets_data.append({
+                                "Tip": "Kardiyo",
+                                "Süre": f"{s.get('cardio_duration')} dk",
+                                "Mesafe": f"{s.get('distance')} km",
+                                "Hız": s.get('speed'),
+                                "Eğim": s.get('incline'),
+                                "Kalori": s.get('calories')
+                            })
+                        else:
+                            set_type = "DROP SET 🔻" if s.get('is_dropset') else f"Set {s_idx + 1}"
+                            sets_data.append({
+                                "Set Tipi": set_type,
+                                "Ağırlık": f"{s.get('weight')} KG",
+                                "Tekrar": s.get('reps'),
+                                "ROM": s.get('rom'),
+                                "Zorlanma": s.get('difficulty')
+                            })
+                    if sets_data: st.table(pd.DataFrame(sets_data))
+                    st.divider()
 
-    with tabs[0]:
-        st.header("Fiziksel Aktivite Takip Tablosu")
-        
-        df_meas = get_data("measurements")
-        if not df_meas.empty:
-            if 'date_str' in df_meas.columns:
-                df_meas['date'] = pd.to_datetime(df_meas['date_str'], errors='coerce')
-                df_meas = df_meas.sort_values('date')
-                st.line_chart(df_meas, x='date', y='weight')
-            else:
-                df_meas['date'] = pd.to_datetime([])
+    @traced_fragment
+    def workout_history():
+        """Sayfalı idman geçmişi; detay yalnızca açılan kayıt için okunur"""
+        if 'history_cursors' not in st.session_state:
+            st.session_state.history_cursors = [None]
+            st.session_state.history_open = None
+        cursors = st.session_state.history_cursors
+
+        rows, next_cursor = get_workout_page(cursors[-1])
+        if not rows and len(cursors) == 1:
+            st.write("Henüz kayıtlı idman yok.")
+            return
+
+        for row in rows:
+            is_open = st.session_state.history_open == row['id']
+            c1, c2, c3 = st.columns([6, 1, 1])
+            c1.write(f"📅 {row.get('date_str','-')} - {row.get('main_focus', 'Genel')} (Toplam: {row.get('total_duration', 0)} dk)")
+            if c2.button("🔼 Kapat" if is_open else "🔍 Detay", key=f"open_log_{row['id']}"):
+                st.session_state.history_open = None if is_open else row['id']
+                rerun_fragment()
+            if c3.button("🗑️ Sil", key=f"del_log_{row['id']}"):
+                delete_workout_log(row['id'])
+            if is_open:
+                with st.container(border=True):
+                    render_workout_detail(get_workout_detail(row['id']))
+
+        p1, p2, p3 = st.columns([1, 2, 1])
+        if len(cursors) > 1 and p1.button("⬅️ Önceki", key="history_prev"):
+            cursors.pop()
+            rerun_fragment()
+        p2.caption(f"Sayfa {len(cursors)}")
+        if next_cursor is not None and p3.button("Sonraki ➡️", key="history_next"):
+            cursors.append(next_cursor)
+            rerun_fragment()
+
+    @traced_fragment(run_every=WAL_DEBOUNCE_SEC)
+    def wal_autoflush():
+        """Bekleyen taslak olaylarını kullanıcı etkileşimi olmasa da yazar"""
+        lw = st.session_state.get("live_workout")
+        if lw and lw.get("wal_pending") and time.monotonic() - lw["wal_last_flush"] >= WAL_DEBOUNCE_SEC:
+            wal_flush(lw)
+
+    @traced_fragment
+    def set_logger(current_section):
+        """Set/kardiyo girişi ve set listesi; set eklemek yalnızca bu kısmı yeniler"""
+        if 'current_sets' not in st.session_state:
+            st.session_state.current_sets = []
+
+        if current_section == "Kardiyo":
+            with st.form("cardio_adder"):
+                c1, c2, c3 = st.columns(3)
+                c_dur = c1.number_input("Süre (dk)", min_value=0.0, step=1.0)
+                c_dist = c2.number_input("Mesafe (km)", min_value=0.0, step=0.1)
+                c_cal = c3.number_input("Kalori", min_value=0, step=10)
+                c4, c5 = st.columns(2)
+                c_inc = c4.number_input("Eğim", min_value=0.0, step=0.5)
+                c_spd = c5.number_input("Hız", min_value=0.0, step=0.5)
+
+                if st.form_submit_button("Kardiyo Ekle"):
+                    new_set = {
+                        "cardio_duration": c_dur,
+                        "distance": c_dist,
+                        "calories": c_cal,
+                        "incline": c_inc,
+                        "speed": c_spd
+                    }
+                    st.session_state.current_sets.append(new_set)
+                    wal_append(st.session_state.live_workout, "set", new_set)
+                    st.toast("Kardiyo verisi eklendi")
         else:
-            df_meas = pd.DataFrame(columns=['date', 'weight'])
-
-        st.divider()
-        st.subheader(f"Aylık Takip Listesi ({datetime.datetime.now().strftime('%B %Y')})")
-        
-        df_logs = get_data("workout_logs")
-        df_daily = get_data("daily_activities")
-        
-        current_month = datetime.datetime.now().month
-        current_year = datetime.datetime.now().year
-        days_in_month = calendar.monthrange(current_year, current_month)[1]
-        
-        cols = [str(d) for d in range(1, days_in_month + 1)]
-        rows = ["İdman (Ana Odak)", "Kilo", "15 Şınav", "10 Muscle Up", "10 Barfiks"]
-        dashboard_df = pd.DataFrame(index=rows, columns=cols).fillna("")
-        
-        if not df_logs.empty and 'date_str' in df_logs.columns:
-            df_logs['date'] = pd.to_datetime(df_logs['date_str'])
-            month_logs = df_logs[(df_logs['date'].dt.month == current_month) & (df_logs['date'].dt.year == current_year)]
-            for _, row in month_logs.iterrows():
-                day = str(row['date'].day)
-                existing = dashboard_df.at["İdman (Ana Odak)", day]
-                dashboard_df.at["İdman (Ana Odak)", day] = f"{existing} ✅ {row.get('main_focus', '')}".strip()
-
-        if not df_meas.empty and 'date' in df_meas.columns:
-            month_meas = df_meas[(df_meas['date'].dt.month == current_month) & (df_meas['date'].dt.year == current_year)]
-            for _, row in month_meas.iterrows():
-                day = str(row['date'].day)
-                dashboard_df.at["Kilo", day] = str(row['weight'])
-
-        if not df_daily.empty and 'date_str' in df_daily.columns:
-            df_daily['date'] = pd.to_datetime(df_daily['date_str'])
-            month_daily = df_daily[(df_daily['date'].dt.month == current_month) & (df_daily['date'].dt.year == current_year)]
-            for _, row in month_daily.iterrows():
-                day = str(row['date'].day)
-                if pd.notna(row.get('pushups')): dashboard_df.at["15 Şınav", day] = str(row.get('pushups'))
-                if pd.notna(row.get('muscleups')): dashboard_df.at["10 Muscle Up", day] = str(row.get('muscleups'))
-                if pd.notna(row.get('pullups')): dashboard_df.at["10 Barfiks", day] = str(row.get('pullups'))
-
-        edited_dashboard = st.data_editor(dashboard_df, use_container_width=True, key="phys_table")
-        
-        if st.button("Tablodaki Değişiklikleri Kaydet", type="primary"):
-            for day in cols:
-                try:
-                    date_obj = datetime.date(current_year, current_month, int(day))
-                    date_str = date_obj.strftime("%Y-%m-%d")
-                    
-                    w_val = edited_dashboard.at["Kilo", day]
-                    if w_val and str(w_val).strip() != "":
-                        update_measurement_from_table(date_str, float(w_val))
-                    
-                    push_val = edited_dashboard.at["15 Şınav", day]
-                    musc_val = edited_dashboard.at["10 Muscle Up", day]
-                    pull_val = edited_dashboard.at["10 Barfiks", day]
-                    
-                    if push_val or musc_val or pull_val:
-                        docs = db.collection("daily_activities").where("date_str", "==", date_str).stream()
-                        doc_list = list(docs)
-                        data_update = {}
-                        if push_val: data_update["pushups"] = push_val
-                        if musc_val: data_update["muscleups"] = musc_val
-                        if pull_val: data_update["pullups"] = pull_val
-                        
-                        if data_update:
-                            if doc_list:
-                                db.collection("daily_activities").document(doc_list[0].id).update(data_update)
-                            else:
-                                data_update["date_str"] = date_str
-                                data_update["created_at"] = firestore.SERVER_TIMESTAMP
-                                db.collection("daily_activities").add(data_update)
-                except: pass
-            st.success("Tablo başarıyla güncellendi!")
-            time.sleep(1)
-            st.rerun()
-
-        st.divider()
-        st.subheader("Geçmiş İdman Detayları (Liste)")
-        if not df_logs.empty:
-            for idx, row in df_logs.iterrows():
-                log_title = f"📅 {row.get('date_str','-')} - {row.get('main_focus', 'Genel')} (Toplam: {row.get('total_duration', 0)} dk)"
-                with st.expander(log_title):
-                    sections = row.get('sections', [])
-                    if sections:
-                        sec_tabs = st.tabs([f"{s['name']} ({s.get('duration',0)} dk)" for s in sections])
-                        for i, section in enumerate(sections):
-                            with sec_tabs[i]:
-                                exercises = section.get('exercises', [])
-                                for ex in exercises:
-                                    st.markdown(f"#### 🏋️‍♂️ {ex['name']}")
-                                    sets_data = []
-                                    for s_idx, s in enumerate(ex.get('sets', [])):
-                                        if "cardio_duration" in s:
-                                            sets_data.append({
-                                                "Tip": "Kardiyo",
-                                                "Süre": f"{s.get('cardio_duration')} dk",
-                                                "Mesafe": f"{s.get('distance')} km",
-                                                "Hız": s.get('speed'),
-                                                "Eğim": s.get('incline'),
-                                                "Kalori": s.get('calories')
-                                            })
-                                        else:
-                                            set_type = "DROP SET 🔻" if s.get('is_dropset') else f"Set {s_idx + 1}"
-                                            sets_data.append({
-                                                "Set Tipi": set_type,
-                                                "Ağırlık": f"{s.get('weight')} KG",
-                                                "Tekrar": s.get('reps'),
-                                                "ROM": s.get('rom'),
-                                                "Zorlanma": s.get('difficulty')
-                                            })
-                                    if sets_data: st.table(pd.DataFrame(sets_data))
-                                    st.divider()
-                    if st.button("Bu İdman Kaydını Sil", key=f"del_log_{row['id']}"):
-                        delete_from_db("workout_logs", row['id'])
-
-    with tabs[1]:
+            with st.form("set_adder"):
+                c1, c2, c3 = st.columns(3)
+                s_weight = c1.number_input("Ağırlık (KG)", min_value=0.0, step=2.5)
+                s_reps = c2.number_input("Tekrar", min_value=0, step=1)
+                s_rom = c3.selectbox("ROM", ["Tam", "Yarım", "Kontrollü"])
+                c4, c5 = st.columns(2)
+                s_rpe = c4.selectbox("Zorlanma (RPE)", ["Düşük", "Orta", "Yüksek", "Tükeniş"])
+                is_drop = c5.checkbox("Bu bir Drop Set mi?")
+
+                if st.form_submit_button("Seti Ekle"):
+                    new_set = {
+                        "weight": s_weight, "reps": s_reps, 
+                        "rom": s_rom, "difficulty": s_rpe,
+                        "is_dropset": is_drop
+                    }
+                    st.session_state.current_sets.append(new_set)
+                    wal_append(st.session_state.live_workout, "set", new_set)
+                    st.session_state.live_workout["last_set_at"] = datetime.datetime.now()
+                    st.toast("Set Eklendi")
+
+            # Dinlenme geri sayımı son setten başlar ve tarayıcıda işler
+            rest_seconds = st.selectbox("⏳ Dinlenme Sayacı", [0] + live_timer.REST_PRESETS, key="rest_seconds",
+                                        format_func=lambda sec: f"{sec} sn" if sec else "Kapalı")
+            if rest_seconds:
+                st.iframe(live_timer.timer_html([], st.session_state.live_workout.get("last_set_at"), rest_seconds),
+                          height=50)
+
+        if st.session_state.current_sets:
+            st.write("Eklenen Setler/Veriler:")
+            st.dataframe(pd.DataFrame(st.session_state.current_sets), use_container_width=True)
+
+        pending = st.session_state.live_workout.get("wal_pending")
+        if pending:
+            st.caption(f"💾 {len(pending)} olay kaydı bekliyor")
+            wal_autoflush()
+
+    @traced_fragment
+    def live_workout_panel(exercise_map):
+        """Canlı idman paneli; etkileşimler yalnızca bu bölümü yeniden çizer"""
         st.header("⚡ Canlı İdman Paneli")
         
         if 'live_workout' not in st.session_state:
-            st.session_state.live_workout = {
-                "active": False, "start_time": None, "sections": [],
-                "current_section_start": None, "exercises_temp": [] 
-            }
+            st.session_state.live_workout = empty_live_workout()
 
         lw = st.session_state.live_workout
 
         if not lw["active"]:
+            if 'workout_drafts' not in st.session_state:
+                try:
+                    st.session_state.workout_drafts = get_active_workout_drafts()
+                except Exception:
+                    st.session_state.workout_drafts = []
+            for draft in st.session_state.workout_drafts:
+                with st.container(border=True):
+                    started = to_naive(draft.get("start_time"))
+                    started_txt = started.strftime("%d.%m.%Y %H:%M") if started else "-"
+                    st.warning(f"⏸️ Yarım kalan idman: **{draft.get('main_focus', 'Genel İdman')}** (Başlangıç: {started_txt})")
+                    d1, d2 = st.columns(2)
+                    if d1.button("▶️ Kaldığın Yerden Devam Et", key=f"resume_{draft['id']}"):
+                        st.session_state.live_workout, st.session_state.current_sets = wal_restore(draft["id"])
+                        st.session_state.workout_drafts = []
+                        rerun_fragment()
+                    if d2.button("🗑️ Taslağı Sil", key=f"discard_{draft['id']}"):
+                        wal_discard(draft["id"])
+                        st.session_state.workout_drafts = [d for d in st.session_state.workout_drafts if d["id"] != draft["id"]]
+                        rerun_fragment()
+
             st.subheader("Bugünkü İdman Planı")
             c1, c2, c3, c4 = st.columns(4)
             body_parts = ["Göğüs", "Sırt", "Bacak", "Omuz", "Ön Kol", "Arka Kol", "Yok"]
@@ -514,11 +1360,16 @@ elif main_module == "Fiziksel Takip":
                 lw["active"] = True
                 lw["start_time"] = datetime.datetime.now()
                 lw["main_focus"] = final_focus
-                st.rerun()
+                wal_open(lw)
+                rerun_fragment()
         
         else:
-            elapsed = datetime.datetime.now() - lw["start_time"]
-            st.info(f"⏱️ İdman Süresi: {str(elapsed).split('.')[0]} | Odak: {lw['main_focus']}")
+            st.info(f"🎯 Odak: {lw['main_focus']}")
+            # Süreler tarayıcıda sayılır; sayaç için rerun yapılmaz
+            st.iframe(live_timer.timer_html([
+                ("⏱️ İdman", lw["start_time"]),
+                (f"🟢 {lw.get('current_section_name')}", lw["current_section_start"]),
+            ]), height=50)
             
             with st.container(border=True):
                 st.subheader("Bölüm Ekle / Yönet")
@@ -529,62 +1380,20 @@ elif main_module == "Fiziksel Takip":
                         lw["current_section_start"] = datetime.datetime.now()
                         lw["current_section_name"] = sec_name
                         lw["exercises_temp"] = []
-                        st.rerun()
+                        wal_append(lw, "section_start", {"name": sec_name, "start": lw["current_section_start"]})
+                        rerun_fragment()
                 else:
-                    sec_elapsed = datetime.datetime.now() - lw["current_section_start"]
-                    st.success(f"🟢 Şu an çalışılan: **{lw['current_section_name']}** ({str(sec_elapsed).split('.')[0]})")
+                    st.success(f"🟢 Şu an çalışılan: **{lw['current_section_name']}**")
                     
                     st.markdown("### Hareket Ekle")
                     current_section = lw["current_section_name"]
-                    exercise_options = FULL_EXERCISE_LIST.get(current_section, ["Diğer"]) + ["Diğer"]
+                    exercise_options = exercise_map.get(current_section, ["Diğer"]) + ["Diğer"]
                     
                     selected_exercise = st.selectbox("Hareket Seç", exercise_options)
                     if selected_exercise == "Diğer":
                         selected_exercise = st.text_input("Hareket Adını Yaz")
 
-                    if 'current_sets' not in st.session_state:
-                        st.session_state.current_sets = []
-
-                    if current_section == "Kardiyo":
-                        with st.form("cardio_adder"):
-                            c1, c2, c3 = st.columns(3)
-                            c_dur = c1.number_input("Süre (dk)", min_value=0.0, step=1.0)
-                            c_dist = c2.number_input("Mesafe (km)", min_value=0.0, step=0.1)
-                            c_cal = c3.number_input("Kalori", min_value=0, step=10)
-                            c4, c5 = st.columns(2)
-                            c_inc = c4.number_input("Eğim", min_value=0.0, step=0.5)
-                            c_spd = c5.number_input("Hız", min_value=0.0, step=0.5)
-                            
-                            if st.form_submit_button("Kardiyo Ekle"):
-                                st.session_state.current_sets.append({
-                                    "cardio_duration": c_dur,
-                                    "distance": c_dist,
-                                    "calories": c_cal,
-                                    "incline": c_inc,
-                                    "speed": c_spd
-                                })
-                                st.toast("Kardiyo verisi eklendi")
-                    else:
-                        with st.form("set_adder"):
-                            c1, c2, c3 = st.columns(3)
-                            s_weight = c1.number_input("Ağırlık (KG)", min_value=0.0, step=2.5)
-                            s_reps = c2.number_input("Tekrar", min_value=0, step=1)
-                            s_rom = c3.selectbox("ROM", ["Tam", "Yarım", "Kontrollü"])
-                            c4, c5 = st.columns(2)
-                            s_rpe = c4.selectbox("Zorlanma (RPE)", ["Düşük", "Orta", "Yüksek", "Tükeniş"])
-                            is_drop = c5.checkbox("Bu bir Drop Set mi?")
-                            
-                            if st.form_submit_button("Seti Ekle"):
-                                st.session_state.current_sets.append({
-                                    "weight": s_weight, "reps": s_reps, 
-                                    "rom": s_rom, "difficulty": s_rpe,
-                                    "is_dropset": is_drop
-                                })
-                                st.toast("Set Eklendi")
-
-                    if st.session_state.current_sets:
-                        st.write("Eklenen Setler/Veriler:")
-                        st.dataframe(pd.DataFrame(st.session_state.current_sets), use_container_width=True)
+                    set_logger(current_section)
 
                     if st.button("✅ Hareketi Bölüme Kaydet"):
                         if selected_exercise and st.session_state.current_sets:
@@ -592,10 +1401,10 @@ elif main_module == "Fiziksel Takip":
                                 "name": selected_exercise,
                                 "sets": st.session_state.current_sets
                             })
+                            wal_append(lw, "exercise", {"name": selected_exercise})
                             st.session_state.current_sets = []
-                            st.success(f"{selected_exercise} kaydedildi!")
-                            time.sleep(1)
-                            st.rerun()
+                            st.toast(f"✅ {selected_exercise} kaydedildi!")
+                            rerun_fragment()
                         else:
                             st.warning("Hareket adı veya veri girilmedi.")
 
@@ -608,14 +1417,21 @@ elif main_module == "Fiziksel Takip":
                     if st.button("⏹️ Bölümü Bitir ve Kaydet"):
                         end_time = datetime.datetime.now()
                         duration_mins = int((end_time - lw["current_section_start"]).total_seconds() / 60)
-                        lw["sections"].append({
+                        section = {
                             "name": lw["current_section_name"],
                             "duration": duration_mins,
                             "exercises": lw["exercises_temp"]
-                        })
+                        }
+                        lw["sections"].append(section)
+                        sec_idx = len(lw["sections"]) - 1
+                        wal_append(lw, "section_end", {"name": section["name"], "duration": duration_mins})
+                        wal_flush(
+                            lw, {"sections": array_union([dict(section, order=sec_idx)])},
+                            set_rows=flatten_workout_sets(lw["draft_id"], lw["start_time"].strftime("%Y-%m-%d"), [section], sec_idx)
+                        )
                         lw["current_section_start"] = None
                         lw["exercises_temp"] = []
-                        st.rerun()
+                        rerun_fragment()
 
             st.divider()
             if lw["sections"]:
@@ -637,25 +1453,128 @@ elif main_module == "Fiziksel Takip":
                         max_difficulty = diff_score
                         hardest_part = sec['name']
 
-                log_data = {
-                    "date": datetime.datetime.now(),
-                    "main_focus": lw["main_focus"],
-                    "total_duration": total_dur,
-                    "sections": lw["sections"],
-                    "hardest_part": hardest_part,
-                    "date_str": str(datetime.date.today())
-                }
-                save_to_db("workout_logs", log_data)
+                if lw.get("draft_id"):
+                    # Bölümler ve setler zaten taslağa yazıldı; burada yalnızca özet ve durum güncellenir
+                    wal_flush(lw, {"status": "done", "total_duration": total_dur, "hardest_part": hardest_part, "sets_indexed": True})
+                    bump_collection_version("workout_logs")
+                    log_id, log_date_str = lw["draft_id"], lw["start_time"].strftime("%Y-%m-%d")
+                else:
+                    log_data = {
+                        "date": datetime.datetime.now(),
+                        "main_focus": lw["main_focus"],
+                        "total_duration": total_dur,
+                        "sections": lw["sections"],
+                        "hardest_part": hardest_part,
+                        "date_str": str(datetime.date.today()),
+                        "sets_indexed": True
+                    }
+                    log_id, log_date_str = save_to_db("workout_logs", log_data), log_data["date_str"]
+                    write_workout_sets(flatten_workout_sets(log_id, log_date_str, lw["sections"]))
+                # Taslak yolunda setler bölüm sonlarında yazıldı; analiz o setleri okumuş olabilir
+                strength_rollup_apply(new_rows=flatten_workout_sets(log_id, log_date_str, lw["sections"]),
+                                      removed_workout_ids=[log_id])
                 
-                st.balloons()
-                st.success(f"İdman Kaydedildi! Süre: {total_dur} dk | En Zor: {hardest_part}")
-                st.session_state.live_workout = {
-                    "active": False, "start_time": None, "sections": [], 
-                    "current_section_start": None, "exercises_temp": []
-                }
-                time.sleep(3)
+                flash(f"🎉 İdman Kaydedildi! Süre: {total_dur} dk | En Zor: {hardest_part}", balloons=True)
+                st.session_state.live_workout = empty_live_workout()
+                st.rerun()
+
+    tabs = st.tabs(["📅 Fiziksel Aktivite Takip Tablosu", "⚡ Canlı İdman Modu", "⚙️ Hareket Tanımla", "📈 Güç Analizi"])
+
+    with tabs[0]:
+        st.header("Fiziksel Aktivite Takip Tablosu")
+        
+        df_meas = get_data("measurements")
+        if not df_meas.empty:
+            if 'date_str' in df_meas.columns:
+                df_meas['date'] = pd.to_datetime(df_meas['date_str'], errors='coerce')
+                df_meas = df_meas.sort_values('date')
+                weight_range = st.radio("Kilo Grafiği Aralığı", list(timeseries.RANGES), index=3, horizontal=True, key="weight_range")
+                st.line_chart(weight_chart(UID, collection_version("measurements"), weight_range, df_meas))
+            else:
+                df_meas['date'] = pd.to_datetime([])
+        else:
+            df_meas = pd.DataFrame(columns=['date', 'weight'])
+
+        st.divider()
+        st.subheader(f"Aylık Takip Listesi ({datetime.datetime.now().strftime('%B %Y')})")
+        
+        df_daily = get_data("daily_activities")
+        
+        current_month = datetime.datetime.now().month
+        current_year = datetime.datetime.now().year
+        month_logs = get_month_workouts(current_year, current_month)
+        days_in_month = calendar.monthrange(current_year, current_month)[1]
+        
+        cols = [str(d) for d in range(1, days_in_month + 1)]
+        rows = ["İdman (Ana Odak)", "Kilo", "15 Şınav", "10 Muscle Up", "10 Barfiks"]
+        dashboard_df = pd.DataFrame(index=rows, columns=cols).fillna("")
+        
+        if not month_logs.empty:
+            month_logs['date'] = pd.to_datetime(month_logs['date_str'])
+            for _, row in month_logs.iterrows():
+                day = str(row['date'].day)
+                existing = dashboard_df.at["İdman (Ana Odak)", day]
+                dashboard_df.at["İdman (Ana Odak)", day] = f"{existing} ✅ {row.get('main_focus', '')}".strip()
+
+        if not df_meas.empty and 'date' in df_meas.columns:
+            month_meas = df_meas[(df_meas['date'].dt.month == current_month) & (df_meas['date'].dt.year == current_year)]
+            for _, row in month_meas.iterrows():
+                day = str(row['date'].day)
+                dashboard_df.at["Kilo", day] = str(row['weight'])
+
+        if not df_daily.empty and 'date_str' in df_daily.columns:
+            df_daily['date'] = pd.to_datetime(df_daily['date_str'])
+            month_daily = df_daily[(df_daily['date'].dt.month == current_month) & (df_daily['date'].dt.year == current_year)]
+            for _, row in month_daily.iterrows():
+                day = str(row['date'].day)
+                if pd.notna(row.get('pushups')): dashboard_df.at["15 Şınav", day] = str(row.get('pushups'))
+                if pd.notna(row.get('muscleups')): dashboard_df.at["10 Muscle Up", day] = str(row.get('muscleups'))
+                if pd.notna(row.get('pullups')): dashboard_df.at["10 Barfiks", day] = str(row.get('pullups'))
+
+        edited_dashboard = st.data_editor(dashboard_df, use_container_width=True, key="phys_table")
+        
+        if st.button("Tablodaki Değişiklikleri Kaydet", type="primary"):
+            failed = []
+            for day in cols:
+                try:
+                    date_obj = datetime.date(current_year, current_month, int(day))
+                except ValueError:
+                    continue
+                date_str = date_obj.strftime("%Y-%m-%d")
+                try:
+                    w_val = edited_dashboard.at["Kilo", day]
+                    if w_val and str(w_val).strip() != "":
+                        update_measurement_from_table(date_str, float(w_val))
+                    
+                    push_val = edited_dashboard.at["15 Şınav", day]
+                    musc_val = edited_dashboard.at["10 Muscle Up", day]
+                    pull_val = edited_dashboard.at["10 Barfiks", day]
+                    
+                    data_update = {}
+                    if push_val: data_update["pushups"] = push_val
+                    if musc_val: data_update["muscleups"] = musc_val
+                    if pull_val: data_update["pullups"] = pull_val
+                    if data_update:
+                        update_daily_activity_from_table(date_str, data_update)
+                except ValueError:
+                    failed.append(f"{day} (geçersiz değer)")
+                except Exception as e:
+                    failed.append(f"{day} ({e})")
+            bump_collection_version("measurements")
+            bump_collection_version("daily_activities")
+            if failed:
+                st.error("Şu günler kaydedilemedi: " + ", ".join(failed))
+            else:
+                flash("✅ Tablo başarıyla güncellendi!")
                 st.rerun()
 
+        st.divider()
+        st.subheader("Geçmiş İdman Detayları (Liste)")
+        workout_history()
+
+    with tabs[1]:
+        live_workout_panel(FULL_EXERCISE_LIST)
+
     with tabs[2]:
         st.header("⚙️ Yeni Hareket Ekle")
         st.info("Listede olmayan hareketleri buraya ekleyerek 'Canlı İdman' modunda kullanabilirsiniz.")
@@ -667,8 +1586,7 @@ elif main_module == "Fiziksel Takip":
             if st.form_submit_button("Hareketi Kaydet"):
                 if ce_name:
                     save_to_db("custom_exercises", {"region": ce_region, "name": ce_name})
-                    st.success(f"{ce_name} ({ce_region}) listeye eklendi!")
-                    time.sleep(1)
+                    flash(f"✅ {ce_name} ({ce_region}) listeye eklendi!")
                     st.rerun()
                 else:
                     st.warning("Hareket ismi giriniz.")
@@ -676,8 +1594,7 @@ elif main_module == "Fiziksel Takip":
         st.divider()
         st.subheader("Eklenen Özel Hareketler")
         try:
-            c_docs = db.collection("custom_exercises").stream()
-            c_data = [{"Bölge": doc.to_dict().get('region'), "Hareket": doc.to_dict().get('name'), "id": doc.id} for doc in c_docs]
+            c_data = [{"Bölge": item['region'], "Hareket": item['name'], "id": item['id']} for item in get_custom_exercises()]
             if c_data:
                 c_df = pd.DataFrame(c_data)
                 for index, row in c_df.iterrows():
@@ -688,8 +1605,45 @@ elif main_module == "Fiziksel Takip":
                         delete_from_db("custom_exercises", row['id'])
             else:
                 st.write("Henüz özel hareket eklenmemiş.")
-        except:
-            st.write("Veri çekilemedi.")
+        except Exception as e:
+            st.write(f"Veri çekilemedi: {e}")
+
+    with tabs[3]:
+        st.header("📈 Güç Analizi")
+
+        legacy_ids = get_unindexed_workout_ids()
+        if legacy_ids:
+            st.info(f"{len(legacy_ids)} eski idman kaydı henüz set tablosuna aktarılmadı.")
+            if st.button("Eski İdmanları İndeksle"):
+                refs = [db.collection("workout_logs").document(i) for i in legacy_ids]
+                legacy_logs = pd.DataFrame([dict(doc.to_dict(), id=doc.id) for doc in db.get_all(refs) if doc.exists])
+                n = index_legacy_workouts(legacy_logs)
+                bump_collection_version("workout_logs")
+                st.success(f"{n} idman indekslendi!")
+                st.rerun()
+
+        rollup = get_strength_rollup()
+        summary = rollup["summary"]
+        if summary.empty:
+            st.info("Analiz için henüz kuvvet seti kaydı yok.")
+        else:
+            ex_name = st.selectbox("Hareket", summary.index.tolist())
+            ex_row = summary.loc[ex_name]
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Tahmini 1RM Rekoru", f"{ex_row['best_e1rm']:.1f} KG")
+            m2.metric("En Yüksek Ağırlık", f"{ex_row['best_weight']:.1f} KG")
+            m3.metric("Toplam Hacim", f"{ex_row['volume']:,.0f} KG")
+            m4.metric("Set Sayısı", int(ex_row['sets']))
+
+            st.subheader("Tahmini 1RM Gelişimi")
+            st.line_chart(e1rm_progress(rollup["sets"], ex_name))
+
+            st.subheader("Haftalık Tonaj")
+            st.bar_chart(rollup["weekly"])
+
+            st.subheader("Son Kişisel Rekorlar")
+            prs = personal_records(rollup["sets"]).tail(15).iloc[::-1]
+            st.dataframe(prs, hide_index=True, use_container_width=True)
 
 # ==========================================
 # MODÜL 3: ALIŞKANLIK TAKİBİ (YENİ)
@@ -716,78 +1670,119 @@ elif main_module == "Alışkanlık Takibi":
     
     days_in_month = calendar.monthrange(current_year, current_month)[1]
     cols = [str(d) for d in range(1, days_in_month + 1)]
+    month_key = (current_year, current_month)
     
     current_data = get_monthly_habit_data(current_year, current_month)
-    db_habits = current_data.get("habits", {})
-    db_sleep = current_data.get("sleep", {})
     
     st.subheader("Günlük Rutin")
-    habit_df = pd.DataFrame(index=habits_list, columns=cols)
-    for h in habits_list:
-        if h in db_habits:
-            for day_idx, val in enumerate(db_habits[h]):
-                if day_idx < len(cols):
-                    habit_df.iat[habits_list.index(h), day_idx] = val
-        else:
-            habit_df.loc[h] = False
+    habit_df = pd.DataFrame(decode_month(current_data, habits_list, days_in_month, "habit_bits", "habits"), index=habits_list, columns=cols)
 
     edited_habits = st.data_editor(habit_df, use_container_width=True, key="habit_editor")
     
     st.divider()
     
     st.subheader("Uyku Süresi / Gün")
-    sleep_df = pd.DataFrame(index=sleep_list, columns=cols)
-    for s in sleep_list:
-        if s in db_sleep:
-            for day_idx, val in enumerate(db_sleep[s]):
-                if day_idx < len(cols):
-                    sleep_df.iat[sleep_list.index(s), day_idx] = val
-        else:
-            sleep_df.loc[s] = False
+    sleep_df = pd.DataFrame(decode_month(current_data, sleep_list, days_in_month, "sleep_bits", "sleep"), index=sleep_list, columns=cols)
 
     edited_sleep = st.data_editor(sleep_df, use_container_width=True, key="sleep_editor")
     
-    # --- UYKU GRAFİĞİ (YENİ EKLENDİ) ---
+    # --- UYKU GRAFİĞİ ---
     st.subheader("Uyku Süresi Analizi")
-    sleep_chart_data = []
     sleep_value_map = {
         "8 Saat": 8, "7 Saat": 7, "6 Saat": 6, "5 Saat": 5, 
         "4 Saat": 4, "3 Saat": 3, "2 Saat": 2, "1 Saat": 1, "1 Saatten Az": 0.5
     }
-    
-    for day in cols:
-        sleep_val = 0
-        for label in sleep_list:
-            if edited_sleep.at[label, day] == True:
-                sleep_val = sleep_value_map.get(label, 0)
-                break
-        
-        if sleep_val > 0:
-             try:
-                 date_obj = datetime.date(current_year, current_month, int(day))
-                 sleep_chart_data.append({"Date": date_obj, "Saat": sleep_val})
-             except: pass
-             
-    if sleep_chart_data:
-        chart_df = pd.DataFrame(sleep_chart_data).set_index("Date")
-        st.line_chart(chart_df)
+    sleep_range = st.radio("Aralık", list(timeseries.RANGES), horizontal=True, key="sleep_range")
+    # Bu ay tablodaki (henüz kaydedilmemiş olabilecek) değerlerden, önceki aylar kayıtlardan gelir
+    this_month = build_daily_frame({month_key: {"sleep_bits": encode_month(edited_sleep.to_numpy(dtype=bool), sleep_list)}},
+                                   [], sleep_list, sleep_value_map)["sleep_hours"]
+    sleep_hours = this_month
+    if timeseries.RANGES[sleep_range] != 1:
+        past = sleep_history(sleep_list, sleep_value_map, timeseries.RANGES[sleep_range])
+        sleep_hours = pd.concat([past[past.index < this_month.index[0]], this_month])
+    sleep_chart = timeseries.chart_series(sleep_hours, timeseries.RANGES[sleep_range], end=datetime.date.today())
+    if not sleep_chart.empty:
+        st.line_chart(sleep_chart.rename("Saat"))
     else:
         st.info("Grafik için veri giriniz.")
 
-    # --- KAYDETME ---
-    if st.button("Tüm Değişiklikleri Kaydet", type="primary"):
-        habits_to_save = {}
-        for idx, row in edited_habits.iterrows():
-            habits_to_save[idx] = row.tolist()
-            
-        sleep_to_save = {}
-        for idx, row in edited_sleep.iterrows():
-            sleep_to_save[idx] = row.tolist()
-            
-        update_monthly_habit_data(current_year, current_month, habits_to_save, sleep_to_save)
-        st.success("Alışkanlıklar başarıyla kaydedildi!")
-        time.sleep(1)
-        st.rerun()
+    # --- KAYDETME (hücre bazlı, gecikmeli) ---
+    # Her düzenleme yeniden çalıştırmada kayıtlı maskelerle karşılaştırılır;
+    # yalnızca değişen alışkanlık/uyku satırlarının maskeleri bekleyen kuyruğa
+    # girer ve debounce süresi dolunca tek bir merge yazmasıyla gönderilir.
+    stored_masks = habit_month_masks(current_data, habits_list, sleep_list, days_in_month)
+    hs = st.session_state.get("habit_sync")
+    if not hs or hs["month"] != month_key:
+        hs = st.session_state.habit_sync = {"month": month_key, "saved": {}, "pending": {}, "legacy": False, "last_flush": 0.0}
+    if not hs["pending"]:
+        # Bekleyen değişiklik yokken başka bir oturumun kaydını da temel al
+        hs["saved"] = stored_masks
+
+    edited_masks = {
+        "habit_bits": encode_month(edited_habits.to_numpy(dtype=bool), habits_list),
+        "sleep_bits": encode_month(edited_sleep.to_numpy(dtype=bool), sleep_list),
+    }
+    changes = diff_habit_masks(hs["saved"], edited_masks)
+    if changes:
+        if current_data and "habit_bits" not in current_data:
+            # Eski biçimli ay: ilk kayıtta tüm maskeler yazılır, liste alanları silinir
+            changes = {(g, n): mask for g, masks in edited_masks.items() for n, mask in masks.items()}
+            hs["legacy"] = True
+        hs["pending"].update(changes)
+    flush_habit_changes()
+
+    save_col, status_col = st.columns([1, 3])
+    if save_col.button("Tüm Değişiklikleri Kaydet", type="primary"):
+        flush_habit_changes(force=True)
+
+    @traced_fragment(run_every=HABIT_DEBOUNCE_SEC)
+    def habit_autoflush():
+        """Debounce süresi dolan bekleyen değişiklikleri kaydeder ve durumu gösterir"""
+        flush_habit_changes()
+        pending = st.session_state.habit_sync["pending"]
+        if pending:
+            st.caption(f"⏳ {len(pending)} satır kaydedilmeyi bekliyor…")
+        else:
+            st.caption("✅ Tüm değişiklikler kaydedildi.")
+
+    with status_col:
+        if hs["pending"]:
+            habit_autoflush()
+        else:
+            st.caption("✅ Tüm değişiklikler kaydedildi.")
+
+    # --- ÇOK AYLI ANALİZ ---
+    st.divider()
+    st.header("📊 Alışkanlık Analizi")
+    range_opts = {"Son 3 Ay": 3, "Son 6 Ay": 6, "Son 12 Ay": 12, "Son 24 Ay": 24}
+    range_label = st.radio("Dönem", list(range_opts.keys()), index=2, horizontal=True)
+    months = month_range(datetime.date.today(), range_opts[range_label])
+    daily = build_daily_frame(get_habit_months(months), habits_list, sleep_list, sleep_value_map, until=datetime.date.today())
+
+    if daily[habits_list].to_numpy().any():
+        stats = pd.DataFrame({
+            "Tamamlanma %": (completion_rates(daily, habits_list) * 100).round(1),
+        }).join(streaks(daily, habits_list).rename(columns={"current": "Güncel Seri", "longest": "En Uzun Seri"}))
+        stats["Uyku Korelasyonu"] = habit_sleep_correlation(daily, habits_list).round(2)
+        st.dataframe(stats, use_container_width=True)
+
+        st.subheader("Aylık Tamamlanma Oranı")
+        monthly = monthly_completion(daily, habits_list)
+        monthly.index = monthly.index.astype(str)
+        st.line_chart(monthly * 100)
+
+        st.subheader("Günlük Tamamlanma Isı Haritası")
+        st.vega_lite_chart(yearly_heatmap(daily, habits_list), {
+            "mark": "rect",
+            "encoding": {
+                "x": {"field": "day", "type": "ordinal", "title": "Gün"},
+                "y": {"field": "month", "type": "ordinal", "title": "Ay"},
+                "color": {"field": "rate", "type": "quantitative", "title": "Oran", "scale": {"scheme": "greens"}},
+                "tooltip": [{"field": "month"}, {"field": "day"}, {"field": "rate", "format": ".0%"}]
+            }
+        }, use_container_width=True)
+    else:
+        st.info("Seçilen dönemde alışkanlık kaydı yok.")
 
 # ==========================================
 # MODÜL 4: FİNANS MERKEZİ (FULL + GÜNCEL)
@@ -826,10 +1821,8 @@ elif main_module == "Finans Merkezi":
         st.divider()
         if not df_exp.empty:
             df_exp['amount'] = pd.to_numeric(df_exp['amount'], errors='coerce').fillna(0)
-            cat_sum = df_exp.groupby("category")["amount"].sum()
-            fig, ax = plt.subplots(figsize=(4, 4))
-            ax.pie(cat_sum, labels=cat_sum.index, autopct='%1.1f%%', startangle=90)
-            st.pyplot(fig)
+            cat_sum = df_exp.groupby("category", observed=True)["amount"].sum().round(2)
+            st.image(render_category_pie(tuple(cat_sum.items())))
 
     # --- TAB 2: HARCAMA ---
     with tabs[1]:
@@ -843,9 +1836,9 @@ elif main_module == "Finans Merkezi":
             amount_in = c3.number_input("Tutar (TL)", min_value=0.0, step=10.0)
             
             c4, c5, c6 = st.columns(3)
-            cat_in = c4.selectbox("Tür", ["Market", "Yiyecek", "İçecek", "Ulaşım", "Eğlence", "Kasap", "Supplement", "Yatırım", "MISIR Seyahat Harcaması", "Diğer"])
-            method_in = c5.selectbox("Şekil", ["Kredi Kartı", "Nakit", "Banka Kartı"])
-            nec_in = c6.selectbox("Gerekli mi?", ["Evet", "Hayır"])
+            cat_in = c4.selectbox("Tür", schemas.EXPENSE_CATEGORIES)
+            method_in = c5.selectbox("Şekil", schemas.EXPENSE_METHODS)
+            nec_in = c6.selectbox("Gerekli mi?", schemas.NECESSITY)
             desc_in = st.text_area("Açıklama")
             
             if st.form_submit_button("Harcamayı Kaydet"):
@@ -856,23 +1849,54 @@ elif main_module == "Finans Merkezi":
                 })
                 st.rerun()
 
+        with st.expander("📥 Banka Ekstresi İçe Aktar (CSV / XLSX)"):
+            stmt_file = st.file_uploader("Ekstre Dosyası", type=["csv", "xlsx"], key="stmt_file")
+            if stmt_file is not None:
+                preview = statement_import.read_preview(stmt_file, stmt_file.name)
+                if preview.empty:
+                    st.warning("Dosyada okunacak satır bulunamadı.")
+                else:
+                    st.dataframe(preview.head(5), hide_index=True, use_container_width=True)
+                    guess = statement_import.detect_mapping(preview.columns)
+                    stmt_cols = list(preview.columns)
+                    none_opt = "—"
+                    c1, c2, c3, c4 = st.columns(4)
+                    map_date = c1.selectbox("Tarih Sütunu", stmt_cols, index=stmt_cols.index(guess["date"]) if guess["date"] else 0)
+                    map_place = c2.selectbox("Yer Sütunu", stmt_cols, index=stmt_cols.index(guess["place"]) if guess["place"] else 0)
+                    map_amount = c3.selectbox("Tutar Sütunu", stmt_cols, index=stmt_cols.index(guess["amount"]) if guess["amount"] else 0)
+                    map_method = c4.selectbox("Ödeme Şekli Sütunu", [none_opt] + stmt_cols,
+                                              index=stmt_cols.index(guess["method"]) + 1 if guess["method"] else 0)
+                    negative_share = statement_import.parse_amounts(preview[map_amount]).lt(0).mean()
+                    c5, c6, c7 = st.columns(3)
+                    stmt_method = c5.selectbox("Varsayılan Ödeme Şekli", ["Kredi Kartı", "Banka Kartı", "Nakit"])
+                    stmt_nec = c6.selectbox("Gerekli mi?", ["Evet", "Hayır"], key="stmt_nec")
+                    stmt_sign = c7.radio("Harcamalar ekstrede", ["Eksi (-) tutarlı", "Artı (+) tutarlı"],
+                                         index=0 if negative_share >= 0.5 else 1)
+                    if st.button("İçe Aktarmayı Başlat", type="primary"):
+                        stmt_progress = st.empty()
+                        mapping = {"date": map_date, "place": map_place, "amount": map_amount,
+                                   "method": None if map_method == none_opt else map_method}
+                        stats = statement_import.import_statement(
+                            db, stmt_file, stmt_file.name, mapping, existing=df_exp,
+                            default_method=stmt_method, necessity=stmt_nec,
+                            debits_negative=stmt_sign.startswith("Eksi"), created_at=server_timestamp(),
+                            progress=lambda s: stmt_progress.caption(
+                                f"{s['rows']} satır okundu · {s['written']} yazıldı · {s['duplicates']} mükerrer"),
+                        )
+                        bump_collection_version("expenses")
+                        flash(f"📥 {stats['written']} harcama eklendi, {stats['duplicates']} mükerrer ve "
+                                 f"{stats['invalid']} geçersiz satır atlandı ({stats['batches']} toplu yazma).")
+                        st.rerun()
+
         st.divider()
         st.subheader("Harcama Kayıtları")
         
         if not df_exp.empty:
+            # Tipler şemadan gelir (schemas.py): metinler Arrow, seçenekli alanlar kategorik
             cols = ['Sil', 'date_str', 'place', 'amount', 'category', 'method', 'necessity', 'desc', 'id']
-            for col in cols:
-                if col not in df_exp.columns and col != 'Sil': df_exp[col] = None
-            
             clean_df = df_exp[cols].copy()
-            clean_df['Sil'] = clean_df['Sil'].astype(bool)
-            clean_df['date_str'] = pd.to_datetime(clean_df['date_str'], errors='coerce').dt.date
-            clean_df['place'] = clean_df['place'].astype(str)
-            clean_df['amount'] = pd.to_numeric(clean_df['amount'], errors='coerce').fillna(0.0)
-            clean_df['category'] = clean_df['category'].astype(str)
-            clean_df['method'] = clean_df['method'].astype(str)
-            clean_df['necessity'] = clean_df['necessity'].astype(str)
-            clean_df['desc'] = clean_df['desc'].astype(str)
+            clean_df['date_str'] = clean_df['date_str'].dt.date
+            clean_df['amount'] = clean_df['amount'].fillna(0.0)
             
             edited_df = st.data_editor(
                 clean_df,
@@ -881,9 +1905,9 @@ elif main_module == "Finans Merkezi":
                     "date_str": st.column_config.DateColumn("Tarih", format="YYYY-MM-DD"),
                     "place": "Yer",
                     "amount": st.column_config.NumberColumn("Tutar", format="%.2f TL"),
-                    "category": st.column_config.SelectboxColumn("Kategori", options=["Market", "Yiyecek", "İçecek", "Ulaşım", "Eğlence", "Kasap", "Supplement", "Yatırım", "MISIR Seyahat Harcaması", "Diğer"]),
-                    "method": "Ödeme Şekli",
-                    "necessity": st.column_config.SelectboxColumn("Gerekli?", options=["Evet", "Hayır"]),
+                    "category": st.column_config.SelectboxColumn("Kategori", options=list(clean_df['category'].cat.categories)),
+                    "method": st.column_config.SelectboxColumn("Ödeme Şekli", options=list(clean_df['method'].cat.categories)),
+                    "necessity": st.column_config.SelectboxColumn("Gerekli?", options=schemas.NECESSITY),
                     "desc": "Açıklama",
                     "id": None 
                 },
@@ -898,32 +1922,33 @@ elif main_module == "Finans Merkezi":
                     delete_multiple_docs("expenses", to_delete)
             
             if st.button("Tablodaki Değişiklikleri Kaydet (Harcama)"):
-                for index, row in edited_df.iterrows():
-                    if row['id']: 
+                # Yalnızca değişen ve yeni satırlar yazılır; tablo yerelde hemen güncellenir
+                changed, added = optimistic.changed_rows(clean_df, edited_df, cols[1:-1])
+                updates, inserts = {}, []
+                for index, row in changed.iterrows():
                         update_data = {
                             "date": datetime.datetime.combine(row['date_str'], datetime.time.min) if row['date_str'] else None,
                             "date_str": str(row['date_str']),
-                            "place": str(row['place']),
+                            "place": schemas.text_value(row['place']),
                             "amount": float(row['amount']),
-                            "category": str(row['category']),
-                            "method": str(row['method']),
-                            "necessity": str(row['necessity']),
-                            "desc": str(row['desc'])
+                            "category": schemas.text_value(row['category']),
+                            "method": schemas.text_value(row['method']),
+                            "necessity": schemas.text_value(row['necessity']),
+                            "desc": schemas.text_value(row['desc'])
                         }
-                        update_data = {k: v for k, v in update_data.items() if v is not None}
-                        db.collection("expenses").document(row['id']).update(update_data)
-                    else:
-                         save_to_db("expenses", {
+                        updates[row['id']] = {k: v for k, v in update_data.items() if v is not None}
+                for index, row in added.iterrows():
+                        inserts.append({
                             "date": datetime.datetime.combine(row['date_str'], datetime.time.min) if row['date_str'] else datetime.datetime.now(),
-                            "place": str(row['place']),
+                            "place": schemas.text_value(row['place']),
                             "amount": float(row['amount']),
-                            "category": str(row['category']),
-                            "method": str(row['method']),
-                            "necessity": str(row['necessity']),
-                            "desc": str(row['desc'])
+                            "category": schemas.text_value(row['category']),
+                            "method": schemas.text_value(row['method']),
+                            "necessity": schemas.text_value(row['necessity']),
+                            "desc": schemas.text_value(row['desc'])
                         })
-                st.success("Güncellendi!")
-                time.sleep(1)
+                save_changes("expenses", f"{len(updates) + len(inserts)} harcama satırı", updates, inserts)
+                flash("✅ Güncellendi!")
                 st.rerun()
 
     # --- TAB 3: ÖDEME ---
@@ -944,7 +1969,7 @@ elif main_module == "Finans Merkezi":
             p_place = c3.text_input("Ödeme Yapılan Kurum")
             
             c4, c5 = st.columns(2)
-            p_type = c4.selectbox("Tür", ["Kredi Kartı Borcu", "Fatura", "Kredi", "Diğer"])
+            p_type = c4.selectbox("Tür", schemas.PAYMENT_TYPES)
             p_acc = c5.text_input("Ödeme Aracı", value="Maaş Kartı")
             
             p_link = st.selectbox("Bu Ödeme Hangi Borçtan Düşülsün?", list(liability_options.keys()))
@@ -965,17 +1990,9 @@ elif main_module == "Finans Merkezi":
         st.divider()
         if not df_pay.empty:
             cols_p = ['Sil', 'date_str', 'category', 'amount', 'place', 'account', 'desc', 'id']
-            for col in cols_p:
-                 if col not in df_pay.columns and col != 'Sil': df_pay[col] = None
-            
             clean_df_p = df_pay[cols_p].copy()
-            clean_df_p['Sil'] = clean_df_p['Sil'].astype(bool)
-            clean_df_p['date_str'] = pd.to_datetime(clean_df_p['date_str'], errors='coerce').dt.date
-            clean_df_p['amount'] = pd.to_numeric(clean_df_p['amount'], errors='coerce').fillna(0.0)
-            clean_df_p['category'] = clean_df_p['category'].astype(str)
-            clean_df_p['place'] = clean_df_p['place'].astype(str)
-            clean_df_p['account'] = clean_df_p['account'].astype(str)
-            clean_df_p['desc'] = clean_df_p['desc'].astype(str)
+            clean_df_p['date_str'] = clean_df_p['date_str'].dt.date
+            clean_df_p['amount'] = clean_df_p['amount'].fillna(0.0)
 
             edited_df_p = st.data_editor(
                 clean_df_p,
@@ -985,7 +2002,7 @@ elif main_module == "Finans Merkezi":
                     "amount": st.column_config.NumberColumn("Tutar", format="%.2f TL"),
                     "place": "Ödeme Yapılan Kurum",
                     "account": "Ödeme Aracı",
-                    "category": st.column_config.SelectboxColumn("Tür", options=["Kredi Kartı Borcu", "Fatura", "Kredi", "Diğer"]),
+                    "category": st.column_config.SelectboxColumn("Tür", options=list(clean_df_p['category'].cat.categories)),
                     "id": None
                 },
                 hide_index=True,
@@ -999,28 +2016,29 @@ elif main_module == "Finans Merkezi":
                     delete_multiple_docs("payments", to_del_p)
             
             if st.button("Tablodaki Değişiklikleri Kaydet (Ödeme)"):
-                for index, row in edited_df_p.iterrows():
-                    if row['id']:
-                        db.collection("payments").document(row['id']).update({
-                            "place": str(row['place']), 
+                changed, added = optimistic.changed_rows(clean_df_p, edited_df_p, cols_p[1:-1])
+                updates, inserts = {}, []
+                for index, row in changed.iterrows():
+                        updates[row['id']] = {
+                            "place": schemas.text_value(row['place']), 
                             "amount": float(row['amount']), 
-                            "desc": str(row['desc']),
-                            "account": str(row['account']),
-                            "category": str(row['category']),
+                            "desc": schemas.text_value(row['desc']),
+                            "account": schemas.text_value(row['account']),
+                            "category": schemas.text_value(row['category']),
                             "date": datetime.datetime.combine(row['date_str'], datetime.time.min) if row['date_str'] else None,
                             "date_str": str(row['date_str'])
-                        })
-                    else:
-                        save_to_db("payments", {
+                        }
+                for index, row in added.iterrows():
+                        inserts.append({
                             "date": datetime.datetime.combine(row['date_str'], datetime.time.min) if row['date_str'] else datetime.datetime.now(),
                             "amount": float(row['amount']), 
-                            "category": str(row['category']), 
-                            "place": str(row['place']), 
-                            "account": str(row['account']), 
-                            "desc": str(row['desc'])
+                            "category": schemas.text_value(row['category']), 
+                            "place": schemas.text_value(row['place']), 
+                            "account": schemas.text_value(row['account']), 
+                            "desc": schemas.text_value(row['desc'])
                         })
-                st.success("Güncellendi!")
-                time.sleep(1)
+                save_changes("payments", f"{len(updates) + len(inserts)} ödeme satırı", updates, inserts)
+                flash("✅ Güncellendi!")
                 st.rerun()
 
     # --- TAB 4: BORÇ / ALACAK ---
@@ -1039,13 +2057,8 @@ elif main_module == "Finans Merkezi":
         
         if not df_lia.empty:
             cols_l = ['Sil', 'name', 'remaining_amount', 'id']
-            for col in cols_l:
-                if col not in df_lia.columns and col != 'Sil': df_lia[col] = None
-            
             clean_df_l = df_lia[cols_l].copy()
-            clean_df_l['Sil'] = clean_df_l['Sil'].astype(bool)
-            clean_df_l['name'] = clean_df_l['name'].astype(str)
-            clean_df_l['remaining_amount'] = pd.to_numeric(clean_df_l['remaining_amount'], errors='coerce').fillna(0.0)
+            clean_df_l['remaining_amount'] = clean_df_l['remaining_amount'].fillna(0.0)
             
             edited_lia = st.data_editor(
                 clean_df_l,
@@ -1072,7 +2085,7 @@ elif main_module == "Finans Merkezi":
             d1, d2, d3 = st.columns(3)
             d_person = d1.text_input("Kişi")
             d_amount = d2.number_input("Miktar", min_value=0.0)
-            d_curr = d3.selectbox("Birim", ["TL", "USD", "EUR", "Altın"])
+            d_curr = d3.selectbox("Birim", schemas.CURRENCIES)
             
             d4, d5 = st.columns(2)
             d_date = d4.date_input("Verilme Tarihi")
@@ -1090,25 +2103,17 @@ elif main_module == "Finans Merkezi":
 
         if not df_debt.empty:
             cols_d = ['Sil', 'type', 'person', 'amount', 'currency', 'date_str', 'due_date_str', 'status', 'id']
-            for col in cols_d:
-                 if col not in df_debt.columns and col != 'Sil': df_debt[col] = None
-
             clean_df_d = df_debt[cols_d].copy()
-            clean_df_d['Sil'] = clean_df_d['Sil'].astype(bool)
-            clean_df_d['amount'] = pd.to_numeric(clean_df_d['amount'], errors='coerce').fillna(0.0)
-            clean_df_d['type'] = clean_df_d['type'].astype(str)
-            clean_df_d['person'] = clean_df_d['person'].astype(str)
-            clean_df_d['currency'] = clean_df_d['currency'].astype(str)
-            clean_df_d['status'] = clean_df_d['status'].astype(str)
-            clean_df_d['date_str'] = pd.to_datetime(clean_df_d['date_str'], errors='coerce').dt.date
-            clean_df_d['due_date_str'] = pd.to_datetime(clean_df_d['due_date_str'], errors='coerce').dt.date
+            clean_df_d['amount'] = clean_df_d['amount'].fillna(0.0)
+            clean_df_d['date_str'] = clean_df_d['date_str'].dt.date
+            clean_df_d['due_date_str'] = clean_df_d['due_date_str'].dt.date
 
             edited_df_d = st.data_editor(
                 clean_df_d,
                 column_config={
                     "Sil": st.column_config.CheckboxColumn(default=False),
-                    "type": st.column_config.SelectboxColumn("Tür", options=["Alacak", "Borç"]),
-                    "status": st.column_config.SelectboxColumn("Durum", options=["Aktif", "Ödendi"]),
+                    "type": st.column_config.SelectboxColumn("Tür", options=schemas.DEBT_TYPES),
+                    "status": st.column_config.SelectboxColumn("Durum", options=list(clean_df_d['status'].cat.categories)),
                     "date_str": st.column_config.DateColumn("Tarih"),
                     "due_date_str": st.column_config.DateColumn("Vade"),
                     "id": None
@@ -1123,15 +2128,14 @@ elif main_module == "Finans Merkezi":
                     delete_multiple_docs("debts", to_del_d)
             
             if st.button("Tablodaki Değişiklikleri Kaydet (Borç)"):
-                for index, row in edited_df_d.iterrows():
-                    if row['id']:
-                        db.collection("debts").document(row['id']).update({
-                            "person": str(row['person']), 
+                changed, _ = optimistic.changed_rows(clean_df_d, edited_df_d, ['person', 'amount', 'status'])
+                updates = {row['id']: {
+                            "person": schemas.text_value(row['person']), 
                             "amount": float(row['amount']), 
-                            "status": str(row['status'])
-                        })
-                st.success("Güncellendi!")
-                time.sleep(1)
+                            "status": schemas.text_value(row['status'])
+                        } for index, row in changed.iterrows()}
+                save_changes("debts", f"{len(updates)} borç satırı", updates)
+                flash("✅ Güncellendi!")
                 st.rerun()
 
     # --- TAB 5: YATIRIM ---
@@ -1142,6 +2146,9 @@ elif main_module == "Finans Merkezi":
         category_options = list(SYMBOL_MAP.keys()) + ["Diğer / Manuel Arama"]
         inv_cat = c_i1.selectbox("Yatırım Türü", category_options)
         
+        cost_method = c_i2.selectbox("Maliyet Yöntemi", portfolio.COST_METHODS, key="inv_cost_method")
+        book, df_inv = get_portfolio_book(df_inv, cost_method)
+        
         with st.form("inv_form", clear_on_submit=True):
             c_f1, c_f2 = st.columns(2)
             inv_d = c_f1.date_input("Tarih", datetime.date.today())
@@ -1161,19 +2168,24 @@ elif main_module == "Finans Merkezi":
                         selected_symbol = selection.split(" | ")[0]
                         manual_name = selection.split(" | ")[1]
 
+            inv_side = st.radio("İşlem", schemas.INVESTMENT_SIDES, horizontal=True)
             c_num1, c_num2 = st.columns(2)
             inv_q = c_num1.number_input("Adet", min_value=0.0, format="%.4f")
-            inv_c = c_num2.number_input("Toplam Maliyet (TL)", min_value=0.0)
+            inv_c = c_num2.number_input("Toplam Tutar (TL)", min_value=0.0, help="Alışta ödenen, satışta alınan toplam tutar")
 
-            if st.form_submit_button("Yatırımı Ekle"):
+            if st.form_submit_button("İşlemi Ekle"):
+                held = book["positions"].get(selected_symbol or manual_name.strip(), {}).get("quantity", 0.0)
                 if inv_cat != "Diğer / Manuel Arama" and not selected_symbol:
                     st.error("Lütfen bir varlık seçin.")
+                elif inv_side == portfolio.SELL and inv_q > held + portfolio.EPSILON:
+                    st.error(f"Satılacak adet eldekinden fazla (elde: {held:,.4f}).")
                 else:
                     save_to_db("investments", {
                         "date": datetime.datetime.combine(inv_d, datetime.time.min),
                         "symbol": selected_symbol, 
                         "category": inv_cat, 
                         "asset_name": manual_name,
+                        "side": inv_side,
                         "quantity": inv_q, 
                         "amount": inv_c, 
                         "status": "Aktif"
@@ -1184,60 +2196,211 @@ elif main_module == "Finans Merkezi":
         
         if not df_inv.empty:
             st.subheader("Portföy Analizi")
+            show_closed = st.toggle("Kapanan pozisyonları göster", value=False)
+            positions = portfolio.positions_frame(book)
+            realized_total = positions["realized"].sum()
+            if not show_closed:
+                positions = positions[positions["status"] == portfolio.OPEN]
+            
             table_data = []
             total_val = 0
             total_cost = 0
+            oldest_price = None
             
             p_bar = st.progress(0)
             
-            for idx, row in df_inv.iterrows():
-                p_bar.progress((idx + 1) / len(df_inv))
-                
-                try:
-                    qty = float(row.get('quantity', 0))
-                    cost = float(row.get('amount', 0))
-                except: qty, cost = 0, 0
-                
-                cur_p = get_asset_current_price(row.get('symbol')) if row.get('symbol') else 0
-                
-                cur_val = (cur_p * qty) if cur_p > 0 else cost
+            for idx, pos in enumerate(positions.itertuples(index=False)):
+                p_bar.progress((idx + 1) / len(positions))
+                cur_p, price_at = get_asset_current_price(pos.symbol) if pos.symbol and pos.quantity > 0 else (0, None)
+                if price_at is not None and (oldest_price is None or price_at < oldest_price):
+                    oldest_price = price_at
+                cur_val = (cur_p * pos.quantity) if cur_p > 0 else pos.cost
                 total_val += cur_val
-                total_cost += cost
+                total_cost += pos.cost
                 
                 table_data.append({
-                    "id": row.get('id'),
-                    "Sil": False,
-                    "Varlık": str(row.get('asset_name', '-')),
-                    "Adet": qty,
-                    "Maliyet": cost,
+                    "Varlık": pos.asset_name or pos.key,
+                    "Sembol": pos.symbol or "-",
+                    "Adet": pos.quantity,
+                    "Ort. Maliyet": pos.avg_cost,
+                    "Maliyet": pos.cost,
+                    "Güncel Fiyat": cur_p or None,
                     "Güncel Değer": cur_val,
-                    "Fark": cur_val - cost
+                    "Fark": cur_val - pos.cost,
+                    "Gerçekleşen": pos.realized,
                 })
             
             p_bar.empty()
             
-            k1, k2, k3 = st.columns(3)
+            k1, k2, k3, k4 = st.columns(4)
             k1.metric("Toplam Maliyet", f"{total_cost:,.2f} TL")
             k2.metric("Güncel Değer", f"{total_val:,.2f} TL")
             diff = total_val - total_cost
             k3.metric("Kâr/Zarar", f"{diff:,.2f} TL", delta=f"{diff:,.2f}")
+            k4.metric("Gerçekleşen K/Z", f"{realized_total:,.2f} TL")
+            if oldest_price is not None and datetime.datetime.now(datetime.timezone.utc) - oldest_price > PRICE_MAX_AGE:
+                st.warning(f"Bazı fiyatlar güncel değil (en eskisi {oldest_price.astimezone():%d.%m.%Y %H:%M}); "
+                           "fiyat servisine ulaşılamıyor.")
             
-            inv_df = pd.DataFrame(table_data)
-            edited_inv = st.data_editor(
-                inv_df,
+            oversold = positions[positions["oversold"] > portfolio.EPSILON]
+            if not oversold.empty:
+                st.warning("Eldekinden fazla satış kaydı olan pozisyonlar: " + ", ".join(oversold["key"]))
+            
+            st.dataframe(
+                pd.DataFrame(table_data),
                 column_config={
-                    "Sil": st.column_config.CheckboxColumn(default=False),
                     "Adet": st.column_config.NumberColumn(format="%.4f"),
+                    "Ort. Maliyet": st.column_config.NumberColumn(format="%.4f TL"),
                     "Maliyet": st.column_config.NumberColumn(format="%.2f TL"),
+                    "Güncel Fiyat": st.column_config.NumberColumn(format="%.4f TL"),
                     "Güncel Değer": st.column_config.NumberColumn(format="%.2f TL"),
                     "Fark": st.column_config.NumberColumn(format="%.2f TL"),
+                    "Gerçekleşen": st.column_config.NumberColumn(format="%.2f TL"),
+                },
+                hide_index=True,
+            )
+            
+            st.subheader("İşlemler")
+            lots_df = df_inv[['Sil', 'date_str', 'side', 'asset_name', 'symbol', 'quantity', 'amount', 'status', 'id']].copy()
+            lots_df['date_str'] = lots_df['date_str'].dt.date
+            lots_df['side'] = lots_df['side'].fillna(portfolio.BUY)
+            edited_inv = st.data_editor(
+                lots_df,
+                column_config={
+                    "Sil": st.column_config.CheckboxColumn(default=False),
+                    "date_str": st.column_config.DateColumn("Tarih"),
+                    "side": "İşlem",
+                    "asset_name": "Varlık",
+                    "symbol": "Sembol",
+                    "quantity": st.column_config.NumberColumn("Adet", format="%.4f"),
+                    "amount": st.column_config.NumberColumn("Tutar", format="%.2f TL"),
+                    "status": "Durum",
                     "id": None
                 },
+                disabled=['date_str', 'side', 'asset_name', 'symbol', 'quantity', 'amount', 'status'],
                 hide_index=True,
                 key="inv_editor"
             )
             
             to_del_i = edited_inv[edited_inv['Sil'] == True]['id'].tolist()
             if to_del_i:
-                 if st.button(f"Seçili {len(to_del_i)} Yatırımı Sil"):
+                 if st.button(f"Seçili {len(to_del_i)} İşlemi Sil"):
                     delete_multiple_docs("investments", to_del_i)
+
+# ==========================================
+# EXCEL'E AKTARMA (export.py)
+# ==========================================
+# Dışa aktarma arka planda çalışır; oturum yalnızca işi (ilerleme + dosya yolu) tutar
+EXPORT_DIR = os.environ.get("LIFEOS_EXPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports"))
+EXPORT_HOLD_SEC = 3600      # oturumun son rerun'ından bu kadar sonrasına kadar dosyası temizlenmez
+
+@st.cache_resource(show_spinner=False)
+def _held_exports():
+    """Açık oturumların indirme için tuttuğu dışa aktarma dosyaları: {yol: son görülme}"""
+    return {"lock": threading.Lock(), "paths": {}}
+
+def hold_export(path):
+    """Dosyayı temizlemeden korur; süresi dolan kayıtları bırakıp korunan yolları döner"""
+    held, now = _held_exports(), time.time()
+    with held["lock"]:
+        if path:
+            held["paths"][path] = now
+        for stale in [p for p, seen in held["paths"].items() if now - seen > EXPORT_HOLD_SEC]:
+            del held["paths"][stale]
+        return set(held["paths"])
+
+@traced_fragment(run_every=1)
+def export_progress(job):
+    """Süren dışa aktarmanın ilerlemesi; bitince indirme düğmesi için sayfayı yeniler"""
+    if job.future.done():
+        st.rerun()
+    sheet, rows = job.summary()
+    st.caption(f"⏳ {sheet or 'Başlıyor'} · {sum(rows.values()):,} satır yazıldı")
+
+with st.sidebar.expander("📤 Excel'e Aktar", expanded=False):
+    export_job = st.session_state.get("_export")
+    running = export_job is not None and not export_job.future.done()
+    export_sheets = st.multiselect("Tablolar", list(export.SHEETS), default=list(export.SHEETS), key="export_sheets")
+    if st.button("Dışa Aktarmayı Başlat", disabled=running or not export_sheets):
+        if export_job is not None and os.path.exists(export_job.path):
+            os.remove(export_job.path)
+        user_export_dir = os.path.join(EXPORT_DIR, UID)
+        os.makedirs(user_export_dir, exist_ok=True)
+        # Kapanmış oturumlardan kalan dosyalar da temizlenir
+        export.prune_exports(user_export_dir, held=hold_export(None))
+        export_job = st.session_state["_export"] = export.start_export(db, export.export_path(user_export_dir),
+                                                                       export_sheets)
+        hold_export(export_job.path)
+        running = True
+    if running:
+        export_progress(export_job)
+    elif export_job is not None:
+        if export_job.trace is not None:
+            finish_rerun_trace(export_job.trace)
+            export_job.trace = None
+        export_error = export_job.future.exception()
+        if export_error is not None:
+            st.error(f"Dışa aktarma başarısız: {export_error}")
+        else:
+            try:
+                with open(export_job.path, "rb") as f:
+                    export_bytes = f.read()
+            except FileNotFoundError:
+                # Başka bir oturumun temizliği ya da elle silme
+                st.session_state.pop("_export", None)
+                st.info("Dışa aktarılan dosya artık yok; yeniden dışa aktarabilirsiniz.")
+            else:
+                hold_export(export_job.path)
+                st.caption(" · ".join(f"{sheet}: {n:,}" for sheet, n in export_job.future.result().items()))
+                st.download_button("📥 Excel'i İndir", export_bytes, file_name=os.path.basename(export_job.path),
+                                   mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+# ==========================================
+# ARKA PLAN İŞLERİ (tools/worker.py)
+# ==========================================
+JOB_LABELS = {"rollups": "Güç analizi", "prices": "Fiyatlar", "tts": "Seslendirme", "compact": "Önbellek"}
+JOB_STATES = {"ok": "✅", "error": "❌", "running": "⏳"}
+job_status = jobs.read_status(WORKER_DIR)
+if job_status:
+    with st.sidebar.expander("⏱️ Arka Plan İşleri", expanded=False):
+        job_rows = []
+        for job_name, info in job_status.items():
+            when = info.get("finished_at") or info.get("started_at")
+            job_rows.append({
+                "İş": JOB_LABELS.get(job_name, job_name),
+                "Durum": JOB_STATES.get(info.get("state"), info.get("state")),
+                "Son Çalışma": datetime.datetime.fromisoformat(when).astimezone().strftime("%d.%m %H:%M") if when else "-",
+                "Süre (sn)": round(info.get("duration_ms", 0) / 1000, 1),
+            })
+        st.dataframe(pd.DataFrame(job_rows), hide_index=True, use_container_width=True)
+        for job_name, info in job_status.items():
+            if info.get("error"):
+                st.caption(f"{JOB_LABELS.get(job_name, job_name)}: {info['error']}")
+
+# ==========================================
+# HATA AYIKLAMA PANELİ (gizli)
+# ==========================================
+rerun_summary = finish_rerun_trace(st.session_state["_trace_current"])
+if DEBUG_PANEL:
+    with st.sidebar.expander("🛠️ Rerun İzleri", expanded=False):
+        st.caption(f"Son rerun: {rerun_summary['duration_ms']:.0f} ms · {rerun_summary['page']}")
+        if rerun_summary["calls"]:
+            calls_df = pd.DataFrame(rerun_summary["calls"]).rename(columns={
+                "name": "Çağrı", "target": "Hedef", "count": "Adet", "ms": "Süre (ms)", "docs": "Döküman", "bytes": "Bayt"})
+            st.dataframe(calls_df.round({"Süre (ms)": 1}), hide_index=True, use_container_width=True)
+        else:
+            st.caption("Bu rerun'da dış çağrı yok.")
+
+        quota = st.session_state["_trace_quota"]
+        q1, q2, q3 = st.columns(3)
+        q1.metric("Okuma", quota["reads"])
+        q2.metric("Yazma", quota["writes"])
+        q3.metric("Silme", quota["deletes"])
+        st.caption("Oturumdaki okumaların sayfalara dağılımı")
+        st.dataframe(pd.Series(quota["by_page"], name="Okuma").sort_values(ascending=False), use_container_width=True)
+
+        history = st.session_state["_trace_history"]
+        st.download_button(
+            "İzleri İndir (JSONL)", tracing.to_jsonl([h["trace"] for h in history]),
+            file_name="rerun_traces.jsonl", mime="application/x-ndjson",
+        )
@@ -0,0 +1,204 @@
+"""Finans ve takip tablolarının akışlı XLSX dışa aktarımı.
+
+Koleksiyonlar `snapshot.iter_pages` ile sayfa sayfa okunur ve openpyxl'in
+salt yazılır (write-only) çalışma kitabına satır satır eklenir; satırlar
+bellekte tutulmaz, openpyxl onları geçici XML dosyalarına akıtır. Böylece
+yıllarca birikmiş veri sabit bellekle dışa aktarılır.
+
+`start_export` dışa aktarmayı paylaşılan bir iş parçacığı havuzunda başlatır
+ve ilerlemeyi tutan bir `ExportJob` döner; Streamlit oturumu iş bitene kadar
+yalnızca bu nesneyi tutar ve diğer rerun'lar beklemez. Dosya adları
+`export_path` ile benzersiz üretilir; `prune_exports` kapanmış oturumlardan
+kalan eski dosyaları temizler.
+
+Bu modül Streamlit'e bağımlı değildir.
+"""
+import concurrent.futures
+import datetime
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import snapshot
+import tracing
+from habit_analytics import MAX_DAYS, unpack_masks
+
+# Sayfa adı -> (koleksiyon, [(alan, başlık)])
+SHEETS = {
+    "Harcamalar": ("expenses", [("date_str", "Tarih"), ("place", "Yer"), ("amount", "Tutar"), ("category", "Kategori"),
+                                ("method", "Ödeme Şekli"), ("necessity", "Gerekli"), ("desc", "Açıklama")]),
+    "Ödemeler": ("payments", [("date_str", "Tarih"), ("category", "Tür"), ("amount", "Tutar"), ("place", "Kurum"),
+                              ("account", "Ödeme Aracı"), ("desc", "Açıklama")]),
+    "Borçlar": ("debts", [("type", "Tür"), ("person", "Kişi"), ("amount", "Miktar"), ("currency", "Birim"),
+                          ("date_str", "Tarih"), ("due_date_str", "Vade"), ("status", "Durum")]),
+    "Yatırımlar": ("investments", [("date_str", "Tarih"), ("side", "İşlem"), ("symbol", "Sembol"),
+                                   ("asset_name", "Varlık"), ("category", "Kategori"), ("quantity", "Adet"),
+                                   ("amount", "Tutar"), ("status", "Durum")]),
+    "İdman Setleri": ("workout_sets", [("date_str", "Tarih"), ("section", "Bölüm"), ("exercise", "Hareket"),
+                                       ("set_idx", "Set"), ("kind", "Tür"), ("weight", "Ağırlık"), ("reps", "Tekrar"),
+                                       ("rom", "ROM"), ("difficulty", "Zorluk"), ("is_dropset", "Drop Set"),
+                                       ("cardio_duration", "Süre"), ("distance", "Mesafe"), ("speed", "Hız"),
+                                       ("incline", "Eğim"), ("calories", "Kalori")]),
+    "Alışkanlıklar": ("habit_logs", [("date", "Tarih"), ("group", "Tür"), ("name", "Ad")]),
+}
+
+_DAY_FIELDS = {"date_str", "due_date_str"}    # "YYYY-MM-DD" metinleri Excel tarihi olarak yazılır
+EXPORT_KEEP = 5                 # kullanıcı klasöründe tutulan en yeni dosya sayısı
+EXPORT_MAX_AGE = 24 * 3600      # saniye; daha eski dosyalar silinir
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="export")
+
+
+@dataclass
+class ExportJob:
+    path: str
+    sheets: list
+    rows: dict = field(default_factory=dict)     # sayfa -> yazılan satır
+    current: str = None
+    future: concurrent.futures.Future = None
+    trace: dict = None      # dışa aktarmanın okumaları (tracing); bitince oturuma işlenir
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def progress(self, sheet, rows):
+        with self._lock:
+            self.current, self.rows[sheet] = sheet, rows
+
+    def summary(self):
+        with self._lock:
+            return self.current, dict(self.rows)
+
+
+def cell(value):
+    """Firestore değerini Excel hücresine uygun hale getirir"""
+    if isinstance(value, datetime.datetime):
+        # Excel saat dilimi tutmaz: UTC'ye çevrilip dilim bilgisi atılır
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+    if isinstance(value, (list, dict, tuple, set)):
+        return str(value)
+    return value
+
+
+def day(value):
+    """"YYYY-MM-DD" metnini tarihe çevirir; çevrilemezse değeri olduğu gibi bırakır"""
+    try:
+        return datetime.date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def habit_rows(doc_id, data):
+    """Ay dökümanındaki işaretli günler: (tarih, "Alışkanlık" | "Uyku", ad)"""
+    year, _, month = doc_id.partition("_")
+    if not (year.isdigit() and month.isdigit()):
+        return
+    first = datetime.date(int(year), int(month), 1)
+    for group, bits_key, legacy_key in (("Alışkanlık", "habit_bits", "habits"), ("Uyku", "sleep_bits", "sleep")):
+        if data.get(bits_key) is not None:
+            names = list(data[bits_key])
+            matrix = unpack_masks([int(data[bits_key][n]) for n in names], MAX_DAYS)
+        else:
+            legacy = data.get(legacy_key) or {}
+            names = list(legacy)
+            matrix = [[bool(v) for v in (legacy[n] or [])[:MAX_DAYS]] for n in names]
+        for name, days in zip(names, matrix):
+            for number, marked in enumerate(days, start=1):
+                if marked:
+                    try:
+                        yield [first.replace(day=number), group, name]
+                    except ValueError:      # ayda olmayan gün
+                        break
+
+
+def sheet_rows(db, sheet, page_size=snapshot.PAGE_SIZE):
+    """Bir sayfanın satırlarını koleksiyonu sayfa sayfa okuyarak üretir"""
+    collection_name, columns = SHEETS[sheet]
+    for page in snapshot.iter_pages(db, collection_name, page_size):
+        for doc in page:
+            data = doc.to_dict()
+            if collection_name == "habit_logs":
+                yield from habit_rows(doc.id, data)
+            else:
+                yield [day(data.get(name)) if name in _DAY_FIELDS else cell(data.get(name)) for name, _ in columns]
+
+
+def write_workbook(db, path, sheets=None, page_size=snapshot.PAGE_SIZE, progress=None):
+    """Sayfaları salt yazılır bir çalışma kitabına akıtır; sayfa başına satır sayısını döner"""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    counts = {}
+    tmp = path + ".part"
+    try:
+        for sheet in sheets or list(SHEETS):
+            worksheet = workbook.create_sheet(sheet)
+            header = []
+            for _, title in SHEETS[sheet][1]:
+                c = WriteOnlyCell(worksheet, value=title)
+                c.font = Font(bold=True)
+                header.append(c)
+            worksheet.append(header)
+            counts[sheet] = 0
+            for row in sheet_rows(db, sheet, page_size):
+                worksheet.append(row)
+                counts[sheet] += 1
+                if progress and counts[sheet] % page_size == 0:
+                    progress(sheet, counts[sheet])
+            if progress:
+                progress(sheet, counts[sheet])
+        workbook.save(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return counts
+
+
+def start_export(db, path, sheets=None, page_size=snapshot.PAGE_SIZE):
+    """Dışa aktarmayı arka planda başlatır; ilerlemesi izlenebilen `ExportJob` döner"""
+    job = ExportJob(path=path, sheets=list(sheets or SHEETS), trace=tracing.background_trace("Excel'e aktarma"))
+
+    def run():
+        with tracing.attached(job.trace):
+            return write_workbook(db, path, job.sheets, page_size, job.progress)
+
+    job.future = _executor.submit(run)
+    return job
+
+
+def export_path(folder, now=None):
+    """Klasörde yeni dışa aktarma dosyasının yolu; aynı saniyedeki dışa aktarmalar çakışmaz"""
+    now = now or datetime.datetime.now()
+    return os.path.join(folder, f"lifeos_{now:%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.xlsx")
+
+
+def prune_exports(folder, keep=EXPORT_KEEP, max_age=EXPORT_MAX_AGE, now=None, held=()):
+    """En yeni `keep` dosyayı bırakıp eskileri ve `max_age`'den eski dosyaları siler; silinen sayısını döner.
+
+    Yarım kalmış `.part` dosyaları yalnızca yaştan silinir (süren bir dışa aktarmaya ait olabilirler).
+    `held` içindeki yollar (açık oturumların indirme için tuttuğu dosyalar) silinmez.
+    """
+    if not os.path.isdir(folder):
+        return 0
+    now = now or time.time()
+    files = []
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        try:
+            files.append((os.path.getmtime(path), path))
+        except OSError:     # başka bir oturum o sırada silmiş olabilir
+            continue
+    finished = sorted((f for f in files if f[1].endswith(".xlsx")), reverse=True)
+    stale = {path for _, path in finished[keep:]} | {path for mtime, path in files if now - mtime > max_age}
+    stale -= {os.path.abspath(p) for p in held} | set(held)
+    removed = 0
+    for path in stale:
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
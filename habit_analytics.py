@@ -0,0 +1,135 @@
+"""Alışkanlık/uyku verisinin bit maskeli saklanması ve vektörel analizi.
+
+Her `habit_logs/{yıl}_{ay}` dökümanı alışkanlık ve uyku etiketi başına tek
+bir tamsayı tutar: ayın d. günü işaretliyse maskenin (d-1). biti 1'dir.
+Eski biçimdeki (gün başına bool listesi) dökümanlar da okunabilir.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_DAYS = 31
+_BITS = np.arange(MAX_DAYS, dtype=np.int64)
+
+
+def pack_days(values):
+    """Gün değerlerini (bool listesi) tek bir bit maskesine çevirir"""
+    flags = np.asarray([bool(v) and not pd.isna(v) for v in values][:MAX_DAYS], dtype=np.int64)
+    return int((flags << _BITS[: len(flags)]).sum())
+
+
+def unpack_masks(masks, n_days):
+    """Maske dizisini (satır, gün) boyutlu bool matrise açar"""
+    masks = np.asarray(masks, dtype=np.int64).reshape(-1, 1)
+    return ((masks >> _BITS[:n_days]) & 1).astype(bool)
+
+
+def decode_month(doc, names, n_days, bits_key, legacy_key):
+    """Bir ay dökümanından isim sırasına göre (len(names), n_days) bool matris üretir"""
+    doc = doc or {}
+    bits = doc.get(bits_key)
+    if bits is not None:
+        return unpack_masks([int(bits.get(n, 0)) for n in names], n_days)
+    legacy = doc.get(legacy_key, {})
+    matrix = np.zeros((len(names), n_days), dtype=bool)
+    for i, name in enumerate(names):
+        values = legacy.get(name)
+        if values:
+            row = [bool(v) and not pd.isna(v) for v in values[:n_days]]
+            matrix[i, : len(row)] = row
+    return matrix
+
+
+def encode_month(matrix, names):
+    """(isim, gün) bool matrisini {isim: maske} sözlüğüne çevirir"""
+    matrix = np.asarray(matrix, dtype=bool)
+    weights = np.left_shift(1, _BITS[: matrix.shape[1]])
+    masks = (matrix.astype(np.int64) * weights).sum(axis=1)
+    return {name: int(m) for name, m in zip(names, masks)}
+
+
+def month_range(end, months):
+    """`end` ayı dahil geriye doğru `months` adet (yıl, ay) çifti"""
+    y, m = end.year, end.month
+    out = []
+    for _ in range(months):
+        out.append((y, m))
+        m -= 1
+        if m == 0:
+            y, m = y - 1, 12
+    return out[::-1]
+
+
+def build_daily_frame(month_docs, habits, sleep_labels, sleep_hours, until=None):
+    """Ay dökümanlarından günlük satırlı bir tablo kurar.
+
+    Sütunlar: her alışkanlık için bool, ayrıca `sleep_hours` (o gün
+    işaretlenen ilk uyku etiketinin saat karşılığı; yoksa NaN).
+    `until` verilirse o günden sonraki (henüz yaşanmamış) günler atılır.
+    """
+    frames = []
+    hours = np.array([sleep_hours.get(label, np.nan) for label in sleep_labels], dtype=float)
+    for (year, month), doc in sorted(month_docs.items()):
+        n_days = pd.Period(f"{year}-{month:02d}").days_in_month
+        habit_m = decode_month(doc, habits, n_days, "habit_bits", "habits")
+        sleep_m = decode_month(doc, sleep_labels, n_days, "sleep_bits", "sleep")
+        has_sleep = sleep_m.any(axis=0)
+        first = sleep_m.argmax(axis=0)
+        sleep_val = np.where(has_sleep, hours[first] if len(hours) else np.nan, np.nan)
+        idx = pd.date_range(f"{year}-{month:02d}-01", periods=n_days, freq="D")
+        frame = pd.DataFrame(habit_m.T, index=idx, columns=habits)
+        frame["sleep_hours"] = sleep_val
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=list(habits) + ["sleep_hours"])
+    daily = pd.concat(frames)
+    if until is not None:
+        daily = daily[daily.index <= pd.Timestamp(until)]
+    return daily
+
+
+def completion_rates(daily, habits):
+    """Alışkanlık başına tamamlanma oranı (0-1)"""
+    if daily.empty:
+        return pd.Series(0.0, index=list(habits))
+    return daily[list(habits)].mean()
+
+
+def monthly_completion(daily, habits):
+    """Ay × alışkanlık tamamlanma oranı tablosu"""
+    if daily.empty:
+        return pd.DataFrame(columns=list(habits))
+    return daily[list(habits)].groupby(daily.index.to_period("M")).mean()
+
+
+def streaks(daily, habits):
+    """Alışkanlık başına güncel ve en uzun ardışık gün serisi"""
+    data = daily[list(habits)].to_numpy(dtype=bool)
+    if data.size == 0:
+        return pd.DataFrame({"current": 0, "longest": 0}, index=list(habits))
+    # Her sıfırda sayacı sıfırlayan kümülatif toplam: run[i] = i. günde biten seri uzunluğu
+    counts = np.cumsum(data, axis=0)
+    resets = np.where(~data, counts, 0)
+    run = counts - np.maximum.accumulate(resets, axis=0)
+    return pd.DataFrame({"current": run[-1], "longest": run.max(axis=0)}, index=list(habits))
+
+
+def habit_sleep_correlation(daily, habits):
+    """Her alışkanlığın aynı günkü uyku süresiyle korelasyonu (uyku girilmiş günler)"""
+    rows = daily[daily["sleep_hours"].notna()]
+    if len(rows) < 3:
+        return pd.Series(np.nan, index=list(habits))
+    values = rows[list(habits)].astype(float)
+    sleep = rows["sleep_hours"].astype(float)
+    return values.apply(lambda col: col.corr(sleep) if col.std() > 0 else np.nan)
+
+
+def yearly_heatmap(daily, habits):
+    """Günlük tamamlanan alışkanlık oranı; ısı haritası için uzun biçim (ay, gün, oran)"""
+    if daily.empty:
+        return pd.DataFrame(columns=["month", "day", "rate"])
+    rate = daily[list(habits)].mean(axis=1)
+    return pd.DataFrame({
+        "month": daily.index.strftime("%Y-%m"),
+        "day": daily.index.day,
+        "rate": rate.round(3).to_numpy(),
+    })
@@ -0,0 +1,288 @@
+"""Kullanıcı rerun'larının dışında çalışan arka plan işleri.
+
+`tools/worker.py` bu işleri zamanlayıcıyla ayrı bir süreçte çalıştırır:
+
+- rollups: her kullanıcının set tablosunu (workout_sets) okuyup güç
+  analizinin temelini Parquet olarak hazırlar.
+- prices: elde tutulan sembollerin fiyatlarını piyasa açılışlarından önce çeker.
+- tts: kelime kartlarının seslendirmelerini önceden üretir.
+- compact: TTS önbelleğini boyut sınırına indirir, eski anlık görüntüleri siler.
+
+Çıktılar ve iş durumu (son çalışma, süre, hata) işçi klasöründe tutulur;
+uygulama yalnızca bu klasörü okur (`read_status`, `read_prices`,
+`load_strength_sets`, `tts_path`). Bu modül Streamlit'e bağımlı değildir.
+"""
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+import resilience
+import snapshot
+import tenancy
+from workout_analytics import build_set_frame
+
+STATUS_FILE = "status.json"
+PRICES_FILE = "prices.json"
+ROLLUP_FILE = "strength_sets.parquet"
+ROLLUP_META = "strength_sets.json"
+TTS_DIR = "tts"
+TTS_BATCH = 200                     # bir çalışmada en fazla üretilecek ses
+TTS_CACHE_LIMIT = 200 * 1024 ** 2   # bayt
+SNAPSHOT_KEEP = 3                   # kullanıcı başına saklanan anlık görüntü
+
+# Yerel saatle çalışma zamanları: "at" günlük saatler, "every" saniye aralığı.
+# Fiyatlar BIST açılışından (10:00) ve ABD piyasalarından (16:30) önce çekilir.
+SCHEDULE = {
+    "rollups": {"at": ["03:00"]},
+    "prices": {"at": ["09:30", "16:00"]},
+    "tts": {"every": 3600},
+    "compact": {"at": ["04:00"]},
+}
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _write_json(path, data):
+    """Okuyucuların yarım dosya görmemesi için geçici dosya + os.replace"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def file_mtime(path):
+    """Dosyanın değişme zamanı (yoksa 0); önbellek anahtarı olarak kullanılır"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+# --- İŞ DURUMU ---
+def read_status(root):
+    """{iş: {"state", "started_at", "finished_at", "duration_ms", "result", "error"}}"""
+    return _read_json(os.path.join(root, STATUS_FILE))
+
+
+def _set_status(root, job, **fields):
+    status = read_status(root)
+    status.setdefault(job, {}).update(fields)
+    _write_json(os.path.join(root, STATUS_FILE), status)
+
+
+def run_job(name, db, root, **options):
+    """İşi çalıştırır; başlangıç, süre, sonuç ve hatayı durum dosyasına yazar"""
+    _set_status(root, name, state="running", started_at=_now().isoformat(), error=None)
+    t0 = time.perf_counter()
+    try:
+        result = JOBS[name](db, root, **options)
+    except Exception as e:
+        _set_status(root, name, state="error", finished_at=_now().isoformat(),
+                    duration_ms=round((time.perf_counter() - t0) * 1000, 1), error=f"{type(e).__name__}: {e}")
+        raise
+    _set_status(root, name, state="ok", finished_at=_now().isoformat(),
+                duration_ms=round((time.perf_counter() - t0) * 1000, 1), result=result)
+    return result
+
+
+def _last_due(spec, now):
+    """`at` takvimine göre `now` anına kadarki en son çalışma zamanı"""
+    times = sorted(datetime.time.fromisoformat(t) for t in spec["at"])
+    for day in (now.date(), now.date() - datetime.timedelta(days=1)):
+        for t in reversed(times):
+            moment = datetime.datetime.combine(day, t)
+            if moment <= now:
+                return moment
+    return None
+
+
+def due_jobs(status, now=None):
+    """Takvime göre çalışma zamanı gelmiş işlerin adları"""
+    now = now or datetime.datetime.now()
+    due = []
+    for name, spec in SCHEDULE.items():
+        started = status.get(name, {}).get("started_at")
+        last = datetime.datetime.fromisoformat(started).astimezone().replace(tzinfo=None) if started else None
+        if "every" in spec:
+            if last is None or (now - last).total_seconds() >= spec["every"]:
+                due.append(name)
+        else:
+            moment = _last_due(spec, now)
+            if moment is not None and (last is None or last < moment):
+                due.append(name)
+    return due
+
+
+def list_users(db):
+    """Verisi olan kullanıcıların kimlikleri"""
+    return [doc.id for doc in db.collection(tenancy.USERS_COLLECTION).list_documents()]
+
+
+# --- GÜÇ ANALİZİ TEMELİ ---
+def _rollup_paths(root, uid):
+    folder = os.path.join(root, uid)
+    return os.path.join(folder, ROLLUP_FILE), os.path.join(folder, ROLLUP_META)
+
+
+def rebuild_rollups(db, root, users=None):
+    """Her kullanıcının set tablosunu Parquet olarak yeniden kurar"""
+    result = {}
+    for uid in users or list_users(db):
+        built_at = _now()
+        rows = [doc.to_dict() for doc in tenancy.scoped_client(db, uid).collection("workout_sets").stream()]
+        frame = build_set_frame(rows)
+        path, meta = _rollup_paths(root, uid)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        frame.to_parquet(f"{path}.tmp", index=False)
+        os.replace(f"{path}.tmp", path)
+        _write_json(meta, {"built_at": built_at.isoformat(), "rows": len(frame)})
+        result[uid] = len(frame)
+    return result
+
+
+def load_strength_sets(root, uid):
+    """(set tablosu, kurulma anı); iş henüz çalışmadıysa (None, None)"""
+    path, meta = _rollup_paths(root, uid)
+    info = _read_json(meta)
+    if not info or not os.path.isfile(path):
+        return None, None
+    frame = pd.read_parquet(path)
+    return frame, datetime.datetime.fromisoformat(info["built_at"])
+
+
+# --- FİYAT ÖN ÇEKİMİ ---
+def fetch_price(symbol):
+    """Sembolün son kapanış fiyatı (yoksa None)"""
+    import yfinance as yf
+    history = yf.Ticker(symbol).history(period="1d")
+    return None if history.empty else float(history["Close"].iloc[-1])
+
+
+def held_symbols(db, users=None):
+    """Kullanıcıların aktif yatırımlarındaki semboller"""
+    symbols = set()
+    for uid in users or list_users(db):
+        docs = tenancy.scoped_client(db, uid).collection("investments").where("status", "==", "Aktif").stream()
+        symbols.update(s for s in (doc.to_dict().get("symbol") for doc in docs) if s)
+    return sorted(symbols)
+
+
+def prefetch_prices(db, root, users=None):
+    """Elde tutulan sembollerin fiyatlarını çeker; alınamayanların eski değeri korunur"""
+    path = os.path.join(root, PRICES_FILE)
+    prices = _read_json(path)
+    failed = []
+    for symbol in held_symbols(db, users):
+        try:
+            price = resilience.call("yfinance", fetch_price, symbol)
+        except Exception:
+            price = None
+        if price is None:
+            failed.append(symbol)
+            continue
+        prices[symbol] = {"price": price, "fetched_at": _now().isoformat()}
+    _write_json(path, prices)
+    return {"symbols": len(prices), "failed": failed}
+
+
+def read_prices(root):
+    """{sembol: {"price", "fetched_at"}}"""
+    return _read_json(os.path.join(root, PRICES_FILE))
+
+
+# --- SESLENDİRME ÖN ÜRETİMİ ---
+def tts_path(root, lang, text):
+    digest = hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+    return os.path.join(root, TTS_DIR, lang, f"{digest}.mp3")
+
+
+def synthesize(text, lang):
+    """gTTS ile mp3 baytları"""
+    import io
+    from gtts import gTTS
+    fp = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(fp)
+    return fp.getvalue()
+
+
+def store_tts(path, audio):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(audio)
+    os.replace(f"{path}.tmp", path)
+
+
+def pregenerate_tts(db, root, users=None, limit=TTS_BATCH):
+    """Henüz öğrenilmemiş kartlardan başlayarak eksik seslendirmeleri üretir"""
+    cards = []
+    for uid in users or list_users(db):
+        for doc in tenancy.scoped_client(db, uid).collection("vocabulary").stream():
+            cards.append(doc.to_dict())
+    cards.sort(key=lambda c: c.get("learned_count") or 0)
+    created = 0
+    for card in cards:
+        for lang in ("en", "de"):
+            text = str(card.get(lang) or "").strip()
+            if not text or os.path.exists(tts_path(root, lang, text)):
+                continue
+            if created >= limit:
+                return {"created": created, "remaining": True}
+            store_tts(tts_path(root, lang, text), resilience.call("gtts", synthesize, text, lang))
+            created += 1
+    return {"created": created, "remaining": False}
+
+
+# --- ÖNBELLEK SIKIŞTIRMA ---
+def compact_caches(db, root, snapshot_dir=None, tts_limit=TTS_CACHE_LIMIT, keep=SNAPSHOT_KEEP):
+    """TTS önbelleğini en az kullanılanlardan başlayarak sınıra indirir; eski anlık görüntüleri siler"""
+    files = []
+    for dirpath, _, names in os.walk(os.path.join(root, TTS_DIR)):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            info = os.stat(path)
+            files.append((max(info.st_atime, info.st_mtime), info.st_size, path))
+    total = sum(size for _, size, _ in files)
+    removed_audio = 0
+    for _, size, path in sorted(files):
+        if total <= tts_limit:
+            break
+        os.remove(path)
+        total -= size
+        removed_audio += 1
+
+    removed_snapshots = 0
+    if snapshot_dir and os.path.isdir(snapshot_dir):
+        for uid in os.listdir(snapshot_dir):
+            user_dir = os.path.join(snapshot_dir, uid)
+            if not os.path.isdir(user_dir):
+                continue
+            folders = sorted(n for n in os.listdir(user_dir)
+                             if os.path.isfile(os.path.join(user_dir, n, snapshot.MANIFEST)))
+            for name in folders[:-keep] if keep else folders:
+                shutil.rmtree(os.path.join(user_dir, name))
+                removed_snapshots += 1
+    return {"removed_audio": removed_audio, "tts_bytes": total, "removed_snapshots": removed_snapshots}
+
+
+JOBS = {
+    "rollups": rebuild_rollups,
+    "prices": prefetch_prices,
+    "tts": pregenerate_tts,
+    "compact": compact_caches,
+}
@@ -0,0 +1,107 @@
+"""Canlı idman için tarayıcıda çalışan süre sayaçları.
+
+`timer_html` küçük bir HTML/JS parçası üretir: sunucu başlangıç zamanlarını
+ve kendi o anki saatini (epoch ms) gönderir, geçen süreler ve dinlenme geri
+sayımı tarayıcıda saniyede bir güncellenir; sayaç için sunucuya istek gitmez
+ve sayfa yeniden çalıştırılmaz. Süreler tarayıcı saatinden değil, sayfa
+yüklendiğinden beri geçen süreden hesaplanır; telefonun saati sunucudan
+farklı olsa da sayaç doğru kalır.
+
+Dinlenme sayacı son setin zamanından geri sayar; hazır süre düğmeleri
+sayacı yalnızca tarayıcıda yeniden başlatır. Süre dolunca kısa bir bip
+çalınır (tarayıcı izin verirse).
+
+Bu modül Streamlit'e bağımlı değildir.
+"""
+import datetime
+import json
+
+REST_PRESETS = [60, 90, 120, 180]      # saniye
+
+_TEMPLATE = """
+<div id="timer" style="font-family: sans-serif; display: flex; gap: 1.2rem; flex-wrap: wrap; align-items: center;
+     padding: 0.5rem 0.8rem; border-radius: 0.5rem; background: rgba(28, 131, 225, 0.1); color: inherit;">
+  <span id="clocks"></span>
+  <span id="rest"></span>
+  <span id="presets"></span>
+</div>
+<script>
+const config = __CONFIG__;
+const clocks = document.getElementById("clocks");
+const rest = document.getElementById("rest");
+const presets = document.getElementById("presets");
+// İstemci ile sunucu saatleri arasındaki fark; zamanlar sunucu saatine göre hesaplanır
+const skew = Date.now() - config.now;
+const serverNow = () => Date.now() - skew;
+let restFrom = config.rest ? config.rest.from : null;
+let restSeconds = config.rest ? config.rest.seconds : 0;
+let beeped = restFrom === null || serverNow() - restFrom >= restSeconds * 1000;
+
+function fmt(ms) {
+  const s = Math.max(0, Math.floor(ms / 1000));
+  const h = Math.floor(s / 3600), m = Math.floor(s % 3600 / 60), r = s % 60;
+  const mm = String(m).padStart(2, "0"), rr = String(r).padStart(2, "0");
+  return h ? `${h}:${mm}:${rr}` : `${mm}:${rr}`;
+}
+
+function beep() {
+  try {
+    const ctx = new (window.AudioContext || window.webkitAudioContext)();
+    const osc = ctx.createOscillator();
+    osc.connect(ctx.destination);
+    osc.frequency.value = 880;
+    osc.start();
+    osc.stop(ctx.currentTime + 0.3);
+  } catch (e) {}
+}
+
+function tick() {
+  const now = serverNow();
+  clocks.textContent = config.clocks.map(([label, start]) => `${label}: ${fmt(now - start)}`).join(" · ");
+  if (restFrom !== null && restSeconds > 0) {
+    const left = restFrom + restSeconds * 1000 - now;
+    if (left > 0) {
+      rest.textContent = `⏳ Dinlenme: ${fmt(left + 999)}`;
+    } else {
+      rest.textContent = "🔔 Dinlenme bitti";
+      if (!beeped) { beeped = true; beep(); }
+    }
+  }
+}
+
+if (config.rest) {
+  for (const seconds of config.presets) {
+    const button = document.createElement("button");
+    button.textContent = `${seconds} sn`;
+    button.style.marginRight = "0.3rem";
+    button.onclick = () => { restFrom = serverNow(); restSeconds = seconds; beeped = false; tick(); };
+    presets.appendChild(button);
+  }
+}
+tick();
+setInterval(tick, 1000);
+</script>
+"""
+
+
+def epoch_ms(moment):
+    """datetime -> epoch milisaniye (saat dilimsizse yerel saat kabul edilir); None ise None"""
+    return None if moment is None else int(moment.timestamp() * 1000)
+
+
+def timer_html(clocks, rest_from=None, rest_seconds=0, presets=REST_PRESETS, now=None):
+    """Sayaç bileşeninin HTML'i.
+
+    `clocks`: [(etiket, başlangıç datetime)] ileri sayan süreler; `rest_from`
+    verilirse o andan `rest_seconds` saniye geri sayan dinlenme sayacı ve
+    hazır süre düğmeleri eklenir. `now`: sunucunun o anki saati (varsayılan
+    şimdi); tarayıcı saatiyle farkı sayaçlardan düşülür.
+    """
+    config = {
+        "now": epoch_ms(now or datetime.datetime.now()),
+        "clocks": [[label, epoch_ms(start)] for label, start in clocks if start is not None],
+        "rest": {"from": epoch_ms(rest_from), "seconds": rest_seconds} if rest_seconds else None,
+        "presets": list(presets),
+    }
+    # "<" kaçışlanır: etiketler </script> ile betiği kapatamaz
+    return _TEMPLATE.replace("__CONFIG__", json.dumps(config, ensure_ascii=False).replace("<", "\\u003c"))
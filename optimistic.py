@@ -0,0 +1,140 @@
+"""Yazmaları yerel tabloya hemen yansıtıp Firestore'a arka planda gönderen kuyruk.
+
+Koleksiyon tabloları süreç genelinde paylaşılır ve salt okunurdur; bir
+oturumun yaptığı ekleme/güncelleme/silme bu tabloyu değiştirmez. Her yazma
+`WriteQueue`'ya tabloya uygulanacak küçük bir değişiklik fonksiyonuyla
+(`change`) birlikte girer: yazma bekledikçe oturum, paylaşılan tabloyu bu
+değişiklikler uygulanmış olarak görür. Firestore yazması arka plandaki bir
+iş parçacığında, oturumun yazma sırası korunarak yapılır; başarısız olan
+yazma `poll()` ile döner ve değişikliği kuyruktan düştüğü için kendiliğinden
+geri alınmış olur.
+
+Değişiklik fonksiyonları aynı tabloya iki kez uygulansa da aynı sonucu
+verir; yazma onaylanıp tablo yeniden okunduktan sonra uygulanmaları zararsızdır.
+
+Bu modül Streamlit'e bağımlı değildir.
+"""
+import concurrent.futures
+import datetime
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+
+import schemas
+import tracing
+
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4, thread_name_prefix="writes")
+_MISSING = "\0"
+
+
+@dataclass
+class Write:
+    collection: str
+    label: str
+    change: Callable      # tablo -> yazma uygulanmış tablo
+    future: concurrent.futures.Future = None
+    trace: dict = None    # arka plandaki yazmanın izi (tracing)
+
+
+class WriteQueue:
+    """Bir oturumun bekleyen yazmaları; yazmalar gönderildiği sırayla çalışır"""
+
+    def __init__(self):
+        self.pending = []
+        self._last = None
+
+    def submit(self, collection, fn, change, label, trace=None):
+        previous = self._last
+
+        def run():
+            if previous is not None:
+                concurrent.futures.wait([previous])
+            with tracing.attached(trace):
+                return fn()
+
+        write = Write(collection, label, change, _executor.submit(run), trace)
+        self._last = write.future
+        self.pending.append(write)
+        return write
+
+    def poll(self):
+        """Tamamlanan yazmalar sırayla: [(yazma, hata ya da None)]"""
+        done = []
+        while self.pending and self.pending[0].future.done():
+            write = self.pending.pop(0)
+            done.append((write, write.future.exception()))
+        return done
+
+    def wait(self, timeout=None):
+        """Bekleyen tüm yazmaların bitmesini bekler"""
+        concurrent.futures.wait([w.future for w in self.pending], timeout=timeout)
+
+    def apply(self, collection, frame):
+        """Koleksiyonun bekleyen yazmalarını tabloya uygular"""
+        for write in self.pending:
+            if write.collection == collection:
+                frame = write.change(frame)
+        return frame
+
+
+# --- YEREL TABLO İŞLEMLERİ ---
+def local_values(data, now=None):
+    """Firestore'a gidecek veriyi yerel tablo satırına çevirir (sunucu zaman damgası -> şimdi)"""
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return {k: (now if type(v).__name__ == "Sentinel" else v) for k, v in data.items()}
+
+
+def _without(frame, ids):
+    return frame[~frame["id"].isin(ids)] if ids and not frame.empty else frame
+
+
+def insert_rows(frame, rows, collection_name=None):
+    """(id, veri) satırlarını tablonun başına ekler (aynı kimlikli satırların yerine)"""
+    rows = list(rows)
+    fresh = schemas.build_frame(rows, collection_name)
+    if "Sil" in frame.columns:
+        fresh["Sil"] = False
+    return schemas.concat_frames([fresh, _without(frame, {doc_id for doc_id, _ in rows})], collection_name)
+
+
+def delete_rows(frame, ids):
+    """Kimlikleri verilen satırları çıkarır"""
+    return _without(frame, set(ids)).reset_index(drop=True)
+
+
+def update_rows(frame, updates, collection_name=None):
+    """{id: {alan: değer}} güncellemelerini tablonun bir kopyasına uygular"""
+    position = {doc_id: i for i, doc_id in enumerate(frame["id"]) if doc_id in updates}
+    if not position:
+        return frame
+    frame = frame.copy()
+    for doc_id, fields in updates.items():
+        if doc_id not in position:
+            continue
+        for name, value in fields.items():
+            value = schemas.cell_value(collection_name, name, value)
+            if name not in frame.columns:
+                frame[name] = None
+            if isinstance(frame[name].dtype, pd.CategoricalDtype) and not pd.isna(value) \
+                    and value not in frame[name].cat.categories:
+                frame[name] = frame[name].cat.add_categories([value])
+            frame.iat[position[doc_id], frame.columns.get_loc(name)] = value
+    return frame
+
+
+def changed_rows(original, edited, columns):
+    """Düzenleyicide değişen satırlar: (güncellenen satırlar, eklenen satırlar)
+
+    Satırlar `id` ile eşleştirilir; kimliği olmayan satırlar yenidir.
+    """
+    has_id = edited["id"].notna()
+    added = edited[~has_id]
+    current = edited[has_id].set_index("id")[columns]
+    before = original.set_index("id").reindex(current.index)[columns]
+
+    def comparable(df):
+        return df.astype(object).where(df.notna(), _MISSING).map(str)
+
+    changed = (comparable(current) != comparable(before)).any(axis=1)
+    return edited[has_id][changed.to_numpy()], added
@@ -0,0 +1,148 @@
+"""Yatırım lotlarından pozisyon ve maliyet hesabı.
+
+Her `investments` dökümanı bir işlemdir (lot): `side` alanı "Alış" ya da
+"Satış" (eski kayıtlarda alan yoktur, alış sayılır), `quantity` adet,
+`amount` işlemin toplam TL tutarıdır. Lotlar `symbol` (sembolü olmayan
+manuel varlıklarda `asset_name`) anahtarıyla pozisyonlarda toplanır; satışlar
+FIFO ya da ortalama maliyet yöntemiyle kalan maliyetten düşülür ve
+gerçekleşen kâr/zarar hesaplanır.
+
+Pozisyon defteri (`update_book`) her pozisyonun lotlarından bir parmak izi
+tutar; lotları değişmeyen semboller yeniden hesaplanmaz. Bu modül
+Streamlit'e bağımlı değildir.
+"""
+from collections import deque
+
+import pandas as pd
+
+import schemas
+
+BUY, SELL = schemas.INVESTMENT_SIDES
+OPEN, CLOSED = schemas.INVESTMENT_STATUSES
+FIFO = "FIFO"
+AVERAGE = "Ortalama Maliyet"
+COST_METHODS = [FIFO, AVERAGE]
+EPSILON = 1e-9          # kayan nokta artıkları: bunun altındaki adet sıfır sayılır
+
+# Parmak izine giren alanlar: bunlardan biri değişirse pozisyon yeniden hesaplanır
+_FINGERPRINT_FIELDS = ["id", "side", "quantity", "amount", "date_str", "created_at", "symbol", "asset_name"]
+
+
+def position_keys(lots):
+    """Lotların pozisyon anahtarı: sembol, yoksa varlık adı"""
+    symbols = lots["symbol"].astype("string").str.strip().replace("", pd.NA)
+    names = lots["asset_name"].astype("string").str.strip().replace("", pd.NA)
+    return symbols.fillna(names).fillna("-")
+
+
+def _ordered(lots):
+    """İşlem sırası: tarih, sonra kayıt zamanı"""
+    return lots.sort_values(["date_str", "created_at", "id"], na_position="first", kind="stable")
+
+
+def compute_position(lots, method=FIFO):
+    """Bir pozisyonun lotlarını sırayla işler; kalan adet/maliyet ve gerçekleşen K/Z"""
+    open_lots = deque()             # FIFO: [adet, birim maliyet]
+    quantity = cost = realized = oversold = 0.0
+    buys = sells = 0
+    ordered = _ordered(lots)
+    for side, qty, amount in zip(ordered["side"], ordered["quantity"].fillna(0.0), ordered["amount"].fillna(0.0)):
+        if qty <= 0:
+            continue
+        if side != SELL:
+            buys += 1
+            quantity += qty
+            cost += amount
+            open_lots.append([qty, amount / qty])
+            continue
+        sells += 1
+        sold = min(qty, quantity)
+        oversold += qty - sold
+        proceeds = amount * sold / qty
+        if method == AVERAGE:
+            removed = cost * sold / quantity if quantity > EPSILON else 0.0
+        else:
+            removed, remaining = 0.0, sold
+            while remaining > EPSILON and open_lots:
+                lot = open_lots[0]
+                take = min(lot[0], remaining)
+                removed += take * lot[1]
+                lot[0] -= take
+                remaining -= take
+                if lot[0] <= EPSILON:
+                    open_lots.popleft()
+        quantity -= sold
+        cost -= removed
+        realized += proceeds - removed
+        if quantity <= EPSILON:
+            quantity = cost = 0.0
+            open_lots.clear()
+    last = ordered.iloc[-1]
+    symbol = last["symbol"]
+    return {
+        "symbol": None if pd.isna(symbol) or not str(symbol).strip() else str(symbol),
+        "asset_name": "" if pd.isna(last["asset_name"]) else str(last["asset_name"]),
+        "category": "" if pd.isna(last["category"]) else str(last["category"]),
+        "quantity": quantity,
+        "cost": cost,
+        "avg_cost": cost / quantity if quantity > EPSILON else 0.0,
+        "realized": realized,
+        "oversold": oversold,
+        "buys": buys,
+        "sells": sells,
+        "status": OPEN if quantity > EPSILON else CLOSED,
+    }
+
+
+def new_book(method=FIFO):
+    return {"method": method, "fingerprints": {}, "positions": {}}
+
+
+def _fingerprints(lots, keys):
+    """Pozisyon başına lot parmak izi (satır özetlerinin toplamı)"""
+    fields = [f for f in _FINGERPRINT_FIELDS if f in lots.columns]
+    row_hashes = pd.util.hash_pandas_object(lots[fields], index=False)
+    return {key: int(value) for key, value in row_hashes.groupby(keys.to_numpy(), sort=False).sum().items()}
+
+
+def update_book(book, lots, method=FIFO):
+    """Defteri lotlara göre günceller; (yeni defter, yeniden hesaplanan anahtarlar) döner.
+
+    Verilen defter değiştirilmez. Yöntem değiştiyse tüm pozisyonlar, aksi
+    halde yalnızca lotları eklenen/silinen/düzenlenen pozisyonlar hesaplanır.
+    """
+    if book is None or book["method"] != method:
+        book = new_book(method)
+    if lots.empty:
+        return new_book(method), list(book["positions"])
+    keys = position_keys(lots)
+    fingerprints = _fingerprints(lots, keys)
+    changed = [key for key, value in fingerprints.items() if book["fingerprints"].get(key) != value]
+    removed = [key for key in book["positions"] if key not in fingerprints]
+    if not changed and not removed:
+        return book, []
+    positions = {key: pos for key, pos in book["positions"].items() if key in fingerprints}
+    groups = lots.groupby(keys.to_numpy(), sort=False)
+    for key in changed:
+        positions[key] = compute_position(groups.get_group(key), method)
+    return {"method": method, "fingerprints": fingerprints, "positions": positions}, changed + removed
+
+
+def status_updates(lots, book):
+    """Durumu pozisyonuyla uyuşmayan lotlar: {döküman kimliği: "Aktif" | "Kapalı"}"""
+    if lots.empty:
+        return {}
+    expected = position_keys(lots).map(lambda key: book["positions"][key]["status"])
+    stale = lots["status"].astype("string").fillna("") != expected
+    return dict(zip(lots.loc[stale, "id"], expected[stale]))
+
+
+def positions_frame(book):
+    """Defterdeki pozisyonlar (açıklar önce, maliyete göre azalan)"""
+    rows = [dict(pos, key=key) for key, pos in book["positions"].items()]
+    if not rows:
+        return pd.DataFrame(columns=["key", "symbol", "asset_name", "category", "quantity", "cost", "avg_cost",
+                                     "realized", "oversold", "buys", "sells", "status"])
+    frame = pd.DataFrame(rows)
+    frame["_open"] = frame["status"] == OPEN
+    return frame.sort_values(["_open", "cost"], ascending=False).drop(columns="_open").reset_index(drop=True)
@@ -0,0 +1,191 @@
+"""Dış çağrılar için yeniden deneme, zaman aşımı ve devre kesici.
+
+`call(sağlayıcı, fn, ...)` çağrıyı sağlayıcının ayarlarıyla çalıştırır:
+
+- sınırlı sayıda deneme; denemeler arasında "full jitter" üstel bekleme
+  (0 ile min(tavan, taban * 2^n) arasında rastgele),
+- zaman aşımı verilen sağlayıcılarda çağrı paylaşılan bir iş parçacığı
+  havuzunda çalışır ve süre dolunca `CallTimeout` yükseltilir (arka
+  plandaki çağrı kesilemez, yalnızca beklenmez),
+- süreç genelinde sağlayıcı başına bir devre kesici: art arda
+  `failure_threshold` hata sonrası devre açılır ve `reset_timeout` saniye
+  boyunca çağrılar hiç denenmeden `CircuitOpen` ile reddedilir; süre
+  dolunca tek bir deneme çağrısına izin verilir.
+
+`remember`/`last_good` son başarılı sonuçları saklar; çağrı başarısız
+olduğunda çağıran bu değere geri dönebilir. Bu modül Streamlit'e bağımlı
+değildir; uygulama ve arka plan işçisi aynı kesicileri kullanır.
+"""
+import concurrent.futures
+import random
+import threading
+import time
+
+# attempts: toplam deneme, timeout: deneme başına saniye (None: iş parçacığı yok),
+# base_delay/max_delay: bekleme tabanı ve tavanı, failure_threshold/reset_timeout: devre kesici,
+# transient_only: yalnızca geçici hatalar (bkz. transient_errors) yeniden denenir
+PROVIDERS = {
+    "yfinance": {"attempts": 2, "timeout": 4.0, "base_delay": 0.3, "max_delay": 2.0,
+                 "failure_threshold": 2, "reset_timeout": 120.0},
+    "gtts": {"attempts": 2, "timeout": 8.0, "base_delay": 0.5, "max_delay": 2.0,
+             "failure_threshold": 3, "reset_timeout": 120.0},
+    "firestore": {"attempts": 3, "timeout": None, "base_delay": 0.2, "max_delay": 2.0,
+                  "failure_threshold": 5, "reset_timeout": 30.0, "transient_only": True},
+}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Sağlayıcının devresi açık; çağrı denenmedi"""
+
+
+class CallTimeout(Exception):
+    """Çağrı zaman aşımına uğradı"""
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.last_error = None
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    def allow(self):
+        """Çağrı yapılabilir mi; yarı açık durumda yalnızca bir deneme çağrısına izin verir"""
+        with self._lock:
+            state = self._state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self.last_error = error
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._probing = False
+
+    def release(self):
+        """Sonuçlanmayan deneme çağrısının hakkını bırakır (devre durumu değişmez)"""
+        with self._lock:
+            self._probing = False
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="resilience")
+_last_good = {}
+
+
+def breaker(provider):
+    """Sağlayıcının süreç genelindeki devre kesicisi"""
+    with _breakers_lock:
+        if provider not in _breakers:
+            spec = PROVIDERS[provider]
+            _breakers[provider] = CircuitBreaker(provider, spec["failure_threshold"], spec["reset_timeout"])
+        return _breakers[provider]
+
+
+def backoff_delay(attempt, base_delay, max_delay, rng=random):
+    """`attempt`. denemeden sonraki bekleme (full jitter)"""
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def transient_errors():
+    """Yeniden denemeye değer hatalar: bağlantı, zaman aşımı ve Google API'nin geçici hataları"""
+    errors = [ConnectionError, TimeoutError, CallTimeout]
+    try:
+        from google.api_core import exceptions as api_errors
+    except ImportError:
+        return tuple(errors)
+    return tuple(errors + [api_errors.ServiceUnavailable, api_errors.DeadlineExceeded, api_errors.InternalServerError,
+                           api_errors.Aborted, api_errors.TooManyRequests, api_errors.ResourceExhausted])
+
+
+def _run(fn, args, kwargs, timeout):
+    if timeout is None:
+        return fn(*args, **kwargs)
+    future = _executor.submit(fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise CallTimeout(f"{getattr(fn, '__name__', 'çağrı')} {timeout:g} sn içinde yanıt vermedi") from None
+
+
+def call(provider, fn, *args, retry_on=None, attempts=None, **kwargs):
+    """`fn(*args, **kwargs)` çağrısını sağlayıcının deneme/zaman aşımı/devre ayarlarıyla yapar.
+
+    Yalnızca `retry_on` hataları (varsayılan: tüm hatalar ya da sağlayıcı
+    `transient_only` ise geçici hatalar) yeniden denenir ve devreye hata
+    sayılır; zaman aşımı yeniden denenmez. Diğer hatalar (ör. NotFound)
+    sağlayıcının yanıt verdiğini gösterir ve devreye başarı sayılır. Son hata
+    çağırana yükseltilir. Tekrarlanması güvenli olmayan yazmalar (ör.
+    `Increment`) `attempts=1` ile tek denemede yapılır; hataları yine de
+    devreye sayılır.
+    """
+    spec = PROVIDERS[provider]
+    circuit = breaker(provider)
+    if retry_on is None:
+        retry_on = transient_errors() if spec.get("transient_only") else (Exception,)
+    attempts = attempts or spec["attempts"]
+    for attempt in range(attempts):
+        if not circuit.allow():
+            raise CircuitOpen(f"{provider} geçici olarak devre dışı: {circuit.last_error}")
+        try:
+            result = _run(fn, args, kwargs, spec["timeout"])
+        except retry_on as e:
+            circuit.record_failure(e)
+            # Yavaş sağlayıcıyı tekrar beklemek yerine hemen vazgeç
+            if isinstance(e, CallTimeout) or attempt + 1 == attempts:
+                raise
+            time.sleep(backoff_delay(attempt, spec["base_delay"], spec["max_delay"]))
+            continue
+        except Exception:
+            circuit.record_success()
+            raise
+        except BaseException:
+            # Yarıda kesilen deneme çağrısı devreyi yarı açık durumda kilitlemesin
+            circuit.release()
+            raise
+        circuit.record_success()
+        return result
+
+
+def remember(provider, key, value):
+    """Son başarılı sonucu saklar"""
+    _last_good[(provider, key)] = (value, time.time())
+    return value
+
+
+def last_good(provider, key, default=None):
+    """(değer, saklanma zamanı); hiç başarılı sonuç yoksa (default, None)"""
+    return _last_good.get((provider, key), (default, None))
@@ -0,0 +1,129 @@
+"""Finans koleksiyonları için tipli tablo şemaları.
+
+`build_frame(docs, koleksiyon)` Firestore dökümanlarını ara bir sözlük
+listesi kurmadan doğrudan sütun dizilerine yazar ve şemadaki tipleri uygular:
+
+- az sayıda farklı değer alan alanlar (kategori, ödeme şekli, durum...)
+  `category` tipindedir; bilinen seçenekler her zaman kategoriler arasındadır,
+  böylece data_editor seçim kutuları yeni değer seçildiğinde de çalışır,
+- serbest metinler Arrow destekli `string[pyarrow]`,
+- tutarlar `float64`, tarihler `datetime64`.
+
+Şemada olmayan alanlar pandas'ın tahmin ettiği tiple eklenir. Bu modül
+Streamlit'e bağımlı değildir.
+"""
+import pandas as pd
+
+EXPENSE_CATEGORIES = ["Market", "Yiyecek", "İçecek", "Ulaşım", "Eğlence", "Kasap", "Supplement",
+                      "Yatırım", "MISIR Seyahat Harcaması", "Diğer"]
+EXPENSE_METHODS = ["Kredi Kartı", "Nakit", "Banka Kartı"]
+NECESSITY = ["Evet", "Hayır"]
+PAYMENT_TYPES = ["Kredi Kartı Borcu", "Fatura", "Kredi", "Diğer"]
+DEBT_TYPES = ["Alacak", "Borç"]
+DEBT_STATUSES = ["Aktif", "Ödendi"]
+CURRENCIES = ["TL", "USD", "EUR", "Altın"]
+INVESTMENT_SIDES = ["Alış", "Satış"]
+INVESTMENT_STATUSES = ["Aktif", "Kapalı"]
+
+STRING = "string[pyarrow]"
+FLOAT = "float64"
+DATETIME = "datetime"      # Firestore zaman damgası -> datetime64[UTC]
+DAY = "day"                # "YYYY-MM-DD" metni -> datetime64
+# Liste verilen alanlar kategoriktir; liste bilinen seçeneklerdir
+
+_COMMON = {"id": STRING, "created_at": DATETIME, "updated_at": DATETIME}
+
+SCHEMAS = {
+    "expenses": {
+        **_COMMON, "date": DATETIME, "date_str": DAY, "place": STRING, "amount": FLOAT,
+        "category": EXPENSE_CATEGORIES, "method": EXPENSE_METHODS, "necessity": NECESSITY, "desc": STRING,
+    },
+    "payments": {
+        **_COMMON, "date": DATETIME, "date_str": DAY, "category": PAYMENT_TYPES, "amount": FLOAT,
+        "place": STRING, "account": STRING, "desc": STRING,
+    },
+    "investments": {
+        **_COMMON, "date": DATETIME, "date_str": DAY, "symbol": [], "category": [], "asset_name": STRING,
+        "side": INVESTMENT_SIDES, "quantity": FLOAT, "amount": FLOAT, "status": INVESTMENT_STATUSES,
+    },
+    "debts": {
+        **_COMMON, "type": DEBT_TYPES, "person": STRING, "amount": FLOAT, "currency": CURRENCIES,
+        "date": DATETIME, "date_str": DAY, "due_date": DATETIME, "due_date_str": DAY, "status": DEBT_STATUSES,
+    },
+    "liabilities": {**_COMMON, "name": STRING, "remaining_amount": FLOAT},
+}
+
+
+def text_value(value):
+    """Tablo hücresini Firestore'a yazılacak metne çevirir (boş hücre -> "")"""
+    return "" if pd.isna(value) else str(value)
+
+
+def _typed(values, kind):
+    """Sütun değer listesini şemadaki tipe çevirir"""
+    if kind is None:
+        return values
+    if kind == FLOAT:
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype(FLOAT)
+    if kind == DATETIME:
+        return pd.to_datetime(pd.Series(values, dtype=object), errors="coerce", utc=True).dt.as_unit("ns")
+    texts = pd.array(values, dtype=STRING)     # metin olmayanlar str(), boşlar <NA> olur
+    if kind == STRING:
+        return texts
+    if kind == DAY:
+        return pd.to_datetime(pd.Series(texts), errors="coerce", format="ISO8601").dt.as_unit("ns")
+    if isinstance(kind, list):
+        extra = sorted(set(texts.unique().dropna()) - set(kind))
+        return pd.Categorical(texts, categories=list(kind) + extra)
+    raise ValueError(f"Bilinmeyen alan tipi: {kind!r}")
+
+
+def cell_value(collection_name, field, value):
+    """Tek bir değeri şemadaki tipe çevirir (yerel tablo güncellemeleri için)"""
+    kind = SCHEMAS.get(collection_name, {}).get(field)
+    if kind is None:
+        return value
+    return pd.Series(_typed([value], kind)).iloc[0]
+
+
+def build_frame(docs, collection_name=None):
+    """(id, veri) çiftlerinden tipli DataFrame kurar.
+
+    Değerler döküman döküman sütun listelerine eklenir; şemadaki alanlar
+    dökümanda olmasa da sütun olarak bulunur (boş değerle).
+    """
+    schema = SCHEMAS.get(collection_name, {})
+    columns = {field: [] for field in schema if field != "id"}
+    ids, rows = [], 0
+    for doc_id, data in docs:
+        ids.append(doc_id)
+        if not columns.keys() >= data.keys():
+            for field in data.keys() - columns.keys() - {"id"}:
+                columns[field] = [None] * rows
+        for field, column in columns.items():
+            column.append(data.get(field))
+        rows += 1
+    columns = {"id": ids, **columns}
+    return pd.DataFrame({field: _typed(values, schema.get(field)) for field, values in columns.items()},
+                        index=pd.RangeIndex(rows))
+
+
+def _is_categorical(frame, field):
+    return field in frame.columns and isinstance(frame[field].dtype, pd.CategoricalDtype)
+
+
+def concat_frames(frames, collection_name=None):
+    """`build_frame` tablolarını kategorik tipleri kaybetmeden birleştirir"""
+    frames = [f for f in frames if len(f.columns)]
+    if not frames:
+        return pd.DataFrame()
+    for field, kind in SCHEMAS.get(collection_name, {}).items():
+        if not isinstance(kind, list):
+            continue
+        categories = list(kind)
+        for frame in frames:
+            if _is_categorical(frame, field):
+                categories += [c for c in frame[field].cat.categories if c not in categories]
+        frames = [f.assign(**{field: f[field].cat.set_categories(categories)}) if _is_categorical(f, field) else f
+                  for f in frames]
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,226 @@
+"""Koleksiyonların sütunlu (Parquet) anlık görüntüleri ve delta senkronu.
+
+Her koleksiyon `snapshots/{zaman}/{koleksiyon}.parquet` dosyasına sayfalı
+okumalarla yazılır. Dökümanların alanları koleksiyondan koleksiyona (hatta
+döküman başına) değiştiği için dosya `id`, `created_at`, `updated_at` ve
+tipleri korunmuş JSON olarak `doc` sütunlarını taşır. `manifest.json`
+dışa aktarmanın başladığı anı tutar; uygulama açılışta anlık görüntüyü
+okur ve yalnızca o andan sonra eklenen/güncellenen/silinen dökümanları
+Firestore'dan çeker.
+
+Bu modül Streamlit'e bağımlı değildir; `tools/snapshot.py` komut satırı
+aracı ve uygulama aynı fonksiyonları kullanır.
+"""
+import base64
+import datetime
+import json
+import os
+
+import schemas
+
+SNAPSHOT_COLLECTIONS = [
+    "expenses", "payments", "investments", "debts", "liabilities", "vocabulary",
+    "workout_logs", "workout_sets", "measurements", "daily_activities",
+    "habit_logs", "custom_exercises",
+]
+TOMBSTONE_COLLECTION = "sync_tombstones"
+PAGE_SIZE = 500
+BATCH_SIZE = 500          # Firestore toplu yazma sınırı
+MANIFEST = "manifest.json"
+
+
+# --- DÖKÜMAN KODLAMA ---
+def _default(value):
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return {"$dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"$d": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"$b": base64.b64encode(value).decode("ascii")}
+    return str(value)
+
+
+def _hook(obj):
+    if len(obj) == 1:
+        if "$dt" in obj:
+            return datetime.datetime.fromisoformat(obj["$dt"])
+        if "$d" in obj:
+            return datetime.date.fromisoformat(obj["$d"])
+        if "$b" in obj:
+            return base64.b64decode(obj["$b"])
+    return obj
+
+
+def encode_doc(data):
+    """Döküman sözlüğünü tarih/bayt tiplerini koruyan JSON metnine çevirir"""
+    return json.dumps(data, default=_default, ensure_ascii=False, sort_keys=True)
+
+
+def decode_doc(text):
+    """`encode_doc` çıktısını döküman sözlüğüne geri çevirir"""
+    return json.loads(text, object_hook=_hook)
+
+
+def _utc(value):
+    if isinstance(value, datetime.datetime):
+        return value if value.tzinfo else value.replace(tzinfo=datetime.timezone.utc)
+    return None
+
+
+# --- DIŞA AKTARMA ---
+def iter_pages(db, collection_name, page_size=PAGE_SIZE):
+    """Koleksiyonu döküman kimliğine göre sıralı sayfalar halinde okur"""
+    query = db.collection(collection_name).order_by("__name__").limit(page_size)
+    last = None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last = page[-1]
+
+
+def _page_table(page):
+    import pyarrow as pa
+    return pa.table({
+        "id": pa.array([doc.id for doc in page], pa.string()),
+        "created_at": pa.array([_utc(doc.get("created_at")) for doc in page], pa.timestamp("us", tz="UTC")),
+        "updated_at": pa.array([_utc(doc.get("updated_at")) for doc in page], pa.timestamp("us", tz="UTC")),
+        "doc": pa.array([encode_doc(doc.to_dict()) for doc in page], pa.string()),
+    })
+
+
+def export_collection(db, collection_name, path, page_size=PAGE_SIZE):
+    """Koleksiyonu sayfa sayfa tek bir Parquet dosyasına yazar; satır sayısını döner"""
+    import pyarrow.parquet as pq
+    rows = 0
+    writer = None
+    try:
+        for page in iter_pages(db, collection_name, page_size):
+            table = _page_table(page)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table)
+            rows += len(page)
+        if writer is None:
+            pq.write_table(_page_table([]), path, compression="zstd")
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def export_all(db, root, collections=None, page_size=PAGE_SIZE, progress=None):
+    """Tüm koleksiyonları yeni bir anlık görüntü klasörüne yazar; klasör yolunu döner"""
+    started = datetime.datetime.now(datetime.timezone.utc)
+    folder = os.path.join(root, started.strftime("%Y%m%dT%H%M%SZ"))
+    os.makedirs(folder, exist_ok=True)
+    manifest = {"exported_at": started.isoformat(), "collections": {}}
+    for name in collections or SNAPSHOT_COLLECTIONS:
+        rows = export_collection(db, name, os.path.join(folder, f"{name}.parquet"), page_size)
+        manifest["collections"][name] = {"file": f"{name}.parquet", "rows": rows}
+        if progress:
+            progress(name, rows)
+    # Manifest en son yazılır: yarım kalan bir dışa aktarma "en son" sayılmaz
+    with open(os.path.join(folder, MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return folder
+
+
+# --- İÇE AKTARMA ---
+def iter_snapshot_docs(path, batch_size=BATCH_SIZE):
+    """Parquet dosyasındaki dökümanları (id, veri) olarak parça parça okur"""
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=["id", "doc"]):
+        ids = batch.column(0).to_pylist()
+        docs = batch.column(1).to_pylist()
+        yield [(doc_id, decode_doc(text)) for doc_id, text in zip(ids, docs)]
+
+
+def import_collection(db, collection_name, path, batch_size=BATCH_SIZE):
+    """Parquet dosyasını koleksiyona toplu yazmalarla geri yükler; satır sayısını döner"""
+    rows = 0
+    for chunk in iter_snapshot_docs(path, batch_size):
+        batch = db.batch()
+        for doc_id, data in chunk:
+            batch.set(db.collection(collection_name).document(doc_id), data)
+        batch.commit()
+        rows += len(chunk)
+    return rows
+
+
+def import_all(db, folder, collections=None, batch_size=BATCH_SIZE, progress=None):
+    """Anlık görüntü klasöründeki koleksiyonları geri yükler"""
+    manifest = read_manifest(folder)
+    for name, info in manifest["collections"].items():
+        if collections and name not in collections:
+            continue
+        rows = import_collection(db, name, os.path.join(folder, info["file"]), batch_size)
+        if progress:
+            progress(name, rows)
+
+
+# --- AÇILIŞ VE DELTA SENKRONU ---
+def read_manifest(folder):
+    with open(os.path.join(folder, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latest_snapshot(root):
+    """Manifesti tamamlanmış en yeni anlık görüntü klasörü (yoksa None)"""
+    if not os.path.isdir(root):
+        return None
+    for name in sorted(os.listdir(root), reverse=True):
+        folder = os.path.join(root, name)
+        if os.path.isfile(os.path.join(folder, MANIFEST)):
+            return folder
+    return None
+
+
+def load_snapshot_frame(path, collection_name=None):
+    """Bir koleksiyonun anlık görüntüsünü `id` sütunlu tipli DataFrame olarak okur"""
+    docs = (item for chunk in iter_snapshot_docs(path) for item in chunk)
+    return schemas.build_frame(docs, collection_name)
+
+
+def record_deletions(db, collection_name, doc_ids):
+    """Silinen dökümanlar için mezar taşı yazar (delta senkronu silmeleri görsün diye)"""
+    doc_ids = list(doc_ids)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    tombstones = db.collection(TOMBSTONE_COLLECTION).document(collection_name).collection("docs")
+    for start in range(0, len(doc_ids), BATCH_SIZE):
+        batch = db.batch()
+        for doc_id in doc_ids[start:start + BATCH_SIZE]:
+            batch.set(tombstones.document(doc_id), {"deleted_at": now})
+        batch.commit()
+
+
+def fetch_deltas(db, collection_name, since):
+    """`since` anından sonra eklenen/güncellenen dökümanlar ve silinen kimlikler"""
+    col = db.collection(collection_name)
+    upserts = {}
+    for field in ("created_at", "updated_at"):
+        for doc in col.where(field, ">", since).stream():
+            upserts[doc.id] = doc.to_dict()
+    return upserts, fetch_tombstones(db, collection_name, since) - set(upserts)
+
+
+def fetch_tombstones(db, collection_name, since):
+    """`since` anından sonra silinen dökümanların kimlikleri"""
+    tombstones = db.collection(TOMBSTONE_COLLECTION).document(collection_name).collection("docs")
+    return {doc.id for doc in tombstones.where("deleted_at", ">", since).stream()}
+
+
+def apply_deltas(frame, upserts, deleted, collection_name=None):
+    """Anlık görüntü tablosuna deltaları uygular (yeni bir DataFrame döner)"""
+    drop = set(upserts) | set(deleted)
+    if not frame.empty and drop:
+        frame = frame[~frame["id"].isin(drop)]
+    if upserts:
+        fresh = schemas.build_frame(upserts.items(), collection_name)
+        frame = schemas.concat_frames([frame, fresh], collection_name)
+    return frame.reset_index(drop=True)
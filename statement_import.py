@@ -0,0 +1,310 @@
+"""Banka/kart ekstrelerinden (CSV/XLSX) harcama içe aktarma.
+
+Dosya parça parça okunur (CSV için `read_csv(chunksize=...)`, XLSX için
+openpyxl'in salt okunur modu), her parça vektörel olarak normalize edilir:
+tutarlar "1.234,56" / "1,234.56" / "45,00-" biçimlerinden sayıya çevrilir,
+yer adları büyük harfe ve ASCII'ye indirgenir, kategoriler önce kullanıcının
+aynı yerdeki son harcamasından, sonra anahtar kelime kurallarından atanır.
+
+Yinelenenler (tarih, tutar, yer) anahtarının özetiyle ayıklanır. Aynı gün
+aynı yerde aynı tutarda iki harcama olabileceği için anahtara o üçlünün
+kaçıncı tekrarı olduğu da eklenir. İçe aktarılan dökümanların kimliği bu
+özetten türetildiği için aynı ekstre tekrar yüklense bile kayıt çoğalmaz.
+Yazmalar 500'lük toplu işlemlerle yapılır. Bu modül Streamlit'e bağımlı
+değildir.
+"""
+import csv
+import hashlib
+import io
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 5000
+BATCH_SIZE = 500          # Firestore toplu yazma sınırı
+HEADER_SCAN_ROWS = 30     # başlık satırı bu kadar satır içinde aranır
+PREVIEW_ROWS = 20
+
+# Alan -> ekstre başlıklarında görülen adlar (normalize edilmiş, bkz. _norm_header)
+COLUMN_ALIASES = {
+    "date": ["TARIH", "ISLEM TARIHI", "DATE", "TRANSACTION DATE", "VALOR", "ISLEM TARIHI/SAATI"],
+    "place": ["ACIKLAMA", "ISLEM ACIKLAMASI", "ISYERI", "ISYERI ADI", "YER", "DESCRIPTION", "MERCHANT"],
+    "amount": ["TUTAR", "ISLEM TUTARI", "TUTAR (TL)", "AMOUNT", "BORC", "HARCAMA"],
+    "method": ["KART", "KART NO", "KART TIPI", "ODEME SEKLI", "CARD"],
+}
+
+# (düzenli ifade, kategori); ilk eşleşen kural kazanır
+CATEGORY_RULES = [
+    (r"KASAP", "Kasap"),
+    (r"MIGROS|A101|BIM |BIM$|SOK MARKET|CARREFOUR|METRO|MACROCENTER|FILE |GETIR ?BUYUK|MARKET", "Market"),
+    (r"STARBUCKS|KAHVE|COFFEE|CAFFE|ESPRESSO", "İçecek"),
+    (r"YEMEKSEPETI|GETIR ?YEMEK|TRENDYOL ?YEMEK|BURGER|PIZZA|RESTORAN|RESTAURANT|LOKANTA|KEBAP|DONER", "Yiyecek"),
+    (r"SHELL|OPET|PETROL|BP |TOTAL|ISTANBULKART|UBER|BITAKSI|TAKSI|HGS|OGS|METRO ISTANBUL|THY|PEGASUS", "Ulaşım"),
+    (r"NETFLIX|SPOTIFY|YOUTUBE|SINEMA|CINEMA|STEAM|PLAYSTATION|BILETIX|DISNEY", "Eğlence"),
+    (r"SUPPLEMENT|PROTEIN|VITAMIN", "Supplement"),
+    (r"MIDAS|BORSA|YATIRIM|KRIPTO|BINANCE|BTCTURK", "Yatırım"),
+]
+DEFAULT_CATEGORY = "Diğer"
+
+_ASCII = str.maketrans("çğıöşüÇĞİÖŞÜâîû", "cgiosuCGIOSUaiu")
+
+
+def _norm_header(value):
+    return " ".join(str(value or "").translate(_ASCII).upper().split())
+
+
+def normalize_places(values):
+    """Yer adlarını karşılaştırılabilir biçime getirir (ASCII, büyük harf, tek boşluk)"""
+    return (values.fillna("").astype(str).str.translate(_ASCII).str.upper()
+            .str.replace(r"\s+", " ", regex=True).str.strip())
+
+
+# --- DOSYA OKUMA ---
+def _is_xlsx(filename):
+    return filename.lower().endswith((".xlsx", ".xlsm"))
+
+
+def _csv_format(file):
+    """(kodlama, ayırıcı) — Türk bankaları çoğunlukla cp1254 ve ';' kullanır"""
+    file.seek(0)
+    sample = file.read(64 * 1024)
+    file.seek(0)
+    if b"\n" in sample:
+        sample = sample[:sample.rfind(b"\n")]
+    for encoding in ("utf-8-sig", "cp1254", "latin-1"):
+        try:
+            text = sample.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    try:
+        sep = csv.Sniffer().sniff(text, delimiters=";,\t|").delimiter
+    except csv.Error:
+        sep = ";" if text.count(";") > text.count(",") else ","
+    return encoding, sep
+
+
+def _header_score(row):
+    names = {_norm_header(v) for v in row}
+    return sum(any(alias in names for alias in aliases) for aliases in COLUMN_ALIASES.values())
+
+
+def _find_header(rows):
+    """Ekstrenin başındaki banka bilgisi satırlarını atlayıp başlık satırını bulur"""
+    best, best_score = 0, 0
+    for i, row in enumerate(rows[:HEADER_SCAN_ROWS]):
+        score = _header_score(row)
+        if score > best_score:
+            best, best_score = i, score
+    return best
+
+
+def _head_rows(file, filename):
+    """Başlık araması için ilk satırlar (ham değerler)"""
+    file.seek(0)
+    if _is_xlsx(filename):
+        from openpyxl import load_workbook
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            return [list(r) for r in wb.active.iter_rows(max_row=HEADER_SCAN_ROWS, values_only=True)]
+        finally:
+            wb.close()
+    encoding, sep = _csv_format(file)
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    try:
+        return [row for _, row in zip(range(HEADER_SCAN_ROWS), csv.reader(text, delimiter=sep))]
+    finally:
+        text.detach()
+
+
+def iter_statement_chunks(file, filename, chunksize=CHUNK_ROWS):
+    """Ekstreyi başlık satırından itibaren `chunksize` satırlık DataFrame'ler halinde okur"""
+    header_idx = _find_header(_head_rows(file, filename))
+    file.seek(0)
+    if _is_xlsx(filename):
+        from openpyxl import load_workbook
+        wb = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(min_row=header_idx + 1, values_only=True)
+            header = [str(h) if h is not None else f"Sütun {i + 1}" for i, h in enumerate(next(rows, []))]
+            buffer = []
+            for row in rows:
+                if any(v is not None for v in row):
+                    buffer.append(row[:len(header)])
+                if len(buffer) == chunksize:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            wb.close()
+        return
+    encoding, sep = _csv_format(file)
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    try:
+        yield from pd.read_csv(text, sep=sep, skiprows=header_idx, chunksize=chunksize, dtype=str,
+                               skip_blank_lines=True, on_bad_lines="skip")
+    finally:
+        text.detach()
+
+
+def read_preview(file, filename, rows=PREVIEW_ROWS):
+    """Eşleme ekranı için ilk satırlar"""
+    return next(iter_statement_chunks(file, filename, chunksize=rows), pd.DataFrame())
+
+
+def detect_mapping(columns):
+    """{alan: sütun} tahmini; bulunamayan alan None"""
+    normalized = {_norm_header(c): c for c in columns}
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        mapping[field] = next((normalized[a] for a in aliases if a in normalized), None)
+    return mapping
+
+
+# --- NORMALİZASYON ---
+def parse_amounts(values):
+    """Metin ya da sayı tutarları float'a çevirir ("1.234,56", "1,234.56", "45,00-", "₺ 12")"""
+    values = pd.Series(values)
+    is_text = values.map(lambda v: isinstance(v, str))
+    out = pd.to_numeric(values.where(~is_text), errors="coerce").astype("float64")
+    if is_text.any():
+        s = values[is_text].str.replace(r"[^\d,.\-]", "", regex=True)
+        s = s.str.replace(r"^(.*)-$", r"-\1", regex=True)
+        dec = s.str.extract(r"([.,])\d{1,2}$")[0]
+        comma_dec = s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+        dot_dec = s.str.replace(",", "", regex=False)
+        no_dec = s.str.replace(r"[.,]", "", regex=True)
+        text = pd.Series(np.select([dec == ",", dec == "."], [comma_dec, dot_dec], no_dec), index=s.index)
+        out[is_text] = pd.to_numeric(text, errors="coerce")
+    return out
+
+
+DATE_FORMATS = ["%d.%m.%Y", "%d/%m/%Y", "%Y-%m-%d", "%d-%m-%Y", "%d.%m.%Y %H:%M", "%d.%m.%Y %H:%M:%S",
+                "%d/%m/%Y %H:%M", "%Y-%m-%d %H:%M:%S"]
+
+
+def parse_dates(values):
+    """Tarihleri gün önce varsayarak çevirir; biçim örnek satırlardan bir kez seçilir"""
+    values = pd.Series(values)
+    if not values.map(lambda v: isinstance(v, str)).any():
+        return pd.to_datetime(values, errors="coerce")
+    text = values.astype("string").str.strip()
+    sample = text.dropna().head(50)
+    best = max(DATE_FORMATS, key=lambda fmt: pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+    parsed = pd.to_datetime(text, format=best, errors="coerce")
+    if parsed.isna().any():
+        rest = parsed.isna() & text.notna()
+        parsed[rest] = pd.to_datetime(text[rest], format="mixed", dayfirst=True, errors="coerce")
+    return parsed
+
+
+def normalize_chunk(raw, mapping, default_method, debits_negative=True):
+    """Ham parçayı tarih/yer/tutar/ödeme şekli tablosuna çevirir; geçersiz satırları atar"""
+    frame = pd.DataFrame(index=raw.index)
+    frame["date"] = parse_dates(raw[mapping["date"]]).dt.normalize()
+    frame["place"] = raw[mapping["place"]].fillna("").astype(str).str.strip()
+    amount = parse_amounts(raw[mapping["amount"]])
+    frame["amount"] = (-amount if debits_negative else amount).round(2)
+    if mapping.get("method"):
+        frame["method"] = raw[mapping["method"]].fillna(default_method).astype(str).str.strip()
+    else:
+        frame["method"] = default_method
+    valid = frame["date"].notna() & frame["amount"].gt(0) & frame["place"].ne("")
+    frame = frame[valid].copy()
+    frame["date_str"] = frame["date"].dt.strftime("%Y-%m-%d")
+    frame["place_key"] = normalize_places(frame["place"])
+    return frame
+
+
+# --- YİNELENEN AYIKLAMA ---
+def _base_keys(date_str, amount, place_key):
+    return date_str + "|" + amount.map("{:.2f}".format) + "|" + place_key
+
+
+def occurrence_keys(base, seen):
+    """(tarih, tutar, yer) üçlüsüne tekrar sırasını ekler; `seen` sayaçlarını günceller"""
+    offset = base.map(seen).fillna(0).astype(int)
+    keys = base + "#" + (offset + base.groupby(base).cumcount()).astype(str)
+    for key, count in base.value_counts().items():
+        seen[key] = seen.get(key, 0) + count
+    return keys
+
+
+def hash_keys(keys):
+    return keys.map(lambda k: hashlib.sha1(k.encode("utf-8")).hexdigest()[:20])
+
+
+def existing_key_index(existing):
+    """Mevcut harcamaların özet kümesi ve {yer: son kategori} geçmişi"""
+    if existing is None or existing.empty or not {"date_str", "amount", "place"} <= set(existing.columns):
+        return set(), {}
+    df = existing[["date_str", "amount", "place"] + (["category"] if "category" in existing.columns else [])].copy()
+    df["date_str"] = pd.to_datetime(df["date_str"], errors="coerce").dt.strftime("%Y-%m-%d")
+    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").round(2)
+    df = df.dropna(subset=["date_str", "amount"])
+    df["place_key"] = normalize_places(df["place"])
+    keys = hash_keys(occurrence_keys(_base_keys(df["date_str"], df["amount"], df["place_key"]), {}))
+    history = {}
+    if "category" in df.columns:
+        # get_data yeniden eskiye sıralı döner: her yerin ilk kaydı en güncel kategorisidir
+        latest = df.dropna(subset=["category"]).drop_duplicates("place_key", keep="first")
+        history = dict(zip(latest["place_key"], latest["category"].astype(str)))
+    return set(keys), history
+
+
+# --- KATEGORİ ---
+def assign_categories(place_keys, history=None):
+    """Önce yerin geçmişteki kategorisi, sonra anahtar kelime kuralları"""
+    conditions = [place_keys.str.contains(pattern, regex=True) for pattern, _ in CATEGORY_RULES]
+    by_rule = pd.Series(np.select(conditions, [c for _, c in CATEGORY_RULES], DEFAULT_CATEGORY), index=place_keys.index)
+    if history:
+        return place_keys.map(history).fillna(by_rule)
+    return by_rule
+
+
+# --- İÇE AKTARMA ---
+def import_statement(db, file, filename, mapping, existing=None, default_method="Kredi Kartı",
+                     necessity="Evet", debits_negative=True, created_at=None,
+                     chunksize=CHUNK_ROWS, batch_size=BATCH_SIZE, progress=None):
+    """Ekstreyi akış halinde okuyup yeni harcamaları toplu yazar; sayaç sözlüğü döner"""
+    index, history = existing_key_index(existing)
+    seen = {}
+    stats = {"rows": 0, "invalid": 0, "duplicates": 0, "written": 0, "batches": 0}
+    col = db.collection("expenses")
+    batch, pending = db.batch(), 0
+    for raw in iter_statement_chunks(file, filename, chunksize):
+        stats["rows"] += len(raw)
+        frame = normalize_chunk(raw, mapping, default_method, debits_negative)
+        stats["invalid"] += len(raw) - len(frame)
+        if frame.empty:
+            continue
+        frame["key"] = hash_keys(occurrence_keys(_base_keys(frame["date_str"], frame["amount"], frame["place_key"]), seen))
+        fresh = ~frame["key"].isin(index)
+        stats["duplicates"] += int((~fresh).sum())
+        frame = frame[fresh]
+        index.update(frame["key"])
+        frame["category"] = assign_categories(frame["place_key"], history)
+        for date, date_str, place, amount, method, category, key in zip(
+                frame["date"].dt.to_pydatetime(), frame["date_str"], frame["place"], frame["amount"],
+                frame["method"], frame["category"], frame["key"]):
+            batch.set(col.document(f"imp_{key}"), {
+                "date": date, "date_str": date_str, "place": place, "amount": float(amount),
+                "category": category, "method": method, "necessity": necessity, "desc": "",
+                "import_key": key, "source": filename, "created_at": created_at,
+            })
+            pending += 1
+            if pending == batch_size:
+                batch.commit()
+                stats["written"] += pending
+                stats["batches"] += 1
+                batch, pending = db.batch(), 0
+        if progress:
+            progress(stats)
+    if pending:
+        batch.commit()
+        stats["written"] += pending
+        stats["batches"] += 1
+    if progress:
+        progress(stats)
+    return stats
@@ -0,0 +1,153 @@
+"""Kullanıcı başına bölümlenmiş koleksiyonlar.
+
+Tüm veriler `users/{uid}/{koleksiyon}` altında tutulur. `scoped_client(db,
+uid)` Firestore istemcisini saran ince bir vekil döner: `collection(ad)`
+çağrıları o kullanıcının alt koleksiyonuna yönlenir, geri kalan her şey
+(batch, get_all, ...) istemciye aynen iletilir. Böylece sorgular yalnızca
+bir kullanıcının dökümanlarını tarar ve birden fazla kullanıcı aynı
+kurulumu birbirini yavaşlatmadan paylaşabilir.
+
+`migrate_user(...)` eski global koleksiyonları bir kullanıcının altına
+kopyalar (bkz. tools/migrate_users.py). Bu modül Streamlit'e bağımlı
+değildir.
+"""
+import os
+
+import snapshot
+
+USERS_COLLECTION = "users"
+DEFAULT_USER_ID = "default"
+# Aktif (devam eden) idman taslaklarının olay günlüğü; taşımada birlikte kopyalanır
+DRAFT_SUBCOLLECTION = "draft_log"
+
+
+def validate_uid(uid):
+    """Firestore döküman kimliği olarak kullanılabilecek kullanıcı kimliğini döner"""
+    uid = str(uid or "").strip()
+    if not uid or "/" in uid or uid in (".", "..") or (uid.startswith("__") and uid.endswith("__")):
+        raise ValueError(f"Geçersiz kullanıcı kimliği: {uid!r}")
+    if len(uid.encode("utf-8")) > 1500:
+        raise ValueError("Kullanıcı kimliği 1500 bayttan uzun olamaz")
+    return uid
+
+
+def default_user_id(config=None):
+    """Giriş sistemi yokken kullanılacak kimlik: LIFEOS_USER_ID > [app] user_id > "default" """
+    uid = os.environ.get("LIFEOS_USER_ID") or (config or {}).get("user_id") or DEFAULT_USER_ID
+    return validate_uid(uid)
+
+
+def user_path(uid, collection_name):
+    return f"{USERS_COLLECTION}/{uid}/{collection_name}"
+
+
+class UserScopedClient:
+    """Firestore istemcisi; koleksiyonları tek bir kullanıcının altına yönlendirir"""
+
+    def __init__(self, client, uid):
+        self._target = client
+        self.uid = validate_uid(uid)
+
+    def collection(self, name):
+        return self._target.collection(USERS_COLLECTION).document(self.uid).collection(name)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def scoped_client(client, uid):
+    """İstemciyi `uid` kullanıcısına bölümler"""
+    if isinstance(client, UserScopedClient):
+        client = client._target
+    return UserScopedClient(client, uid)
+
+
+# --- ESKİ GLOBAL VERİNİN TAŞINMASI ---
+def _copy_docs(db, docs, target, batch_size):
+    """(id, veri) çiftlerini hedef koleksiyona aynı kimliklerle toplu yazar"""
+    batch, pending, written = db.batch(), 0, 0
+    for doc_id, data in docs:
+        batch.set(target.document(doc_id), data)
+        pending += 1
+        written += 1
+        if pending == batch_size:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+    return written
+
+
+def migrate_collection(db, uid, collection_name, page_size=snapshot.PAGE_SIZE, batch_size=snapshot.BATCH_SIZE):
+    """Global koleksiyonu `users/{uid}/` altına kopyalar; kopyalanan döküman sayısını döner.
+
+    Döküman kimlikleri korunduğu için işlem yarıda kesilirse tekrar
+    çalıştırılabilir. Aktif idman taslaklarının olay günlüğü de taşınır.
+    """
+    target = scoped_client(db, uid).collection(collection_name)
+    active = []
+
+    def pages():
+        for page in snapshot.iter_pages(db, collection_name, page_size):
+            for doc in page:
+                data = doc.to_dict()
+                if collection_name == "workout_logs" and data.get("status") == "active":
+                    active.append(doc.id)
+                yield doc.id, data
+
+    copied = _copy_docs(db, pages(), target, batch_size)
+    for draft_id in active:
+        source = db.collection(collection_name).document(draft_id).collection(DRAFT_SUBCOLLECTION)
+        events = ((doc.id, doc.to_dict()) for doc in source.stream())
+        _copy_docs(db, events, target.document(draft_id).collection(DRAFT_SUBCOLLECTION), batch_size)
+    return copied
+
+
+def count_docs(collection_ref, page_size=snapshot.PAGE_SIZE):
+    """Koleksiyondaki döküman sayısı (yalnızca kimlikleri okuyarak)"""
+    query = collection_ref.select([]).order_by("__name__").limit(page_size)
+    total, last = 0, None
+    while True:
+        page = list((query.start_after(last) if last is not None else query).stream())
+        if not page:
+            return total
+        total += len(page)
+        last = page[-1]
+
+
+def delete_collection(db, collection_ref, batch_size=snapshot.BATCH_SIZE):
+    """Koleksiyonu (ve aktif taslakların olay günlüklerini) toplu silmelerle boşaltır"""
+    deleted = 0
+    while True:
+        docs = list(collection_ref.limit(batch_size).stream())
+        if not docs:
+            return deleted
+        batch = db.batch()
+        for doc in docs:
+            if (doc.to_dict() or {}).get("status") == "active":
+                delete_collection(db, doc.reference.collection(DRAFT_SUBCOLLECTION), batch_size)
+            batch.delete(doc.reference)
+        batch.commit()
+        deleted += len(docs)
+
+
+def migrate_user(db, uid, collections=None, delete_source=False, page_size=snapshot.PAGE_SIZE, progress=None):
+    """Global koleksiyonları kullanıcının altına taşır; {koleksiyon: sayı} döner.
+
+    `delete_source` verilirse kaynak, yalnızca hedefteki döküman sayısı
+    kaynağınkiyle eşleştiğinde silinir.
+    """
+    uid = validate_uid(uid)
+    scoped = scoped_client(db, uid)
+    result = {}
+    for name in collections or snapshot.SNAPSHOT_COLLECTIONS:
+        copied = migrate_collection(db, uid, name, page_size)
+        result[name] = copied
+        if progress:
+            progress(name, copied)
+        if delete_source and copied:
+            source, target = db.collection(name), scoped.collection(name)
+            if count_docs(target, page_size) < count_docs(source, page_size):
+                raise RuntimeError(f"{name}: hedefteki döküman sayısı kaynaktan az, kaynak silinmedi")
+            delete_collection(db, source)
+    return result
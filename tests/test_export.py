@@ -0,0 +1,34 @@
+import os
+
+import export
+
+
+def _touch(folder, name, mtime):
+    path = os.path.join(folder, name)
+    open(path, "w").close()
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_prune_exports_keeps_newest_and_drops_old(tmp_path):
+    now = 1_000_000.0
+    for i in range(4):
+        _touch(tmp_path, f"lifeos_{i}.xlsx", now - i * 60)
+    _touch(tmp_path, "running.xlsx.part", now - 10)
+    _touch(tmp_path, "stale.xlsx.part", now - 2 * export.EXPORT_MAX_AGE)
+
+    assert export.prune_exports(str(tmp_path), keep=2, now=now) == 3
+    assert sorted(os.listdir(tmp_path)) == ["lifeos_0.xlsx", "lifeos_1.xlsx", "running.xlsx.part"]
+
+
+def test_export_paths_are_unique_within_a_second(tmp_path):
+    assert export.export_path(str(tmp_path)) != export.export_path(str(tmp_path))
+
+
+def test_prune_exports_skips_held_files(tmp_path):
+    now = 1_000_000.0
+    held = _touch(tmp_path, "held.xlsx", now - 2 * export.EXPORT_MAX_AGE)
+    _touch(tmp_path, "old.xlsx", now - 2 * export.EXPORT_MAX_AGE)
+
+    assert export.prune_exports(str(tmp_path), now=now, held={held}) == 1
+    assert os.listdir(tmp_path) == ["held.xlsx"]
@@ -0,0 +1,38 @@
+import pytest
+
+import resilience
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    monkeypatch.setitem(resilience.PROVIDERS, "test", {
+        "attempts": 1, "timeout": None, "base_delay": 0.0, "max_delay": 0.0,
+        "failure_threshold": 1, "reset_timeout": 0.0, "transient_only": True})
+    monkeypatch.setattr(resilience, "_breakers", {})
+    return "test"
+
+
+def _fail(error):
+    def fn():
+        raise error
+    return fn
+
+
+def test_non_transient_probe_closes_circuit(provider):
+    with pytest.raises(ConnectionError):
+        resilience.call(provider, _fail(ConnectionError("down")))
+    assert resilience.breaker(provider).state == resilience.HALF_OPEN
+
+    # Deneme çağrısı yanıt aldı ama yeniden denenmeyen bir hata döndü (ör. NotFound)
+    with pytest.raises(KeyError):
+        resilience.call(provider, _fail(KeyError("yok")))
+    assert resilience.breaker(provider).state == resilience.CLOSED
+    assert resilience.call(provider, lambda: 1) == 1
+
+
+def test_interrupted_probe_is_released(provider):
+    with pytest.raises(ConnectionError):
+        resilience.call(provider, _fail(ConnectionError("down")))
+    with pytest.raises(KeyboardInterrupt):
+        resilience.call(provider, _fail(KeyboardInterrupt()))
+    assert resilience.breaker(provider).allow()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools"))
+
+import tracing
+from fake_firestore import FakeStore
+
+
+def test_list_documents_is_traced():
+    client = tracing.traced_client(FakeStore().client())
+    for name in ("2026_1", "2026_2", "2026_3"):
+        client.collection("habit_logs").document(name).set({"year": 2026})
+
+    trace = tracing.begin_trace("test")
+    ids = sorted(ref.id for ref in client.collection("habit_logs").list_documents())
+    summary = tracing.end_trace(trace)
+
+    assert ids == ["2026_1", "2026_2", "2026_3"]
+    assert summary["quota"]["reads"] == 3
+    assert [c["name"] for c in summary["calls"]] == ["firestore.list_documents"]
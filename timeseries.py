@@ -0,0 +1,83 @@
+"""Uzun dönemli grafikler için zaman serisi katmanı.
+
+Seriler önce seçilen aralığa kırpılır (`clip_range`), aynı güne düşen
+ölçümler günlük ortalamaya indirilir, ardından en çok `max_points` noktaya
+Largest-Triangle-Three-Buckets (LTTB) ile seyreltilir. LTTB seriyi eşit
+kovalara böler ve her kovadan, önceki seçilen nokta ile sonraki kovanın
+ortalamasıyla en büyük üçgeni kuran noktayı seçer; tepe ve çukurlar
+korunurken çok yıllık bir grafik tarayıcıya birkaç yüz nokta olarak gider.
+
+Bu modül Streamlit'e bağımlı değildir.
+"""
+import numpy as np
+import pandas as pd
+
+# Aralık adı -> geriye doğru ay sayısı (None: tüm kayıtlar)
+RANGES = {"Ay": 1, "Çeyrek": 3, "Yıl": 12, "Tümü": None}
+MAX_POINTS = 300
+
+
+def range_start(end, months):
+    """`end` gününden geriye `months` ay; None ise sınırsız"""
+    if months is None:
+        return None
+    return pd.Timestamp(end).normalize() - pd.DateOffset(months=months)
+
+
+def clip_range(series, months, end=None):
+    """Zaman dizinli seriyi son `months` aya kırpar"""
+    if series.empty:
+        return series
+    end = pd.Timestamp(end) if end is not None else series.index.max()
+    start = range_start(end, months)
+    if start is None:
+        return series[series.index <= end]
+    return series[(series.index > start) & (series.index <= end)]
+
+
+def daily_mean(series):
+    """Aynı güne düşen değerlerin ortalaması; boş değerler atılır"""
+    series = series.dropna()
+    if series.empty:
+        return series
+    return series.groupby(series.index.normalize()).mean()
+
+
+def lttb(x, y, n_out):
+    """LTTB ile seçilen noktaların sıra numaraları (ilk ve son nokta her zaman dahil)"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    # İlk ve son nokta dışındaki n-2 nokta n_out-2 kovaya bölünür
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[edges[i + 1]:edges[i + 2]].mean()
+            next_y = y[edges[i + 1]:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        px, py = x[previous], y[previous]
+        area = np.abs((px - next_x) * (y[start:stop] - py) - (px - x[start:stop]) * (next_y - py))
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(series, max_points=MAX_POINTS):
+    """Seriyi en çok `max_points` noktaya seyreltir (LTTB)"""
+    series = series.dropna().sort_index()
+    if len(series) <= max_points:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(dtype=float), max_points)]
+
+
+def chart_series(series, months, end=None, max_points=MAX_POINTS):
+    """Grafik için hazır seri: aralığa kırpılmış, günlük ortalamalı, seyreltilmiş"""
+    return downsample(clip_range(daily_mean(series), months, end), max_points)
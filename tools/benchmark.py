@@ -0,0 +1,333 @@
+"""Sentetik veriyle modül/sekme bazlı performans ölçümü.
+
+Her boyut için (varsayılan 1k ve 10k döküman/koleksiyon) gerçekçi sentetik
+veri üretir, uygulamayı Streamlit `AppTest` ile bellek içi Firestore
+(tools/fake_firestore.py) üzerinde çalıştırır ve her modül için soğuk
+açılış ile yeniden çalıştırma (rerun) gecikmesini, Firestore okuma/yazma
+sayılarını ve tepe bellek kullanımını kaydeder. Üst seviye sekmeler
+(`st.tabs`) ayrıca süre ve okuma sayısıyla raporlanır.
+
+Kullanım:
+    python tools/benchmark.py                          # 1k, 10k -> bench/results.json
+    python tools/benchmark.py --sizes 1000 100000 1000000 --modules "Finans Merkezi"
+    python tools/benchmark.py --baseline bench/onceki.json --tolerance 0.25
+
+--baseline verilirse aynı boyut/modül/senaryo için gecikme ya da okuma
+sayısı toleransı aşan artışlar listelenir ve çıkış kodu 1 olur. Fiyatlar
+ağdan çekilmez; yfinance sabit bir fiyat döndürecek şekilde değiştirilir.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+# Kök klasör önce gelmeli: tools/snapshot.py, uygulamanın snapshot modülünü gölgelemesin
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+
+from fake_firestore import FakeStore, install  # noqa: E402
+
+MODULES = ["Dil Asistanı", "Fiziksel Takip", "Alışkanlık Takibi", "Finans Merkezi"]
+DEFAULT_SIZES = [1000, 10000]
+MAX_HABIT_MONTHS = 240       # habit_logs ay başına tek döküman tutar
+FAKE_PRICE = 42.0
+
+
+# --- SENTETİK VERİ ---
+def _dates(rng, n, days=3 * 365):
+    today = datetime.date.today()
+    return sorted((today - datetime.timedelta(days=rng.randrange(days)) for _ in range(n)), reverse=True)
+
+
+def _stamp(d, rng):
+    return datetime.datetime.combine(d, datetime.time(rng.randrange(7, 23), rng.randrange(60)))
+
+
+def generate(store, n, seed=0, uid=None):
+    """Kullanıcının her koleksiyonuna yaklaşık `n` döküman yükler; koleksiyon başına sayıları döner"""
+    import tenancy
+    from workout_analytics import flatten_workout_sets
+    from habit_analytics import pack_days
+
+    uid = uid or tenancy.default_user_id()
+
+    rng = random.Random(seed)
+    counts = {}
+
+    def load(name, items):
+        items = list(items)
+        store.bulk_load(tenancy.user_path(uid, name), items)
+        counts[name] = len(items)
+
+    places = ["Migros", "A101", "Starbucks", "Shell", "Trendyol", "Getir", "Eczane", "Kira"]
+    exp_cats = ["Market", "Yiyecek", "Ulaşım", "Fatura", "Eğlence", "Sağlık", "Giyim"]
+    load("expenses", ((None, {
+        "date": _stamp(d, rng), "date_str": str(d), "place": rng.choice(places),
+        "amount": round(rng.uniform(10, 2500), 2), "category": rng.choice(exp_cats),
+        "method": rng.choice(["Nakit", "Kredi Kartı", "Banka Kartı"]),
+        "necessity": rng.choice(["Evet", "Hayır"]), "desc": "", "created_at": _stamp(d, rng),
+    }) for d in _dates(rng, n)))
+    load("payments", ((None, {
+        "date": _stamp(d, rng), "date_str": str(d), "place": rng.choice(["Banka", "Elektrik", "Su", "İnternet"]),
+        "amount": round(rng.uniform(100, 10000), 2), "category": rng.choice(["Kredi Kartı Borcu", "Fatura", "Kredi"]),
+        "account": "Maaş Kartı", "desc": "", "created_at": _stamp(d, rng),
+    }) for d in _dates(rng, n)))
+    symbols = ["THYAO.IS", "GARAN.IS", "USDTRY=X", "XAUTRY=X", "BTC-TRY", "AAPL", ""]
+    load("investments", ((None, {
+        "date": _stamp(d, rng), "date_str": str(d), "symbol": (s := rng.choice(symbols)),
+        "category": "Diğer / Manuel Arama" if not s else "Borsa İstanbul (BIST)",
+        "asset_name": s or "Fon", "quantity": round(rng.uniform(0.1, 100), 4),
+        "amount": round(rng.uniform(100, 50000), 2), "status": "Aktif", "created_at": _stamp(d, rng),
+    }) for d in _dates(rng, n)))
+    load("debts", ((None, {
+        "type": rng.choice(["Borç", "Alacak"]), "person": f"Kişi {rng.randrange(50)}",
+        "amount": round(rng.uniform(50, 5000), 2), "currency": "TL", "date_str": str(d),
+        "due_date_str": str(d + datetime.timedelta(days=30)), "status": rng.choice(["Aktif", "Ödendi"]),
+        "created_at": _stamp(d, rng),
+    }) for d in _dates(rng, n)))
+    load("liabilities", ((None, {
+        "name": f"Kredi {i}", "remaining_amount": round(rng.uniform(1000, 200000), 2), "created_at": _stamp(d, rng),
+    }) for i, d in enumerate(_dates(rng, n))))
+    load("vocabulary", ((None, {
+        "en": f"word{i}", "de": f"Wort{i}", "tr": f"kelime{i}", "sentence_source": f"This is sentence {i}.",
+        "learned_count": rng.randrange(5), "created_at": _stamp(d, rng),
+    }) for i, d in enumerate(_dates(rng, n))))
+    load("measurements", ((None, {
+        "date_str": str(d), "weight": round(85 - i * 0.001 + rng.uniform(-0.5, 0.5), 1), "created_at": _stamp(d, rng),
+    }) for i, d in enumerate(_dates(rng, n))))
+    load("daily_activities", ((None, {
+        "date_str": str(d), "pushups": rng.randrange(100), "pullups": rng.randrange(30),
+        "muscleups": rng.randrange(10), "created_at": _stamp(d, rng),
+    }) for d in _dates(rng, n)))
+    load("custom_exercises", ((None, {
+        "region": rng.choice(["Göğüs", "Sırt", "Bacak", "Omuz"]), "name": f"Özel Hareket {i}",
+        "created_at": datetime.datetime.now(),
+    }) for i in range(n)))
+
+    logs, sets = [], []
+    lifts = ["Bench Press", "Squat", "Deadlift", "Overhead Press", "Barbell Row", "Lat Pulldown"]
+    for i, d in enumerate(_dates(rng, n)):
+        workout_id = f"w{i:08d}"
+        sections = [{"name": "Göğüs", "duration": 40, "order": 0, "exercises": [
+            {"name": rng.choice(lifts), "sets": [
+                {"weight": float(rng.randrange(40, 140, 5)), "reps": rng.randrange(3, 12), "rom": "Tam",
+                 "difficulty": rng.choice(["Düşük", "Orta", "Yüksek", "Tükeniş"]), "is_dropset": False}
+                for _ in range(3)]}
+            for _ in range(2)]}]
+        logs.append((workout_id, {
+            "date": _stamp(d, rng), "date_str": str(d), "main_focus": "Göğüs", "total_duration": 40,
+            "hardest_part": "Göğüs", "status": "done", "sets_indexed": True, "sections": sections,
+            "created_at": _stamp(d, rng),
+        }))
+        for j, row in enumerate(flatten_workout_sets(workout_id, str(d), sections)):
+            row["date"] = _stamp(d, rng)
+            sets.append((f"{workout_id}_{row['section_idx']:02d}_{j:03d}", row))
+    load("workout_logs", logs)
+    load("workout_sets", sets)
+
+    today = datetime.date.today()
+    months = []
+    y, m = today.year, today.month
+    for _ in range(min(n, MAX_HABIT_MONTHS)):
+        months.append((y, m))
+        y, m = (y - 1, 12) if m == 1 else (y, m - 1)
+    habits = ["Saat 6:00'da Uyanmak", "10 Sayfa Kitap Okumak", "4.5 Litre Su İçmek", "N.F"]
+    load("habit_logs", ((f"{y}_{m}", {
+        "year": y, "month": m,
+        "habit_bits": {h: pack_days([rng.random() < 0.6 for _ in range(31)]) for h in habits},
+        "sleep_bits": {"7 Saat": pack_days([rng.random() < 0.5 for _ in range(31)])},
+    }) for y, m in months))
+    return counts
+
+
+# --- ÖLÇÜM ---
+class TabProbe:
+    """Üst seviye st.tabs sekmelerinin süresini ve okuma sayısını toplar"""
+
+    def __init__(self, store):
+        self.store = store
+        self.depth = 0
+        self.tabs = {}
+
+    def install(self):
+        import streamlit as st
+        original = st.tabs
+        probe = self
+
+        def tabs(labels, *args, **kwargs):
+            containers = original(labels, *args, **kwargs)
+            if probe.depth:
+                return containers
+            return [_TimedTab(probe, c, label) for c, label in zip(containers, labels)]
+
+        st.tabs = tabs
+
+    def reset(self):
+        self.tabs = {}
+
+
+class _TimedTab:
+    def __init__(self, probe, container, label):
+        self._probe, self._container, self._label = probe, container, label
+
+    def __getattr__(self, name):
+        return getattr(self._container, name)
+
+    def __enter__(self):
+        self._probe.depth += 1
+        self._t0 = time.perf_counter()
+        self._r0 = self._probe.store.counters()["reads"]
+        return self._container.__enter__()
+
+    def __exit__(self, *exc):
+        result = self._container.__exit__(*exc)
+        self._probe.depth -= 1
+        entry = self._probe.tabs.setdefault(self._label, {"ms": 0.0, "reads": 0})
+        entry["ms"] += (time.perf_counter() - self._t0) * 1000
+        entry["reads"] += self._probe.store.counters()["reads"] - self._r0
+        return result
+
+
+def _fake_prices():
+    import pandas as pd
+    import yfinance
+
+    class Ticker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, period="1d"):
+            return pd.DataFrame({"Close": [FAKE_PRICE]})
+
+    yfinance.Ticker = Ticker
+
+
+def measure(at, store, probe, fn):
+    """Bir AppTest adımını çalıştırır; gecikme, okuma/yazma ve sekme dökümü döner"""
+    probe.reset()
+    before = store.counters()
+    t0 = time.perf_counter()
+    fn()
+    latency = (time.perf_counter() - t0) * 1000
+    after = store.counters()
+    tabs = {k: {"ms": round(v["ms"], 1), "reads": v["reads"]} for k, v in probe.tabs.items()}
+    return {
+        "latency_ms": round(latency, 1),
+        "reads": after["reads"] - before["reads"],
+        "writes": after["writes"] - before["writes"],
+        "exceptions": [e.value for e in at.exception],
+        "tabs": tabs,
+    }
+
+
+def peak_memory(fn):
+    """Adımın tracemalloc ile ölçülen tepe bellek kullanımı (MB)"""
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1e6, 1)
+
+
+def bench_module(module, store, probe, timeout):
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=timeout)
+    at.secrets["firebase"] = {"type": "service_account"}
+    at.run()
+
+    results = []
+    cold = measure(at, store, probe, lambda: at.sidebar.selectbox[0].select(module).run())
+    results.append(dict(cold, scenario="cold"))
+    warm = measure(at, store, probe, at.run)
+    warm["peak_mem_mb"] = peak_memory(at.run)
+    results.append(dict(warm, scenario="rerun"))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Taban ölçüme göre gerileyen (yavaşlayan / daha çok okuyan) satırlar"""
+    index = {(r["size"], r["module"], r["scenario"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = index.get((r["size"], r["module"], r["scenario"]))
+        if not old:
+            continue
+        for metric in ("latency_ms", "reads"):
+            if old[metric] and r[metric] > old[metric] * (1 + tolerance):
+                regressions.append({"size": r["size"], "module": r["module"], "scenario": r["scenario"],
+                                    "metric": metric, "old": old[metric], "new": r[metric]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--modules", nargs="+", default=MODULES, choices=MODULES)
+    parser.add_argument("--out", default=os.path.join(ROOT, "bench", "results.json"))
+    parser.add_argument("--baseline", help="karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Yerel anlık görüntüler ölçümü etkilemesin
+    os.environ["LIFEOS_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="bench-snapshots-")
+    _fake_prices()
+    report = {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": args.sizes,
+        },
+        "datasets": {},
+        "results": [],
+    }
+
+    for size in args.sizes:
+        store = FakeStore()
+        install(store)
+        probe = TabProbe(store)
+        probe.install()
+        t0 = time.perf_counter()
+        report["datasets"][str(size)] = generate(store, size, args.seed)
+        print(f"\n{size} döküman/koleksiyon (üretim {time.perf_counter() - t0:.1f} sn)")
+        for module in args.modules:
+            for row in bench_module(module, store, probe, args.timeout):
+                row.update(size=size, module=module)
+                report["results"].append(row)
+                mem = f"  {row['peak_mem_mb']:.1f} MB" if "peak_mem_mb" in row else ""
+                flag = "  HATA" if row["exceptions"] else ""
+                print(f"  {module:<18} {row['scenario']:<6} {row['latency_ms']:>9.1f} ms"
+                      f"  okuma {row['reads']:>8}  yazma {row['writes']:>5}{mem}{flag}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nSonuçlar: {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(report["results"], json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"GERİLEME: {r['size']} / {r['module']} / {r['scenario']}: {r['metric']} {r['old']} -> {r['new']}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
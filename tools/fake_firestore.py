@@ -0,0 +1,319 @@
+"""Ölçüm araçları için bellek içi Firestore benzeri.
+
+Uygulamanın kullandığı API yüzeyini (koleksiyon/döküman/alt koleksiyon,
+add/set(merge)/update/delete, where/order_by/limit/offset/start_after/
+select/stream/get, list_documents, batch, get_all, SERVER_TIMESTAMP/DELETE_FIELD/
+ArrayUnion/Increment) karşılar ve okuma/yazma sayaçları tutar. Gerçek
+Firestore'un dizin ve kota kurallarını taklit etmez; amaç uygulamanın
+veri erişim desenini ağ olmadan ölçmektir.
+
+    store = FakeStore()
+    install(store)          # firebase_admin.firestore.client() -> store
+"""
+import copy
+import datetime
+import itertools
+import threading
+import uuid
+
+_DELETE = object()
+
+
+def _sentinel_name(value):
+    if type(value).__name__ != "Sentinel":
+        return None
+    return repr(value).upper()
+
+
+def _split_path(path):
+    """`a.b` ve `` `a.b`.c `` biçimli alan yollarını parçalara ayırır"""
+    out, cur, quoted = [], "", False
+    for ch in path:
+        if ch == "`":
+            quoted = not quoted
+        elif ch == "." and not quoted:
+            out.append(cur)
+            cur = ""
+        else:
+            cur += ch
+    out.append(cur)
+    return out
+
+
+def _merge(cur, new):
+    for k, v in new.items():
+        if v is _DELETE:
+            cur.pop(k, None)
+        elif isinstance(v, dict) and isinstance(cur.get(k), dict):
+            _merge(cur[k], v)
+        else:
+            cur[k] = v
+
+
+class FakeStore:
+    """Tüm koleksiyonları ve sayaçları tutan süreç içi depo"""
+
+    def __init__(self):
+        self.docs = {}                  # koleksiyon yolu (tuple) -> {id: veri}
+        self.lock = threading.RLock()
+        self.reads = 0
+        self.writes = 0
+        self._ids = itertools.count()
+
+    def client(self):
+        return FakeClient(self)
+
+    def counters(self):
+        with self.lock:
+            return {"reads": self.reads, "writes": self.writes}
+
+    def bulk_load(self, collection, items):
+        """Sayaçlara dokunmadan (id, veri) çiftlerini doğrudan yükler"""
+        col = self.docs.setdefault(tuple(collection.split("/")), {})
+        for doc_id, data in items:
+            col[doc_id or self.new_id()] = self._resolve(data)
+
+    def new_id(self):
+        return f"{next(self._ids):08d}{uuid.uuid4().hex[:12]}"
+
+    def _resolve(self, value, old=None):
+        name = _sentinel_name(value)
+        if name is not None:
+            if "DELETE" in name:
+                return _DELETE
+            return datetime.datetime.now(datetime.timezone.utc)
+        kind = type(value).__name__
+        if kind == "ArrayUnion":
+            base = list(old or [])
+            for v in value.values:
+                if v not in base:
+                    base.append(copy.deepcopy(v))
+            return base
+        if kind == "Increment":
+            return (old or 0) + value.value
+        if isinstance(value, dict):
+            return {k: self._resolve(v, old.get(k) if isinstance(old, dict) else None) for k, v in value.items()}
+        if isinstance(value, datetime.datetime) and value.tzinfo is None:
+            return value.replace(tzinfo=datetime.timezone.utc)
+        return copy.deepcopy(value)
+
+
+class FakeSnapshot:
+    def __init__(self, ref, data, fields=None):
+        self.reference = ref
+        self.id = ref.id
+        self._data = data
+        self._fields = fields
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        if self._data is None:
+            return None
+        data = copy.deepcopy(self._data)
+        if self._fields is not None:
+            data = {k: v for k, v in data.items() if k in self._fields}
+        return data
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeClient:
+    def __init__(self, store):
+        self._s = store
+
+    def collection(self, name):
+        return FakeCollection(self._s, tuple(name.split("/")))
+
+    def batch(self):
+        return FakeBatch(self._s)
+
+    def get_all(self, refs, field_paths=None):
+        for ref in refs:
+            yield ref.get()
+
+
+class FakeDocument:
+    def __init__(self, store, col, doc_id):
+        self._s, self._col, self.id = store, col, doc_id
+
+    @property
+    def path(self):
+        return "/".join(self._col + (self.id,))
+
+    def collection(self, name):
+        return FakeCollection(self._s, self._col + (self.id, name))
+
+    def get(self, field_paths=None):
+        with self._s.lock:
+            self._s.reads += 1
+            data = self._s.docs.get(self._col, {}).get(self.id)
+            return FakeSnapshot(self, copy.deepcopy(data) if data is not None else None)
+
+    def set(self, data, merge=False):
+        with self._s.lock:
+            self._s.writes += 1
+            col = self._s.docs.setdefault(self._col, {})
+            if merge and self.id in col:
+                _merge(col[self.id], self._s._resolve(data, col[self.id]))
+            else:
+                resolved = self._s._resolve(data)
+                col[self.id] = {k: v for k, v in resolved.items() if v is not _DELETE}
+
+    def update(self, data):
+        with self._s.lock:
+            col = self._s.docs.get(self._col, {})
+            if self.id not in col:
+                raise KeyError(f"No document to update: {self.path}")
+            self._s.writes += 1
+            cur = col[self.id]
+            for key, value in data.items():
+                parts = _split_path(key)
+                target = cur
+                for p in parts[:-1]:
+                    target = target.setdefault(p, {})
+                resolved = self._s._resolve(value, target.get(parts[-1]))
+                if resolved is _DELETE:
+                    target.pop(parts[-1], None)
+                else:
+                    target[parts[-1]] = resolved
+
+    def delete(self):
+        with self._s.lock:
+            self._s.writes += 1
+            self._s.docs.get(self._col, {}).pop(self.id, None)
+
+
+_OPS = {
+    "==": lambda x, v: x == v,
+    "!=": lambda x, v: x != v,
+    "<": lambda x, v: x is not None and x < v,
+    "<=": lambda x, v: x is not None and x <= v,
+    ">": lambda x, v: x is not None and x > v,
+    ">=": lambda x, v: x is not None and x >= v,
+    "in": lambda x, v: x in v,
+    "array_contains": lambda x, v: isinstance(x, list) and v in x,
+}
+
+
+class FakeQuery:
+    def __init__(self, store, col, filters=(), orders=(), limit=None, offset=0, after=None, fields=None):
+        self._s, self._col = store, col
+        self._filters, self._orders = list(filters), list(orders)
+        self._limit, self._offset, self._after, self._fields = limit, offset, after, fields
+
+    def _copy(self, **changes):
+        q = FakeQuery(self._s, self._col, self._filters, self._orders, self._limit, self._offset, self._after, self._fields)
+        for k, v in changes.items():
+            setattr(q, k, v)
+        return q
+
+    def where(self, field=None, op=None, value=None, filter=None):
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(_filters=self._filters + [(field, op, value)])
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(_orders=self._orders + [(field, direction)])
+
+    def limit(self, n):
+        return self._copy(_limit=n)
+
+    def offset(self, n):
+        return self._copy(_offset=n)
+
+    def start_after(self, values):
+        return self._copy(_after=values)
+
+    def select(self, fields):
+        return self._copy(_fields=list(fields))
+
+    @staticmethod
+    def _key(row, field):
+        return row[0] if field == "__name__" else row[1][field]
+
+    def stream(self):
+        with self._s.lock:
+            rows = list(self._s.docs.get(self._col, {}).items())
+        out = []
+        for doc_id, data in rows:
+            try:
+                if all(_OPS[op](data.get(f), v) for f, op, v in self._filters):
+                    out.append((doc_id, data))
+            except TypeError:
+                continue
+        for field, direction in reversed(self._orders):
+            desc = "DESC" in str(direction).upper()
+            out = [r for r in out if field == "__name__" or field in r[1]]
+            out.sort(key=lambda r: self._key(r, field), reverse=desc)
+        if self._after is not None and self._orders:
+            field, direction = self._orders[0]
+            desc = "DESC" in str(direction).upper()
+            if isinstance(self._after, FakeSnapshot):
+                pivot = self._after.id if field == "__name__" else self._after.get(field)
+            else:
+                pivot = self._after.get(field)
+            out = [r for r in out if (self._key(r, field) < pivot if desc else self._key(r, field) > pivot)]
+        out = out[self._offset:]
+        if self._limit is not None:
+            out = out[: self._limit]
+        for doc_id, data in out:
+            with self._s.lock:
+                self._s.reads += 1
+            yield FakeSnapshot(FakeDocument(self._s, self._col, doc_id), copy.deepcopy(data), self._fields)
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, store, col):
+        super().__init__(store, col)
+
+    def document(self, doc_id=None):
+        return FakeDocument(self._s, self._col, doc_id or self._s.new_id())
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def list_documents(self):
+        """Kendisi ya da alt koleksiyonu olan dökümanlar (Firestore'daki gibi)"""
+        depth = len(self._col)
+        with self._s.lock:
+            ids = set(self._s.docs.get(self._col, {}))
+            ids.update(path[depth] for path, docs in self._s.docs.items()
+                       if len(path) > depth + 1 and path[:depth] == self._col and docs)
+        return [FakeDocument(self._s, self._col, doc_id) for doc_id in sorted(ids)]
+
+
+class FakeBatch:
+    def __init__(self, store):
+        self._s, self._ops = store, []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(lambda: ref.set(data, merge=merge))
+
+    def update(self, ref, data):
+        self._ops.append(lambda: ref.update(data))
+
+    def delete(self, ref):
+        self._ops.append(ref.delete)
+
+    def commit(self):
+        with self._s.lock:
+            for op in self._ops:
+                op()
+        self._ops = []
+
+
+def install(store):
+    """firebase_admin'i kimlik bilgisi istemeden `store` kullanacak şekilde ayarlar"""
+    import firebase_admin
+    from firebase_admin import firestore
+    firebase_admin._apps.setdefault("[DEFAULT]", object())
+    firestore.client = lambda *args, **kwargs: store.client()
@@ -0,0 +1,35 @@
+"""Komut satırı araçları için ortak Firestore bağlantısı.
+
+Kimlik bilgisi varsayılan olarak .streamlit/secrets.toml içindeki [firebase]
+bölümünden okunur; bir servis hesabı JSON dosyası da verilebilir.
+"""
+import json
+import os
+import tomllib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRETS_PATH = os.path.join(ROOT, ".streamlit", "secrets.toml")
+
+
+def load_secrets():
+    """secrets.toml içeriği (dosya yoksa boş sözlük)"""
+    if not os.path.isfile(SECRETS_PATH):
+        return {}
+    with open(SECRETS_PATH, "rb") as f:
+        return tomllib.load(f)
+
+
+def connect(credentials_path=None):
+    """Komut satırı için Firestore istemcisi"""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    if credentials_path:
+        with open(credentials_path, encoding="utf-8") as f:
+            key_dict = json.load(f)
+    else:
+        key_dict = dict(load_secrets()["firebase"])
+        if "private_key" in key_dict:
+            key_dict["private_key"] = key_dict["private_key"].replace("\\n", "\n")
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(key_dict))
+    return firestore.client()
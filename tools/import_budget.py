@@ -0,0 +1,175 @@
+"""Açılış (import) süresi raporu ve bütçe kontrolü.
+
+app.py'nin import grafiğini AST üzerinden çıkarır: app.py'nin ve onun
+(dolaylı olarak) yüklediği yerel modüllerin en üst seviyesinde çalışan
+import'lar. Açılış maliyeti bu modül kümesi `python -X importtime` ile
+ayrı, temiz bir yorumlayıcıda yüklenerek ölçülür; her sayfanın maliyeti ise
+açılış kümesine sayfanın fonksiyon içinde yüklediği bağımlılıklar
+eklenerek ölçülür. Sonuçlar tools/import_budget.json içindeki bütçeyle
+karşılaştırılır. Ayrıca "lazy" olarak işaretli ağır bir modülün bu yerel
+modüllerin hiçbirinin en üst seviyesinde import edilmediği doğrulanır.
+
+Kullanım:
+    python tools/import_budget.py            # rapor + bütçe kontrolü
+    python tools/import_budget.py --top 15   # sayfa başına en yavaş 15 modül
+    python tools/import_budget.py --json     # makinece okunur çıktı
+
+Bütçe aşılırsa veya tembel yüklenmesi gereken bir modül yerel bir modülün
+başında import edilirse çıkış kodu 1 olur.
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUDGET_FILE = os.path.join(HERE, "import_budget.json")
+
+
+def parse_importtime(stderr):
+    """importtime satırlarını (modül, self_us, cumulative_us, seviye) listesine çevirir"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        raw_name = parts[2].rstrip()
+        level = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        rows.append((raw_name.strip(), int(parts[0]), int(parts[1]), level))
+    return rows
+
+
+def measure(imports):
+    """Verilen modülleri temiz bir yorumlayıcıda yükler, (toplam_ms, satırlar) döner"""
+    code = "; ".join(f"import {m}" for m in imports) if imports else "pass"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=ROOT,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    rows = parse_importtime(proc.stderr)
+    total_us = sum(cum for _, _, cum, level in rows if level == 0)
+    return total_us / 1000.0, rows
+
+
+def best_of(imports, repeat):
+    """Gürültüyü azaltmak için en hızlı ölçümü alır"""
+    runs = [measure(imports) for _ in range(max(1, repeat))]
+    return min(runs, key=lambda r: r[0])
+
+
+def top_level_imports(path):
+    """Modül yüklenirken çalışan import'lar: [(satır, modül)]; fonksiyon gövdeleri hariç"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    found = []
+    stack = list(tree.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            continue
+        if isinstance(node, ast.Import):
+            found.extend((node.lineno, a.name) for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            found.append((node.lineno, node.module))
+        stack.extend(ast.iter_child_nodes(node))
+    return sorted(found)
+
+
+def local_path(name, root=ROOT):
+    """Modül kökteki yerel bir dosyaysa yolu, değilse None"""
+    path = os.path.join(root, name.split(".")[0] + ".py")
+    return path if os.path.exists(path) else None
+
+
+def import_graph(app_path, root=ROOT):
+    """app.py'den başlayarak en üst seviyede yüklenen modüller.
+
+    {dosya: [(satır, modül)]} döner; yerel modüllerin import'ları da izlenir.
+    """
+    graph, queue = {}, [app_path]
+    while queue:
+        path = queue.pop(0)
+        if path in graph:
+            continue
+        graph[path] = top_level_imports(path)
+        queue.extend(p for p in (local_path(name, root) for _, name in graph[path]) if p and p not in graph)
+    return graph
+
+
+def startup_imports(graph, app_path):
+    """Açılışta yüklenen modül kümesi: app.py'nin import ettiği her şey (yerel modüller dahil)"""
+    return sorted({name for _, name in graph[app_path]})
+
+
+def eager_heavy_imports(graph, lazy, root=ROOT):
+    """Yerel modüllerin en üst seviyesinde yüklenen 'lazy' modüller: [(dosya, satır, modül)]"""
+    found = []
+    for path, imports in graph.items():
+        for lineno, name in imports:
+            if name.split(".")[0] in lazy:
+                found.append((os.path.relpath(path, root), lineno, name))
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", default=BUDGET_FILE)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    with open(args.budget, encoding="utf-8") as f:
+        cfg = json.load(f)
+    repeat = cfg.get("repeat", 3)
+
+    app_path = os.path.join(ROOT, cfg["app"])
+    graph = import_graph(app_path)
+    startup = startup_imports(graph, app_path)
+
+    baseline_ms, _ = best_of([], repeat)
+    report = {"baseline_ms": round(baseline_ms, 1), "modules": sorted(os.path.relpath(p, ROOT) for p in graph),
+              "pages": {}, "eager_heavy_imports": []}
+    failed = False
+
+    for path, lineno, name in eager_heavy_imports(graph, set(cfg["lazy"])):
+        report["eager_heavy_imports"].append({"file": path, "line": lineno, "module": name})
+        failed = True
+
+    pages = {"Açılış": {"imports": [], "budget_ms": cfg["startup_budget_ms"]}, **cfg["pages"]}
+    for page, spec in pages.items():
+        total_ms, rows = best_of(startup + spec["imports"], repeat)
+        page_ms = max(0.0, total_ms - baseline_ms)
+        top = sorted((r for r in rows if r[3] == 0), key=lambda r: r[2], reverse=True)[: args.top]
+        over = page_ms > spec["budget_ms"]
+        failed = failed or over
+        report["pages"][page] = {
+            "import_ms": round(page_ms, 1),
+            "budget_ms": spec["budget_ms"],
+            "over_budget": over,
+            "top": [{"module": name, "cumulative_ms": round(cum / 1000.0, 1)} for name, _, cum, _ in top],
+        }
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"Boş yorumlayıcı: {report['baseline_ms']:.1f} ms")
+        print(f"Yerel modüller: {', '.join(report['modules'])}")
+        for item in report["eager_heavy_imports"]:
+            print(f"HATA: {item['file']}:{item['line']} '{item['module']}' en üst seviyede import ediliyor")
+        for page, info in report["pages"].items():
+            flag = "AŞILDI" if info["over_budget"] else "ok"
+            print(f"\n{page}: {info['import_ms']:.1f} ms / bütçe {info['budget_ms']} ms [{flag}]")
+            for t in info["top"]:
+                print(f"    {t['cumulative_ms']:8.1f} ms  {t['module']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+"""Eşzamanlı oturumlarla yük testi.
+
+N adet Streamlit oturumunu (`AppTest`) ayrı iş parçacıklarında aynı süreçte
+çalıştırır; her oturum gerçekçi bir eylem karışımı uygular (harcama ekleme,
+canlı idmanda set kaydetme, kelime testi, sayfa gezinme). Çıktı: toplam ve
+eylem bazında rerun gecikmesi (p50/p95/p99), saniyedeki rerun sayısı,
+hatalar, `st.cache_data`/`st.cache_resource` hesaplama kilitlerindeki
+bekleme (önbellek çekişmesi), uygulamanın `time.sleep` ile harcadığı süre
+ve Firestore okuma/yazma sayıları.
+
+Kullanım:
+    python tools/loadtest.py --sessions 8 --duration 60
+    python tools/loadtest.py --sessions 16 --iterations 20 --size 10000 --out bench/load.json
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python tools/loadtest.py --emulator --project demo-lifeos
+
+Varsayılan hedef bellek içi Firestore'dur (tools/fake_firestore.py) ve
+tools/benchmark.py ile aynı sentetik veriyle doldurulur. --emulator ile
+Firestore emülatörü kullanılır; --seed-emulator aynı veriyi emülatöre yazar.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+
+from fake_firestore import FakeStore, install  # noqa: E402
+from benchmark import generate, _fake_prices  # noqa: E402
+
+APP_PATH = os.path.join(ROOT, "app.py")
+ACTION_WEIGHTS = {"harcama_ekle": 3, "set_kaydet": 3, "kelime_testi": 3, "gezinme": 1}
+
+
+# --- ÖLÇÜM SONDALARI ---
+class Probes:
+    """Oturumlar arasında paylaşılan sayaçlar"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cache = {"computes": 0, "contended": 0, "wait_ms": 0.0}
+        self.sleep = {"calls": 0, "ms": 0.0}
+
+    def install(self):
+        from streamlit.runtime.caching import cache_utils
+        original_hold = cache_utils._hold_compute_lock
+        original_sleep = time.sleep
+        probes = self
+
+        @contextlib.contextmanager
+        def hold(lock):
+            contended = lock.locked()
+            t0 = time.perf_counter()
+            with original_hold(lock):
+                waited = (time.perf_counter() - t0) * 1000
+                with probes.lock:
+                    probes.cache["computes"] += 1
+                    if contended:
+                        probes.cache["contended"] += 1
+                        probes.cache["wait_ms"] += waited
+                yield
+
+        def sleep(seconds):
+            if sys._getframe(1).f_code.co_filename == APP_PATH:
+                with probes.lock:
+                    probes.sleep["calls"] += 1
+                    probes.sleep["ms"] += seconds * 1000
+            original_sleep(seconds)
+
+        cache_utils._hold_compute_lock = hold
+        time.sleep = sleep
+
+
+# --- APPTEST'İ EŞZAMANLI KULLANIM İÇİN HAZIRLAMA ---
+def prepare_concurrent_apptest():
+    """AppTest'in süreç genelindeki durumunu oturumlar arasında paylaşılır hale getirir.
+
+    AppTest her çalıştırmada `Runtime._instance`'ı sahte bir Runtime ile
+    değiştirip sonunda None yapar ve `st.secrets`'ı geçici olarak değiştirir;
+    aynı anda çalışan oturumlar bu yüzden birbirinin Runtime'ını siler (form
+    içindeki bileşenler bile "Runtime yok" sanılıp çakışan kimlik alır).
+    Ayrıca CPython 3.11'de eşzamanlı `compile` çağrıları ara sıra
+    "AST constructor recursion depth mismatch" hatası verir. Burada Runtime
+    yoksa ilk sahte Runtime kullanılır (`instance`/`exists`), sırlar bir kez genel olarak atanır
+    ve betik derlemesi tek bir kilitle sıraya sokulur.
+    """
+    import streamlit as st
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.scriptrunner import script_cache
+    from streamlit.runtime.secrets import Secrets
+
+    secrets = Secrets()
+    secrets._secrets = {"firebase": {"type": "service_account"}}
+    st.secrets = secrets
+
+    shared = {}
+    original_instance = Runtime.instance.__func__
+
+    def instance(cls):
+        current = cls._instance
+        if current is not None:
+            shared.setdefault("runtime", current)
+            return current
+        if "runtime" in shared:
+            return shared["runtime"]
+        return original_instance(cls)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(lambda cls: cls._instance is not None or "runtime" in shared)
+
+    compile_lock = threading.Lock()
+    original_get_bytecode = script_cache.ScriptCache.get_bytecode
+
+    def get_bytecode(self, script_path):
+        with compile_lock:
+            return original_get_bytecode(self, script_path)
+
+    script_cache.ScriptCache.get_bytecode = get_bytecode
+
+
+# --- OTURUM VE EYLEMLER ---
+class Session:
+    def __init__(self, index, timeout, rng):
+        from streamlit.testing.v1 import AppTest
+        self.index = index
+        self.rng = rng
+        self.samples = []
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.module = None
+        self.run("açılış", self.at.run)
+
+    def run(self, action, fn):
+        t0 = time.perf_counter()
+        error = None
+        try:
+            fn()
+            if self.at.exception:
+                error = self.at.exception[0].value
+        except Exception as e:   # zaman aşımı, bulunamayan bileşen vb.
+            error = f"{type(e).__name__}: {e}"
+        self.samples.append({"action": action, "ms": (time.perf_counter() - t0) * 1000, "error": error})
+        return error is None
+
+    def find(self, widgets, label):
+        for w in widgets:
+            if w.label.startswith(label):
+                return w
+        return None
+
+    def goto(self, action, module):
+        if self.module != module:
+            self.run(action, lambda: self.at.sidebar.selectbox[0].select(module).run())
+            self.module = module
+
+    def click(self, action, label):
+        button = self.find(self.at.button, label)
+        if button is None:
+            return False
+        return self.run(action, lambda: button.click().run())
+
+
+def harcama_ekle(s):
+    s.goto("harcama_ekle", "Finans Merkezi")
+    place = s.find(s.at.text_input, "Yer")
+    amount = s.find(s.at.number_input, "Tutar (TL)")
+    if place is None or amount is None:
+        return
+    place.input(f"Yük {s.index}")
+    amount.set_value(round(s.rng.uniform(10, 500), 2))
+    s.click("harcama_ekle", "Harcamayı Kaydet")
+
+
+def set_kaydet(s):
+    s.goto("set_kaydet", "Fiziksel Takip")
+    if s.find(s.at.button, "Seti Ekle") is None:
+        if s.find(s.at.button, "🚀"):
+            s.click("set_kaydet", "🚀")
+        section = s.find(s.at.selectbox, "Bölüm Seç")
+        if section is not None:
+            s.run("set_kaydet", lambda: section.select("Göğüs").run())
+        s.click("set_kaydet", "▶️")
+    weight = s.find(s.at.number_input, "Ağırlık")
+    reps = s.find(s.at.number_input, "Tekrar")
+    if weight is not None:
+        weight.set_value(float(s.rng.randrange(40, 120, 5)))
+    if reps is not None:
+        reps.set_value(s.rng.randrange(5, 12))
+    s.click("set_kaydet", "Seti Ekle")
+
+
+def kelime_testi(s):
+    s.goto("kelime_testi", "Dil Asistanı")
+    menu = s.find(s.at.sidebar.radio, "İşlemler")
+    if menu is not None and menu.value != "Günlük Test":
+        s.run("kelime_testi", lambda: menu.set_value("Günlük Test").run())
+    for label in ("Testi Başlat", "Göster", "✅ Bildim", "❌ Bilemedim", "Tekrar"):
+        if s.find(s.at.button, label) is not None:
+            s.click("kelime_testi", label)
+            return
+
+
+def gezinme(s):
+    module = s.rng.choice(["Dil Asistanı", "Fiziksel Takip", "Alışkanlık Takibi", "Finans Merkezi"])
+    s.goto("gezinme", module)
+    s.run("gezinme", s.at.run)
+
+
+ACTIONS = {"harcama_ekle": harcama_ekle, "set_kaydet": set_kaydet, "kelime_testi": kelime_testi, "gezinme": gezinme}
+
+
+def session_worker(index, args, deadline, start_barrier, results):
+    rng = random.Random(args.seed + index)
+    start_barrier.wait()
+    session = Session(index, args.timeout, rng)
+    names, weights = zip(*ACTION_WEIGHTS.items())
+    done = 0
+    while (args.iterations and done < args.iterations) or (not args.iterations and time.monotonic() < deadline):
+        ACTIONS[rng.choices(names, weights)[0]](session)
+        done += 1
+        if args.think_ms:
+            time.sleep(rng.uniform(0, args.think_ms) / 1000)
+    results[index] = session.samples
+
+
+# --- RAPOR ---
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def latency_stats(samples):
+    ms = [s["ms"] for s in samples]
+    return {
+        "reruns": len(ms),
+        "errors": sum(1 for s in samples if s["error"]),
+        "p50_ms": round(percentile(ms, 0.50), 1),
+        "p95_ms": round(percentile(ms, 0.95), 1),
+        "p99_ms": round(percentile(ms, 0.99), 1),
+        "max_ms": round(max(ms), 1) if ms else 0.0,
+    }
+
+
+def connect_emulator(project):
+    """FIRESTORE_EMULATOR_HOST'a bağlanan istemciyi uygulamaya tanıtır"""
+    import firebase_admin
+    from firebase_admin import firestore
+    from google.cloud import firestore as gcloud_firestore
+    client = gcloud_firestore.Client(project=project)
+    firebase_admin._apps.setdefault("[DEFAULT]", object())
+    firestore.client = lambda *args, **kwargs: client
+    return client
+
+
+def copy_to(client, store, batch_size=500):
+    """Bellek içi sentetik veriyi gerçek (emülatör) istemciye toplu yazar"""
+    for path, docs in store.docs.items():
+        items = list(docs.items())
+        for start in range(0, len(items), batch_size):
+            batch = client.batch()
+            for doc_id, data in items[start:start + batch_size]:
+                batch.set(client.collection("/".join(path)).document(doc_id), data)
+            batch.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30, help="saniye (--iterations yoksa)")
+    parser.add_argument("--iterations", type=int, default=0, help="oturum başına eylem sayısı")
+    parser.add_argument("--size", type=int, default=1000, help="koleksiyon başına sentetik döküman")
+    parser.add_argument("--think-ms", type=float, default=0, help="eylemler arası rastgele bekleme üst sınırı")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--emulator", action="store_true", help="FIRESTORE_EMULATOR_HOST üzerindeki emülatörü kullan")
+    parser.add_argument("--seed-emulator", action="store_true")
+    parser.add_argument("--project", default="demo-lifeos")
+    parser.add_argument("--out", help="JSON rapor dosyası")
+    args = parser.parse_args(argv)
+
+    os.environ["LIFEOS_SNAPSHOT_DIR"] = tempfile.mkdtemp(prefix="load-snapshots-")
+    _fake_prices()
+    store = FakeStore()
+    if args.emulator:
+        if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            print("FIRESTORE_EMULATOR_HOST tanımlı değil.", file=sys.stderr)
+            return 1
+        client = connect_emulator(args.project)
+        if args.seed_emulator:
+            generate(store, args.size, args.seed)
+            copy_to(client, store)
+    else:
+        generate(store, args.size, args.seed)
+        install(store)
+    before = store.counters()
+
+    prepare_concurrent_apptest()
+    probes = Probes()
+    probes.install()
+    results = {}
+    barrier = threading.Barrier(args.sessions)
+    started = time.monotonic()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=session_worker, args=(i, args, deadline, barrier, results), daemon=True)
+               for i in range(args.sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.monotonic() - started
+
+    samples = [s for i in sorted(results) for s in results[i]]
+    by_action = {}
+    for s in samples:
+        by_action.setdefault(s["action"], []).append(s)
+    report = {
+        "meta": {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "sessions": args.sessions, "size": args.size,
+            "target": "emulator" if args.emulator else "memory",
+            "wall_s": round(wall, 2),
+        },
+        "overall": dict(latency_stats(samples), throughput_rps=round(len(samples) / wall, 2) if wall else 0.0),
+        "actions": {name: latency_stats(rows) for name, rows in sorted(by_action.items())},
+        "cache": dict(probes.cache, wait_ms=round(probes.cache["wait_ms"], 1)),
+        "app_sleep": dict(probes.sleep, ms=round(probes.sleep["ms"], 1)),
+        "errors": sorted({s["error"] for s in samples if s["error"]})[:20],
+    }
+    if not args.emulator:
+        after = store.counters()
+        report["firestore"] = {k: after[k] - before[k] for k in after}
+
+    o = report["overall"]
+    print(f"{args.sessions} oturum, {wall:.1f} sn: {o['reruns']} rerun, {o['throughput_rps']} rerun/sn, {o['errors']} hata")
+    print(f"  gecikme p50 {o['p50_ms']} ms  p95 {o['p95_ms']} ms  p99 {o['p99_ms']} ms  max {o['max_ms']} ms")
+    for name, st_ in report["actions"].items():
+        print(f"  {name:<14} {st_['reruns']:>6} rerun  p50 {st_['p50_ms']:>8} ms  p95 {st_['p95_ms']:>8} ms  p99 {st_['p99_ms']:>8} ms  hata {st_['errors']}")
+    c = report["cache"]
+    print(f"  önbellek hesaplama: {c['computes']}, çekişmeli: {c['contended']}, bekleme {c['wait_ms']} ms")
+    print(f"  uygulama time.sleep: {report['app_sleep']['calls']} çağrı, {report['app_sleep']['ms']} ms")
+    if "firestore" in report:
+        print(f"  firestore: {report['firestore']['reads']} okuma, {report['firestore']['writes']} yazma")
+    for e in report["errors"]:
+        print(f"  HATA: {e}")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+"""Eski global koleksiyonları kullanıcı başına bölümlere taşır.
+
+Kullanım:
+    python tools/migrate_users.py --user ali                 # tüm koleksiyonlar
+    python tools/migrate_users.py --user ali --only expenses payments
+    python tools/migrate_users.py --user ali --delete-source # kopyaladıktan sonra kaynağı sil
+
+`expenses` gibi global koleksiyonlardaki dökümanlar aynı kimliklerle
+`users/{uid}/expenses` altına 500'lük toplu yazmalarla kopyalanır; işlem
+yarıda kalırsa tekrar çalıştırılabilir. --delete-source verilirse kaynak
+yalnızca hedefteki döküman sayısı doğrulandıktan sonra silinir. Taşımadan
+sonra yeni bir anlık görüntü alınmalıdır (tools/snapshot.py export).
+"""
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import snapshot  # noqa: E402
+import tenancy  # noqa: E402
+from firebase_cli import connect, load_secrets  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--credentials", help="servis hesabı JSON dosyası")
+    parser.add_argument("--user", help="hedef kullanıcı kimliği (varsayılan: tenancy.default_user_id)")
+    parser.add_argument("--only", nargs="*", help="yalnızca bu koleksiyonlar")
+    parser.add_argument("--page-size", type=int, default=snapshot.PAGE_SIZE)
+    parser.add_argument("--delete-source", action="store_true", help="doğrulamadan sonra global koleksiyonu sil")
+    args = parser.parse_args(argv)
+    uid = tenancy.validate_uid(args.user) if args.user else tenancy.default_user_id(load_secrets().get("app"))
+
+    def progress(name, rows):
+        print(f"  {name:<18} {rows:>8} döküman")
+
+    print(f"Hedef: {tenancy.USERS_COLLECTION}/{uid}/")
+    try:
+        tenancy.migrate_user(connect(args.credentials), uid, args.only, args.delete_source, args.page_size, progress)
+    except RuntimeError as e:
+        print(f"Hata: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Firestore koleksiyonlarının Parquet anlık görüntüsünü alır / geri yükler.
+
+Kullanım:
+    python tools/snapshot.py export                      # snapshots/{kullanıcı}/{zaman}/ altına
+    python tools/snapshot.py export --only expenses payments
+    python tools/snapshot.py --user ali import snapshots/ali/20260101T000000Z
+    python tools/snapshot.py list
+
+Kimlik bilgisi varsayılan olarak .streamlit/secrets.toml içindeki [firebase]
+bölümünden okunur; --credentials ile bir servis hesabı JSON dosyası
+verilebilir. Her kullanıcının anlık görüntüsü ayrı klasördedir; --user
+verilmezse varsayılan kullanıcı (bkz. tenancy.default_user_id) kullanılır.
+Uygulama açılışta en yeni anlık görüntüyü okur ve yalnızca sonraki
+değişiklikleri Firestore'dan çeker (bkz. snapshot.py).
+"""
+import argparse
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import snapshot  # noqa: E402
+import tenancy  # noqa: E402
+from firebase_cli import connect, load_secrets  # noqa: E402
+
+DEFAULT_DIR = os.environ.get("LIFEOS_SNAPSHOT_DIR", os.path.join(ROOT, "snapshots"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--credentials", help="servis hesabı JSON dosyası")
+    parser.add_argument("--dir", default=DEFAULT_DIR, help="anlık görüntü kök klasörü")
+    parser.add_argument("--user", help="kullanıcı kimliği (varsayılan: tenancy.default_user_id)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    exp = sub.add_parser("export")
+    exp.add_argument("--only", nargs="*", help="yalnızca bu koleksiyonlar")
+    exp.add_argument("--page-size", type=int, default=snapshot.PAGE_SIZE)
+    imp = sub.add_parser("import")
+    imp.add_argument("folder", nargs="?", help="varsayılan: en yeni anlık görüntü")
+    imp.add_argument("--only", nargs="*", help="yalnızca bu koleksiyonlar")
+    sub.add_parser("list")
+    args = parser.parse_args(argv)
+    uid = tenancy.validate_uid(args.user) if args.user else tenancy.default_user_id(load_secrets().get("app"))
+    root = os.path.join(args.dir, uid)
+
+    def progress(name, rows):
+        print(f"  {name:<18} {rows:>8} döküman")
+
+    if args.command == "list":
+        if os.path.isdir(root):
+            for name in sorted(os.listdir(root)):
+                folder = os.path.join(root, name)
+                if os.path.isfile(os.path.join(folder, snapshot.MANIFEST)):
+                    manifest = snapshot.read_manifest(folder)
+                    total = sum(c["rows"] for c in manifest["collections"].values())
+                    print(f"{name}  {total} döküman")
+        return 0
+
+    db = tenancy.scoped_client(connect(args.credentials), uid)
+    if args.command == "export":
+        folder = snapshot.export_all(db, root, args.only, args.page_size, progress)
+        print(f"Anlık görüntü: {folder}")
+    else:
+        folder = args.folder or snapshot.latest_snapshot(root)
+        if folder is None:
+            print("Anlık görüntü bulunamadı.", file=sys.stderr)
+            return 1
+        snapshot.import_all(db, folder, args.only, progress=progress)
+        print(f"Geri yüklendi: {folder}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
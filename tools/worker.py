@@ -0,0 +1,89 @@
+"""Arka plan işçisi: rollup, fiyat ön çekimi, TTS ön üretimi ve sıkıştırma.
+
+Kullanım:
+    python tools/worker.py loop                 # takvime göre sürekli çalışır (bkz. jobs.SCHEDULE)
+    python tools/worker.py run rollups prices   # işleri hemen çalıştırır
+    python tools/worker.py status               # son çalışmaların durumu
+
+İşçi uygulamayla aynı makinede çalışmalıdır: çıktılarını işçi klasörüne
+(LIFEOS_WORKER_DIR, varsayılan worker_data/) yazar, uygulama da yalnızca
+bu klasörü okur. Kimlik bilgisi tools/snapshot.py ile aynı şekilde okunur.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+import traceback
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import jobs  # noqa: E402
+from firebase_cli import connect  # noqa: E402
+
+DEFAULT_DIR = os.environ.get("LIFEOS_WORKER_DIR", os.path.join(ROOT, "worker_data"))
+SNAPSHOT_DIR = os.environ.get("LIFEOS_SNAPSHOT_DIR", os.path.join(ROOT, "snapshots"))
+POLL_SEC = 30
+
+
+def job_options(name, users):
+    if name == "compact":
+        return {"snapshot_dir": SNAPSHOT_DIR}
+    return {"users": users}
+
+
+def run(db, root, names, users):
+    """İşleri sırayla çalıştırır; hata veren iş diğerlerini durdurmaz"""
+    ok = True
+    for name in names:
+        print(f"{datetime.datetime.now():%H:%M:%S} {name} başladı")
+        try:
+            result = jobs.run_job(name, db, root, **job_options(name, users))
+            print(f"  {name} bitti: {result}")
+        except Exception:
+            traceback.print_exc()
+            ok = False
+    return ok
+
+
+def print_status(root):
+    status = jobs.read_status(root)
+    if not status:
+        print("Henüz çalışmış iş yok.")
+    for name, info in sorted(status.items()):
+        print(f"{name:<8} {info.get('state', '-'):<8} {info.get('finished_at') or info.get('started_at')}"
+              f"  {info.get('duration_ms', '-')} ms  {info.get('error') or info.get('result') or ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--credentials", help="servis hesabı JSON dosyası")
+    parser.add_argument("--dir", default=DEFAULT_DIR, help="işçi klasörü")
+    parser.add_argument("--users", nargs="*", help="yalnızca bu kullanıcılar (varsayılan: tümü)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run")
+    run_p.add_argument("jobs", nargs="*", choices=sorted(jobs.JOBS), help="varsayılan: tüm işler")
+    sub.add_parser("loop")
+    sub.add_parser("status")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        print_status(args.dir)
+        return 0
+
+    db = connect(args.credentials)
+    if args.command == "run":
+        return 0 if run(db, args.dir, args.jobs or list(jobs.JOBS), args.users) else 1
+
+    print(f"İşçi başladı: {args.dir}")
+    while True:
+        due = jobs.due_jobs(jobs.read_status(args.dir))
+        if due:
+            run(db, args.dir, due, args.users)
+        time.sleep(POLL_SEC)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
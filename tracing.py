@@ -0,0 +1,389 @@
+"""Yeniden çalıştırma (rerun) başına Firestore, fiyat ve TTS çağrı izleri.
+
+`traced_client(db)` Firestore istemcisini saran ince bir vekil döner:
+okuma/yazma yapan her çağrı (stream, get, get_all, list_documents, set,
+update, delete, add, batch.commit) süresi, döküman sayısı ve istenirse yaklaşık bayt
+boyutuyla o anki izin (trace) bir aralığı (span) olarak kaydedilir. Diğer
+dış çağrılar `span(...)` bağlam yöneticisiyle sarılır.
+
+İzler çalıştıran iş parçacığına bağlıdır; Streamlit her oturumun betiğini
+kendi iş parçacığında çalıştırdığı için bir rerun'ın izleri diğer
+oturumlarınkiyle karışmaz. Arka plan iş parçacıklarında çalışan işler
+(yazma onayları, dışa aktarma) `background_trace` ile oturumun o anki izinden
+türetilen ayrı bir iz açar ve bunu `attached` ile kendi iş parçacığına bağlar.
+Aralıklar OpenTelemetry'ye benzer bir sözlük biçimindedir ve JSONL olarak
+dışa aktarılabilir.
+
+Bu modül Streamlit'e bağımlı değildir.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+
+# Firestore boş sonuçlu bir sorguyu da bir okuma olarak faturalar
+MIN_QUERY_READS = 1
+
+_local = threading.local()
+_file_lock = threading.Lock()
+
+
+# --- İZ VE ARALIKLAR ---
+def _new_trace(session_id, page, detail):
+    return {
+        "trace_id": uuid.uuid4().hex,
+        "session_id": session_id,
+        "page": page,
+        "detail": detail,
+        "start_ns": time.time_ns(),
+        "end_ns": None,
+        "spans": [],
+    }
+
+
+def begin_trace(session_id, page=None, detail=False):
+    """Bu iş parçacığı için yeni bir iz başlatır ve döner"""
+    trace = _new_trace(session_id, page, detail)
+    _local.trace = trace
+    return trace
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+def background_trace(page):
+    """Arka plan işi için oturumun o anki izinden türetilen yeni iz; iz yoksa None"""
+    parent = current_trace()
+    if parent is None:
+        return None
+    return _new_trace(parent["session_id"], page, parent["detail"])
+
+
+class attached:
+    """İzi bu iş parçacığına iş bitene kadar bağlar; çıkışta izi kapatır"""
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        self._previous = current_trace()
+        if self.trace is not None:
+            self.trace["start_ns"] = time.time_ns()     # kuyrukta bekleme süresi sayılmaz
+        _local.trace = self.trace
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.trace is not None and self.trace["end_ns"] is None:
+            self.trace["end_ns"] = time.time_ns()
+        _local.trace = self._previous
+        return False
+
+
+def set_page(page):
+    trace = current_trace()
+    if trace is not None:
+        trace["page"] = page
+
+
+def end_trace(trace=None):
+    """İzi kapatır ve özetini döner; iş parçacığının izi buysa bağlantıyı keser"""
+    trace = trace or current_trace()
+    if trace is None:
+        return None
+    if trace["end_ns"] is None:
+        trace["end_ns"] = time.time_ns()
+    if current_trace() is trace:
+        _local.trace = None
+    return summarize(trace)
+
+
+class span:
+    """Bir dış çağrıyı o anki izin aralığı olarak kaydeder.
+
+        with span("yfinance.history", symbol=symbol) as s:
+            ...
+            s["bytes"] = len(payload)
+    """
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self._start = time.time_ns()
+        self._t0 = time.perf_counter()
+        return self.attributes
+
+    def __exit__(self, exc_type, exc, tb):
+        trace = current_trace()
+        if trace is not None:
+            if exc_type is not None:
+                self.attributes["error"] = exc_type.__name__
+            record(trace, self.name, self._start, (time.perf_counter() - self._t0) * 1000, self.attributes)
+        return False
+
+
+def record(trace, name, start_ns, duration_ms, attributes):
+    trace["spans"].append({
+        "span_id": uuid.uuid4().hex[:16],
+        "name": name,
+        "start_ns": start_ns,
+        "duration_ms": round(duration_ms, 3),
+        "attributes": attributes,
+    })
+
+
+def detail_enabled():
+    trace = current_trace()
+    return bool(trace and trace["detail"])
+
+
+def estimate_bytes(data):
+    """Dökümanın yaklaşık boyutu (yalnızca ayrıntılı izde hesaplanır)"""
+    try:
+        return len(json.dumps(data, default=str, ensure_ascii=False).encode("utf-8"))
+    except Exception:
+        return 0
+
+
+# --- ÖZET VE DIŞA AKTARMA ---
+def summarize(trace):
+    """Aralıkları (ad, koleksiyon) bazında toplar; kota sayaçlarını hesaplar"""
+    groups = {}
+    quota = {"reads": 0, "writes": 0, "deletes": 0}
+    for s in trace["spans"]:
+        attrs = s["attributes"]
+        key = (s["name"], attrs.get("collection", attrs.get("symbol", "")))
+        g = groups.setdefault(key, {"name": key[0], "target": key[1], "count": 0, "ms": 0.0, "docs": 0, "bytes": 0})
+        g["count"] += 1
+        g["ms"] += s["duration_ms"]
+        g["docs"] += attrs.get("docs", 0)
+        g["bytes"] += attrs.get("bytes", 0)
+        for k in quota:
+            quota[k] += attrs.get(k, 0)
+    end = trace["end_ns"] or time.time_ns()
+    return {
+        "trace_id": trace["trace_id"],
+        "session_id": trace["session_id"],
+        "page": trace["page"],
+        "duration_ms": round((end - trace["start_ns"]) / 1e6, 1),
+        "calls": sorted(groups.values(), key=lambda g: g["ms"], reverse=True),
+        "quota": quota,
+    }
+
+
+def otel_spans(trace):
+    """İzi OpenTelemetry'ye benzer aralık sözlüklerine çevirir (kök aralık + çocuklar)"""
+    root_id = trace["trace_id"][:16]
+    end = trace["end_ns"] or time.time_ns()
+    spans = [{
+        "trace_id": trace["trace_id"], "span_id": root_id, "parent_span_id": None,
+        "name": "streamlit.rerun", "start_time_unix_nano": trace["start_ns"], "end_time_unix_nano": end,
+        "attributes": {"session.id": trace["session_id"], "app.page": trace["page"]},
+    }]
+    for s in trace["spans"]:
+        spans.append({
+            "trace_id": trace["trace_id"], "span_id": s["span_id"], "parent_span_id": root_id,
+            "name": s["name"], "start_time_unix_nano": s["start_ns"],
+            "end_time_unix_nano": s["start_ns"] + int(s["duration_ms"] * 1e6),
+            "attributes": s["attributes"],
+        })
+    return spans
+
+
+def to_jsonl(traces):
+    return "".join(json.dumps(s, ensure_ascii=False, default=str) + "\n" for t in traces for s in otel_spans(t))
+
+
+def export_jsonl(trace, path=None):
+    """`LIFEOS_TRACE_FILE` (ya da verilen yol) tanımlıysa izin aralıklarını dosyaya ekler"""
+    path = path or os.environ.get("LIFEOS_TRACE_FILE")
+    if not path:
+        return
+    with _file_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(to_jsonl([trace]))
+
+
+# --- FIRESTORE VEKİLİ ---
+def _unwrap(obj):
+    return obj._target if isinstance(obj, _TracedRef) else obj
+
+
+def _path_of(target, fallback):
+    path = getattr(target, "path", None)
+    return path if isinstance(path, str) else fallback
+
+
+def _collection_of(doc_path):
+    """Döküman yolunun koleksiyonu (`users/{uid}/expenses/x` -> `expenses`)"""
+    parts = doc_path.split("/")
+    return parts[-2] if len(parts) > 1 else parts[0]
+
+
+class TracedClient:
+    """Firestore istemcisi; okuma/yazma çağrılarını o anki ize kaydeder"""
+
+    def __init__(self, client):
+        self._target = client
+
+    def collection(self, name):
+        return _TracedRef(self._target.collection(name), name)
+
+    def batch(self):
+        return _TracedBatch(self._target.batch())
+
+    def get_all(self, refs, *args, **kwargs):
+        refs = [_unwrap(r) for r in refs]
+        start, t0 = time.time_ns(), time.perf_counter()
+        docs = list(self._target.get_all(refs, *args, **kwargs))
+        collection = _collection_of(_path_of(refs[0], "")) if refs else ""
+        attrs = {"collection": collection, "docs": len(docs), "reads": len(refs)}
+        if detail_enabled():
+            attrs["bytes"] = sum(estimate_bytes(d.to_dict()) for d in docs if d.exists)
+        _record("firestore.get_all", start, t0, attrs)
+        return iter(docs)
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def _record(name, start_ns, t0, attrs):
+    trace = current_trace()
+    if trace is not None:
+        record(trace, name, start_ns, (time.perf_counter() - t0) * 1000, attrs)
+
+
+_BUILDERS = {"where", "order_by", "limit", "limit_to_last", "offset", "start_at", "start_after",
+             "end_at", "end_before", "select"}
+
+
+class _TracedRef:
+    """Koleksiyon, sorgu ya da döküman referansı vekili"""
+
+    def __init__(self, target, path):
+        self._target = target
+        self._path = path
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name in _BUILDERS:
+            return lambda *a, **k: _TracedRef(attr(*a, **k), self._path)
+        return attr
+
+    def document(self, *args, **kwargs):
+        ref = self._target.document(*args, **kwargs)
+        return _TracedRef(ref, f"{self._path}/{ref.id}")
+
+    def collection(self, name):
+        return _TracedRef(self._target.collection(name), f"{self._path}/{name}")
+
+    def stream(self, *args, **kwargs):
+        start, t0 = time.time_ns(), time.perf_counter()
+        docs, size = 0, 0
+        detail = detail_enabled()
+        try:
+            for doc in self._target.stream(*args, **kwargs):
+                docs += 1
+                if detail:
+                    size += estimate_bytes(doc.to_dict())
+                yield doc
+        finally:
+            attrs = {"collection": self._path, "docs": docs, "reads": max(docs, MIN_QUERY_READS)}
+            if detail:
+                attrs["bytes"] = size
+            _record("firestore.stream", start, t0, attrs)
+
+    def get(self, *args, **kwargs):
+        start, t0 = time.time_ns(), time.perf_counter()
+        result = self._target.get(*args, **kwargs)
+        if isinstance(result, list):
+            docs = result
+            attrs = {"collection": self._path, "docs": len(docs), "reads": max(len(docs), MIN_QUERY_READS)}
+        else:
+            docs = [result] if result.exists else []
+            attrs = {"collection": self._path, "docs": len(docs), "reads": 1}
+        if detail_enabled():
+            attrs["bytes"] = sum(estimate_bytes(d.to_dict()) for d in docs)
+        _record("firestore.get", start, t0, attrs)
+        return result
+
+    def list_documents(self, *args, **kwargs):
+        start, t0 = time.time_ns(), time.perf_counter()
+        refs = [_TracedRef(ref, f"{self._path}/{ref.id}") for ref in self._target.list_documents(*args, **kwargs)]
+        _record("firestore.list_documents", start, t0,
+                {"collection": self._path, "docs": len(refs), "reads": max(len(refs), MIN_QUERY_READS)})
+        return iter(refs)
+
+    def _write(self, name, method, data, *args, **kwargs):
+        start, t0 = time.time_ns(), time.perf_counter()
+        result = method(data, *args, **kwargs)
+        attrs = {"collection": self._path, "docs": 1, "writes": 1}
+        if detail_enabled():
+            attrs["bytes"] = estimate_bytes(data)
+        _record(name, start, t0, attrs)
+        return result
+
+    def set(self, data, *args, **kwargs):
+        return self._write("firestore.set", self._target.set, data, *args, **kwargs)
+
+    def update(self, data, *args, **kwargs):
+        return self._write("firestore.update", self._target.update, data, *args, **kwargs)
+
+    def add(self, data, *args, **kwargs):
+        return self._write("firestore.add", self._target.add, data, *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        start, t0 = time.time_ns(), time.perf_counter()
+        result = self._target.delete(*args, **kwargs)
+        _record("firestore.delete", start, t0, {"collection": self._path, "docs": 1, "deletes": 1})
+        return result
+
+
+class _TracedBatch:
+    def __init__(self, batch):
+        self._target = batch
+        self._ops = {"writes": 0, "deletes": 0}
+        self._collections = set()
+        self._bytes = 0
+
+    def _note(self, ref, data=None, kind="writes"):
+        self._ops[kind] += 1
+        path = ref._path if isinstance(ref, _TracedRef) else _path_of(ref, "")
+        self._collections.add(_collection_of(path))
+        if data is not None and detail_enabled():
+            self._bytes += estimate_bytes(data)
+
+    def set(self, ref, data, *args, **kwargs):
+        self._note(ref, data)
+        return self._target.set(_unwrap(ref), data, *args, **kwargs)
+
+    def update(self, ref, data, *args, **kwargs):
+        self._note(ref, data)
+        return self._target.update(_unwrap(ref), data, *args, **kwargs)
+
+    def delete(self, ref, *args, **kwargs):
+        self._note(ref, kind="deletes")
+        return self._target.delete(_unwrap(ref), *args, **kwargs)
+
+    def commit(self, *args, **kwargs):
+        start, t0 = time.time_ns(), time.perf_counter()
+        result = self._target.commit(*args, **kwargs)
+        attrs = {"collection": ",".join(sorted(self._collections)),
+                 "docs": self._ops["writes"] + self._ops["deletes"], **self._ops}
+        if detail_enabled():
+            attrs["bytes"] = self._bytes
+        _record("firestore.batch", start, t0, attrs)
+        self._ops = {"writes": 0, "deletes": 0}
+        self._collections = set()
+        self._bytes = 0
+        return result
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+
+def traced_client(client):
+    """İstemciyi izleme vekiliyle sarar (zaten sarılıysa olduğu gibi döner)"""
+    return client if isinstance(client, TracedClient) else TracedClient(client)
@@ -0,0 +1,175 @@
+"""Set bazlı idman tablosu ve vektörel güç analizleri.
+
+İdman kayıtlarındaki iç içe `sections → exercises → sets` yapısı kayıt
+anında tek satırı bir set olan düz bir tabloya (`workout_sets`) açılır.
+Buradaki fonksiyonlar Streamlit'e bağımlı değildir; uygulama, arka plan
+işleri ve ölçüm araçları aynı hesapları kullanır.
+"""
+import pandas as pd
+
+SET_COLUMNS = [
+    "workout_id", "date", "date_str", "section_idx", "section", "exercise", "set_idx", "kind",
+    "weight", "reps", "rom", "difficulty", "is_dropset",
+    "cardio_duration", "distance", "speed", "incline", "calories",
+]
+
+# Zorlanma etiketlerinin sayısal karşılığı (RPE benzeri)
+RPE_SCALE = {"Düşük": 6, "Orta": 7.5, "Yüksek": 9, "Tükeniş": 10}
+
+
+def flatten_workout_sets(workout_id, date_str, sections, section_offset=0):
+    """Bir idmanın bölümlerini set satırlarına açar"""
+    rows = []
+    for sec_idx, section in enumerate(sections or [], start=section_offset):
+        for ex in section.get("exercises", []):
+            for s_idx, s in enumerate(ex.get("sets", [])):
+                row = {
+                    "workout_id": workout_id,
+                    "date_str": date_str,
+                    "section_idx": sec_idx,
+                    "section": section.get("name"),
+                    "exercise": ex.get("name"),
+                    "set_idx": s_idx,
+                }
+                if "cardio_duration" in s:
+                    row.update({
+                        "kind": "cardio",
+                        "cardio_duration": s.get("cardio_duration"),
+                        "distance": s.get("distance"),
+                        "speed": s.get("speed"),
+                        "incline": s.get("incline"),
+                        "calories": s.get("calories"),
+                    })
+                else:
+                    row.update({
+                        "kind": "strength",
+                        "weight": s.get("weight"),
+                        "reps": s.get("reps"),
+                        "rom": s.get("rom"),
+                        "difficulty": s.get("difficulty"),
+                        "is_dropset": bool(s.get("is_dropset", False)),
+                    })
+                rows.append(row)
+    return rows
+
+
+def build_set_frame(rows):
+    """Set satırlarından tipleri sabitlenmiş, tarihe göre sıralı bir DataFrame kurar"""
+    df = pd.DataFrame(rows, columns=SET_COLUMNS)
+    df["date"] = pd.to_datetime(df["date_str"], errors="coerce")
+    for col in ["weight", "cardio_duration", "distance", "speed", "incline", "calories"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+    df["reps"] = pd.to_numeric(df["reps"], errors="coerce").fillna(0).astype("int16")
+    df["set_idx"] = pd.to_numeric(df["set_idx"], errors="coerce").fillna(0).astype("int16")
+    df["section_idx"] = pd.to_numeric(df["section_idx"], errors="coerce").fillna(0).astype("int16")
+    df["is_dropset"] = df["is_dropset"].fillna(False).astype(bool)
+    for col in ["exercise", "section", "kind", "rom", "difficulty"]:
+        df[col] = df[col].astype("category")
+    df = add_set_metrics(df)
+    return df.sort_values(["date", "workout_id", "section_idx"], kind="stable").reset_index(drop=True)
+
+
+def add_set_metrics(df):
+    """Hacim, tahmini 1RM (Epley) ve sayısal RPE sütunlarını ekler"""
+    strength = df["kind"] == "strength"
+    weight = df["weight"].fillna(0)
+    reps = df["reps"].astype("float32")
+    df["volume"] = (weight * reps).where(strength, 0).astype("float32")
+    e1rm = weight * (1 + reps / 30)
+    df["e1rm"] = e1rm.where(reps > 1, weight).where(strength & (reps > 0)).astype("float32")
+    df["rpe"] = df["difficulty"].astype(object).map(RPE_SCALE).astype("float32")
+    return df
+
+
+def exercise_summary(df):
+    """Hareket başına set sayısı, toplam hacim, rekorlar ve son tarih"""
+    strength = df[df["kind"] == "strength"]
+    if strength.empty:
+        return pd.DataFrame(columns=["sets", "volume", "best_e1rm", "best_weight", "best_e1rm_date", "last_date"])
+    g = strength.groupby("exercise", observed=True)
+    summary = pd.DataFrame({
+        "sets": g.size(),
+        "volume": g["volume"].sum(),
+        "best_e1rm": g["e1rm"].max(),
+        "best_weight": g["weight"].max(),
+        "last_date": g["date"].max(),
+    })
+    best_idx = strength["e1rm"].fillna(-1).groupby(strength["exercise"], observed=True).idxmax()
+    summary["best_e1rm_date"] = strength.loc[best_idx.values, "date"].set_axis(best_idx.index)
+    return summary
+
+
+def weekly_tonnage(df):
+    """Haftalık (Pazartesi başlangıçlı) toplam kaldırılan yük"""
+    strength = df[(df["kind"] == "strength") & df["date"].notna()]
+    if strength.empty:
+        return pd.Series(dtype="float32", name="volume")
+    week = strength["date"].dt.to_period("W-SUN").dt.start_time
+    return strength.groupby(week)["volume"].sum().rename("volume")
+
+
+def e1rm_progress(df, exercise):
+    """Bir hareket için gün bazında en iyi tahmini 1RM ve en yüksek ağırlık"""
+    rows = df[(df["exercise"] == exercise) & (df["kind"] == "strength")]
+    if rows.empty:
+        return pd.DataFrame(columns=["e1rm", "weight"])
+    return rows.groupby("date").agg(e1rm=("e1rm", "max"), weight=("weight", "max"))
+
+
+def personal_records(df):
+    """Her hareket için tahmini 1RM rekorunu kıran setler (kronolojik)"""
+    strength = df[(df["kind"] == "strength") & df["e1rm"].notna()].sort_values(["date", "set_idx"], kind="stable")
+    if strength.empty:
+        return strength
+    running_best = strength.groupby("exercise", observed=True)["e1rm"].cummax()
+    previous_best = running_best.groupby(strength["exercise"], observed=True).shift(1)
+    is_pr = previous_best.isna() | (strength["e1rm"] > previous_best)
+    return strength[is_pr][["date", "exercise", "weight", "reps", "e1rm"]]
+
+
+def merge_rollups(state, new_rows=None, removed_workout_ids=None):
+    """Analiz durumunu yalnızca etkilenen hareketler için günceller.
+
+    `state` sözlüğü `sets`, `summary` ve `weekly` anahtarlarını taşır.
+    Yeni setler eklenir ya da silinen idmanların setleri çıkarılır; özet
+    tablosunda sadece değişen hareketlerin satırları yeniden hesaplanır,
+    haftalık tonaj ise fark kadar güncellenir.
+    """
+    sets = state["sets"]
+    touched = set()
+    weekly = state["weekly"]
+
+    if removed_workout_ids:
+        mask = sets["workout_id"].isin(list(removed_workout_ids))
+        removed = sets[mask]
+        if not removed.empty:
+            touched.update(removed["exercise"].dropna().astype(str))
+            weekly = weekly.sub(weekly_tonnage(removed), fill_value=0)
+            sets = sets[~mask]
+
+    if new_rows:
+        added = build_set_frame(new_rows)
+        touched.update(added["exercise"].dropna().astype(str))
+        weekly = weekly.add(weekly_tonnage(added), fill_value=0)
+        sets = pd.concat([sets, added], ignore_index=True)
+        for col in ["exercise", "section", "kind", "rom", "difficulty"]:
+            sets[col] = sets[col].astype("category")
+        sets = sets.sort_values(["date", "workout_id", "section_idx"], kind="stable").reset_index(drop=True)
+
+    summary = state["summary"]
+    if touched:
+        fresh = exercise_summary(sets[sets["exercise"].astype(str).isin(touched)])
+        summary = pd.concat([summary.drop(index=[t for t in touched if t in summary.index]), fresh]).sort_index()
+
+    state.update({"sets": sets, "summary": summary, "weekly": weekly[weekly > 0].sort_index()})
+    return state
+
+
+def rollup_from_frame(sets):
+    """Hazır set tablosundan (ör. arka plan işinin çıktısı) analiz durumu kurar"""
+    return {"sets": sets, "summary": exercise_summary(sets), "weekly": weekly_tonnage(sets)}
+
+
+def new_rollup_state(rows):
+    """Set satırlarından sıfırdan analiz durumu kurar"""
+    return rollup_from_frame(build_set_frame(rows))